@@ -12,6 +12,7 @@ from .models import (
 from apps.scheduling.models import Grupos
 from apps.scheduling.serializers import GruposSerializer
 from apps.scheduling.service.schedule_generator import ScheduleGeneratorService
+from apps.scheduling.utils import leer_bandera
 
 from .serializers import (
     UnidadAcademicaSerializer, CarreraSerializer, PeriodoAcademicoSerializer,
@@ -65,8 +66,11 @@ class UnidadAcademicaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # dry_run=true: genera en memoria y devuelve el diff y las métricas sin escribir en la BD
+        dry_run = leer_bandera(request, 'dry_run')
+
         # Instanciar el servicio con el período correcto
-        generator = ScheduleGeneratorService(periodo=periodo)
+        generator = ScheduleGeneratorService(periodo=periodo, dry_run=dry_run)
         
         # Llamar al método de generación masiva por ciclo
         resultado = generator.generar_horarios_para_ciclo(ciclo_id=ciclo.ciclo_id)
@@ -116,8 +120,11 @@ class CicloViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # dry_run=true: genera en memoria y devuelve el diff y las métricas sin escribir en la BD
+        dry_run = leer_bandera(request, 'dry_run')
+
         # Instanciar el servicio con el período correcto
-        generator = ScheduleGeneratorService(periodo=periodo)
+        generator = ScheduleGeneratorService(periodo=periodo, dry_run=dry_run)
         
         # Llamar al método de generación masiva por ciclo
         resultado = generator.generar_horarios_para_ciclo(ciclo_id=ciclo.ciclo_id)
@@ -7,7 +7,14 @@ from .models import (
     DisponibilidadDocentes,
     HorariosAsignados,
     
-    ConfiguracionRestricciones
+    ConfiguracionRestricciones,
+    EscenarioHorario,
+    CambioEscenario,
+    TrabajoGeneracion,
+    ParticionGeneracion,
+    LoteGeneracion,
+    CambioPendiente,
+    PerfilPesos
 )
 
 # Registrar los modelos para que aparezcan en el panel de administración de Django
@@ -16,4 +23,10 @@ admin.site.register(BloquesHorariosDefinicion)
 admin.site.register(DisponibilidadDocentes)
 admin.site.register(HorariosAsignados)
 admin.site.register(ConfiguracionRestricciones)
-
+admin.site.register(EscenarioHorario)
+admin.site.register(CambioEscenario)
+admin.site.register(TrabajoGeneracion)
+admin.site.register(ParticionGeneracion)
+admin.site.register(LoteGeneracion)
+admin.site.register(CambioPendiente)
+admin.site.register(PerfilPesos)
@@ -6,3 +6,12 @@ from django.apps import AppConfig
 class SchedulingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.scheduling'
+
+    def ready(self):
+        # Versiona las tablas que usa el generador para invalidar su caché de datos de referencia
+        from .signals import conectar_versionado_tablas, conectar_cambios_pendientes, conectar_impacto_disponibilidad
+        conectar_versionado_tablas()
+        # Registra qué grupos, docentes, aulas y restricciones cambiaron, para la reparación incremental
+        conectar_cambios_pendientes()
+        # Marca las asignaciones que una baja de disponibilidad deja inválidas
+        conectar_impacto_disponibilidad()
@@ -0,0 +1,168 @@
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import PerfilPesos
+from apps.scheduling.service.calidad import CalidadHorarioService
+from apps.scheduling.service.schedule_generator import ScheduleGeneratorService, PesosBlandos, CAMPOS_PESOS
+
+# Datos de referencia del generador compilados una vez por el proceso principal y entregados a cada proceso hijo
+_datos_referencia = None
+
+
+def _iniciar_proceso(datos_referencia):
+    global _datos_referencia
+    _datos_referencia = datos_referencia
+
+
+def _registro(verbosidad):
+    """Logger para el generador: sus mensajes de progreso solo se muestran con --verbosity 2 o más."""
+    registro = logging.getLogger(f"ajustar_pesos.{os.getpid()}")
+    if not registro.hasHandlers():
+        registro.addHandler(logging.StreamHandler())
+        registro.propagate = False
+    registro.setLevel(logging.INFO if verbosidad >= 2 else logging.ERROR)
+    return registro
+
+
+def _probar_pesos(periodo_id, nombre, pesos, pesos_referencia, verbosidad=1):
+    """
+    Genera el período en dry_run con `pesos` y mide el horario resultante (fijas + propuestas) con los pesos de
+    referencia, para que todos los candidatos se comparen con la misma vara; corre en un proceso propio.
+    """
+    try:
+        periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        generador = ScheduleGeneratorService(
+            periodo=periodo, stdout_ref=_registro(verbosidad), dry_run=True, pesos=PesosBlandos(**pesos),
+            datos_referencia=_datos_referencia
+        )
+        metricas = generador.generar_horarios_automaticos()["metricas"]
+        filas = list(generador.asignaciones_fijas) + [
+            (grupo_id, materia_id, docente_id, espacio_id, bloque_id)
+            for grupo_id, materia_id, docente_id, espacio_id, _, bloque_id in generador.asignaciones_propuestas
+        ]
+        calidad = CalidadHorarioService(periodo=periodo, generador=generador, pesos=PesosBlandos(**pesos_referencia)).evaluar(filas)
+        return {
+            "nombre": nombre,
+            "pesos": pesos,
+            "clases_sin_resolver": metricas["clases_sin_resolver"],
+            "sesiones_sin_programar": metricas["sesiones_sin_programar"],
+            "cobertura": metricas["cobertura"],
+            "penalizacion_total": calidad["penalizacion_total"],
+            "componentes": calidad["componentes"],
+            "duracion_segundos": metricas["duracion_segundos"],
+        }
+    finally:
+        connections.close_all()
+
+
+def _frontera(resultados):
+    """Candidatos no dominados al minimizar a la vez las clases sin resolver y la penalización total."""
+    frontera = []
+    mejor_penalizacion = None
+    for r in sorted(resultados, key=lambda r: (r["clases_sin_resolver"], r["penalizacion_total"])):
+        if mejor_penalizacion is None or r["penalizacion_total"] < mejor_penalizacion:
+            frontera.append(r)
+            mejor_penalizacion = r["penalizacion_total"]
+    return frontera
+
+
+class Command(BaseCommand):
+    help = ('Reproduce en dry_run la generación de un período con varios perfiles de pesos blandos, en procesos paralelos, '
+            'y reporta la frontera entre clases sin resolver y penalización (medida con los pesos de referencia)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo_id', type=int, help='ID del PeriodoAcademico a generar')
+        parser.add_argument('--perfiles', type=str, default=None,
+                            help='IDs de PerfilPesos separados por comas (por defecto, todos los del período)')
+        parser.add_argument('--variar', action='append', default=[], metavar='CAMPO=V1,V2',
+                            help=f"Valores a probar para un peso, a partir de los de referencia; se combinan todos. Campos: {', '.join(CAMPOS_PESOS)}")
+        parser.add_argument('--referencia', type=int, default=None,
+                            help='PerfilPesos con el que se mide la penalización (por defecto, el activo del período o los pesos por defecto)')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Máximo de generaciones a la vez')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados y la frontera en JSON')
+
+    def _leer_variaciones(self, opciones):
+        variaciones = {}
+        for opcion in opciones:
+            campo, _, valores = opcion.partition('=')
+            campo = campo.strip()
+            if campo not in CAMPOS_PESOS:
+                raise CommandError(f"--variar: campo '{campo}' desconocido. Campos: {', '.join(CAMPOS_PESOS)}")
+            try:
+                variaciones[campo] = [int(v) for v in valores.split(',') if v.strip()]
+            except ValueError:
+                raise CommandError(f"--variar: valores no enteros en '{opcion}'.")
+            if not variaciones[campo] or min(variaciones[campo]) < 0:
+                raise CommandError(f"--variar: se requieren enteros no negativos en '{opcion}'.")
+        return variaciones
+
+    def handle(self, *args, **options):
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=options['periodo_id'])
+        except PeriodoAcademico.DoesNotExist:
+            raise CommandError(f"El período académico con id {options['periodo_id']} no existe.")
+        variaciones = self._leer_variaciones(options['variar'])
+
+        perfiles = PerfilPesos.objects.filter(periodo=periodo).order_by('perfil_id')
+        if options['perfiles']:
+            ids = [int(i) for i in options['perfiles'].split(',') if i.strip().isdigit()]
+            perfiles = perfiles.filter(perfil_id__in=ids)
+            faltantes = sorted(set(ids) - {p.pk for p in perfiles})
+            if faltantes:
+                raise CommandError(f"Perfiles de pesos no encontrados en el período: {faltantes}")
+        if options['referencia'] is not None:
+            referencia = PerfilPesos.objects.filter(periodo=periodo, pk=options['referencia']).first()
+            if referencia is None:
+                raise CommandError(f"El perfil de pesos {options['referencia']} no existe en el período.")
+        else:
+            referencia = PerfilPesos.objects.filter(periodo=periodo, activo=True).first()
+        pesos_referencia = (PesosBlandos.desde_perfil(referencia) if referencia else PesosBlandos()).como_dict()
+
+        # Candidatos: los pesos de referencia, los perfiles y la grilla de --variar; los pesos repetidos se prueban una vez
+        candidatos = {tuple(pesos_referencia.values()): (referencia.nombre if referencia else 'por defecto', pesos_referencia)}
+        for perfil in perfiles:
+            pesos = PesosBlandos.desde_perfil(perfil).como_dict()
+            candidatos.setdefault(tuple(pesos.values()), (perfil.nombre, pesos))
+        campos = list(variaciones)
+        for valores in itertools.product(*(variaciones[c] for c in campos)) if campos else ():
+            pesos = {**pesos_referencia, **dict(zip(campos, valores))}
+            nombre = ', '.join(f"{c}={v}" for c, v in zip(campos, valores))
+            candidatos.setdefault(tuple(pesos.values()), (nombre, pesos))
+        candidatos = list(candidatos.values())
+
+        verbosidad = options['verbosity']
+        datos = ScheduleGeneratorService(periodo=periodo, stdout_ref=_registro(verbosidad), dry_run=True).exportar_datos_referencia()
+        if not options['json']:
+            self.stdout.write(f"Período {periodo.nombre_periodo}: {len(candidatos)} perfiles de pesos a probar.")
+        procesos = max(1, min(options['procesos'], len(candidatos)))
+        argumentos = [(periodo.pk, nombre, pesos, pesos_referencia, verbosidad) for nombre, pesos in candidatos]
+        if procesos == 1:
+            _iniciar_proceso(datos)
+            resultados = [_probar_pesos(*a) for a in argumentos]
+        else:
+            connections.close_all() # Los procesos hijos no deben heredar las conexiones abiertas
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(datos,)) as pool:
+                resultados = [futuro.result() for futuro in [pool.submit(_probar_pesos, *a) for a in argumentos]]
+
+        frontera = _frontera(resultados)
+        if options['json']:
+            self.stdout.write(json.dumps({
+                "periodo_id": periodo.pk, "pesos_referencia": pesos_referencia, "resultados": resultados,
+                "frontera": [r["nombre"] for r in frontera],
+            }, ensure_ascii=False, indent=2))
+            return
+
+        en_frontera = {id(r) for r in frontera}
+        self.stdout.write(f"Penalización medida con: {pesos_referencia}")
+        for r in sorted(resultados, key=lambda r: (r["clases_sin_resolver"], r["penalizacion_total"])):
+            linea = (f"  {'*' if id(r) in en_frontera else ' '} {r['nombre']}: {r['clases_sin_resolver']} clases sin resolver, "
+                     f"cobertura {r['cobertura']}%, penalización {r['penalizacion_total']} ({r['duracion_segundos']} s)")
+            self.stdout.write(self.style.SUCCESS(linea) if id(r) in en_frontera else linea)
+        self.stdout.write("(*) Frontera: ningún otro perfil tiene a la vez menos clases sin resolver y menos penalización.")
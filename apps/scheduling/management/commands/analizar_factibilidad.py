@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.service.feasibility_analyzer import FeasibilityAnalyzerService
+
+
+class Command(BaseCommand):
+    help = 'Pre-chequeo de factibilidad de un período antes de encolar la generación de horarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo_id', type=int, help='ID del PeriodoAcademico a analizar')
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado completo en JSON')
+
+    def handle(self, *args, **options):
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=options['periodo_id'])
+        except PeriodoAcademico.DoesNotExist:
+            raise CommandError(f"El período académico con id {options['periodo_id']} no existe.")
+
+        resultado = FeasibilityAnalyzerService(periodo=periodo).analizar()
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"Período: {periodo.nombre_periodo} - sesiones requeridas: {resultado['sesiones_requeridas']}")
+        for turno in resultado['turnos']:
+            self.stdout.write(
+                f"  Turno {turno['turno']}: {turno['sesiones_requeridas']} sesiones, {turno['grupos']} grupos, "
+                f"{turno['bloques']} bloques, {turno['docente_bloques_ofertados']} docente-bloques"
+            )
+        if resultado['factible']:
+            self.stdout.write(self.style.SUCCESS('No se detectaron déficits de oferta.'))
+        else:
+            for problema in resultado['problemas']:
+                self.stdout.write(self.style.WARNING(f"  - {problema}"))
+            self.stdout.write(self.style.ERROR(f"Se detectaron {len(resultado['problemas'])} problemas de factibilidad."))
@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.service.calidad import CalidadHorarioService
+
+
+class Command(BaseCommand):
+    help = 'Mide la calidad (penalización blanda) del horario guardado de un período, generado o editado a mano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo_id', type=int, help='ID del PeriodoAcademico a evaluar')
+        parser.add_argument('--top', type=int, default=10, help='Grupos y docentes más penalizados a mostrar')
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado completo en JSON')
+
+    def handle(self, *args, **options):
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=options['periodo_id'])
+        except PeriodoAcademico.DoesNotExist:
+            raise CommandError(f"El período académico con id {options['periodo_id']} no existe.")
+
+        resultado = CalidadHorarioService(periodo=periodo).evaluar()
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(
+            f"Período: {periodo.nombre_periodo} - {resultado['asignaciones']} asignaciones, "
+            f"penalización total {resultado['penalizacion_total']} ({resultado['duracion_segundos']} s)"
+        )
+        for componente, valor in resultado['componentes'].items():
+            self.stdout.write(f"  {componente}: {valor}")
+        for titulo, clave in (('Grupos', 'por_grupo'), ('Docentes', 'por_docente')):
+            self.stdout.write(f"{titulo} más penalizados:")
+            for fila in resultado[clave][:options['top']]:
+                self.stdout.write(f"  {fila['codigo']}: {fila['total']}")
+        if resultado['asignaciones_sin_evaluar']:
+            self.stdout.write(self.style.WARNING(
+                f"{resultado['asignaciones_sin_evaluar']} asignaciones con docente inactivo, aula o bloque inexistente no se evaluaron."
+            ))
@@ -0,0 +1,76 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import TrabajoGeneracion
+from apps.scheduling.service.lotes import crear_lote
+from apps.scheduling.service.schedule_generator import ScheduleGeneratorService
+from apps.scheduling.tasks import generar_horarios_task
+
+
+# Datos de referencia del generador por período ({periodo_id: datos}), compilados una vez por el proceso principal
+# y entregados a cada proceso hijo
+_datos_referencia = {}
+
+
+def _iniciar_proceso(datos_referencia):
+    global _datos_referencia
+    _datos_referencia = datos_referencia
+
+
+def _generar_cadena(trabajos):
+    """Genera en orden los períodos de una cadena ([(periodo_id, trabajo_id), ...]); corre en un proceso propio."""
+    try:
+        for periodo_id, trabajo_id in trabajos:
+            generar_horarios_task.apply(args=(periodo_id,), kwargs={
+                'trabajo_id': trabajo_id, 'datos_referencia': _datos_referencia.get(periodo_id)
+            })
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Genera los horarios de varios períodos en un lote; las cadenas de períodos independientes corren en procesos paralelos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('periodo_ids', type=int, nargs='+', help='IDs de los PeriodoAcademico a generar')
+        parser.add_argument('--tiempo-limite', type=int, default=None, help='Presupuesto de tiempo (segundos) por período')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Máximo de cadenas generadas a la vez')
+
+    def handle(self, *args, **options):
+        periodo_ids = list(dict.fromkeys(options['periodo_ids']))
+        periodos = list(PeriodoAcademico.objects.filter(pk__in=periodo_ids))
+        faltantes = sorted(set(periodo_ids) - {p.pk for p in periodos})
+        if faltantes:
+            raise CommandError(f"Períodos académicos no encontrados: {faltantes}")
+        if options['tiempo_limite'] is not None and options['tiempo_limite'] <= 0:
+            raise CommandError("--tiempo-limite debe ser mayor que 0.")
+
+        lote, trabajos_por_cadena = crear_lote(periodos, tiempo_limite_segundos=options['tiempo_limite'])
+        self.stdout.write(f"Lote {lote.pk}: {len(trabajos_por_cadena)} cadenas {lote.cadenas}")
+
+        registro = logging.getLogger(__name__)
+        datos = {
+            periodo.pk: ScheduleGeneratorService(periodo=periodo, stdout_ref=registro, dry_run=True).exportar_datos_referencia()
+            for periodo in periodos
+        }
+        cadenas = [[(t.periodo_id, t.pk) for t in trabajos] for trabajos in trabajos_por_cadena]
+        procesos = max(1, min(options['procesos'], len(cadenas)))
+        if procesos == 1:
+            _iniciar_proceso(datos)
+            for cadena in cadenas:
+                _generar_cadena(cadena)
+        else:
+            connections.close_all() # Los procesos hijos no deben heredar las conexiones abiertas
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(datos,)) as pool:
+                for futuro in [pool.submit(_generar_cadena, cadena) for cadena in cadenas]:
+                    futuro.result()
+
+        for trabajo in TrabajoGeneracion.objects.filter(lote=lote).select_related('periodo').order_by('trabajo_id'):
+            stats = (trabajo.resultado or {}).get('stats', {})
+            linea = f"  {trabajo.periodo.nombre_periodo}: {trabajo.estado} ({stats.get('asignaciones_exitosas', 0)} clases programadas)"
+            self.stdout.write(self.style.SUCCESS(linea) if trabajo.estado == 'COMPLETADO' else self.style.WARNING(linea))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.service.servidor_generador import GeneradorResidente, ServidorGenerador, configuracion_servidor
+
+
+class Command(BaseCommand):
+    help = 'Levanta el servidor local del generador, que mantiene en memoria el modelo compilado de los períodos'
+
+    def add_arguments(self, parser):
+        configuracion = configuracion_servidor() or {}
+        parser.add_argument('--host', default=configuracion.get('HOST', '127.0.0.1'), help='Dirección en la que escucha (por defecto settings.GENERADOR_DAEMON)')
+        parser.add_argument('--puerto', type=int, default=configuracion.get('PUERTO', 8765), help='Puerto en el que escucha (por defecto settings.GENERADOR_DAEMON)')
+        parser.add_argument('--intervalo', type=float, default=30, help='Segundos sin solicitudes tras los que se revisan cambios en la BD y se recompila')
+        parser.add_argument('--periodo', type=int, action='append', default=[], help='ID de un período a compilar al arrancar (repetible)')
+
+    def handle(self, *args, **options):
+        residente = GeneradorResidente()
+        for periodo_id in options['periodo']:
+            try:
+                residente.generador(PeriodoAcademico.objects.get(pk=periodo_id))
+            except PeriodoAcademico.DoesNotExist:
+                raise CommandError(f"El período académico con id {periodo_id} no existe.")
+
+        try:
+            servidor = ServidorGenerador((options['host'], options['puerto']), residente, intervalo_refresco=options['intervalo'])
+        except OSError as e:
+            raise CommandError(f"No se pudo escuchar en {options['host']}:{options['puerto']}: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(f"Servidor del generador escuchando en {options['host']}:{options['puerto']}"))
+        with servidor:
+            try:
+                while True:
+                    servidor.handle_request() # Una solicitud o, si no llega ninguna en --intervalo, un refresco
+            except KeyboardInterrupt:
+                self.stdout.write("Servidor del generador detenido.")
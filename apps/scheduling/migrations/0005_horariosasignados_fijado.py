@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0004_alter_horariosasignados_unique_together'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='grupos',
+            options={'ordering': ['-grupo_id'], 'verbose_name': 'Grupo/Sección', 'verbose_name_plural': 'Grupos/Secciones'},
+        ),
+        migrations.AddField(
+            model_name='horariosasignados',
+            name='fijado',
+            field=models.BooleanField(default=False, help_text="Si es True, la generación automática conserva esta asignación (igual que las 'Confirmado')"),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_setup', '0003_alter_ciclo_unique_together_alter_carrera_unidad_and_more'),
+        ('scheduling', '0005_horariosasignados_fijado'),
+        ('users', '0002_alter_docentes_telefono'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EscenarioHorario',
+            fields=[
+                ('escenario_id', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100)),
+                ('descripcion', models.TextField(blank=True, null=True)),
+                ('ajustes', models.JSONField(blank=True, default=dict, help_text='Ajustes de datos, ej. {"espacios_cerrados": [3], "docentes_no_disponibles": [{"docente_id": 5, "dia_semana": 2}]}')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='escenarios_horario', to='academic_setup.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Escenario de Horario',
+                'verbose_name_plural': 'Escenarios de Horario',
+                'unique_together': {('nombre', 'periodo')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CambioEscenario',
+            fields=[
+                ('cambio_id', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('AGREGAR', 'Agregar'), ('QUITAR', 'Quitar'), ('MODIFICAR', 'Modificar')], max_length=10)),
+                ('dia_semana', models.IntegerField(blank=True, choices=[(1, 'Lunes'), (2, 'Martes'), (3, 'Miércoles'), (4, 'Jueves'), (5, 'Viernes'), (6, 'Sábado'), (7, 'Domingo')], null=True)),
+                ('bloque_horario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='scheduling.bloqueshorariosdefinicion')),
+                ('docente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.docentes')),
+                ('espacio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic_setup.espaciosfisicos')),
+                ('grupo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='scheduling.grupos')),
+                ('horario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cambios_en_escenarios', to='scheduling.horariosasignados')),
+                ('materia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academic_setup.materias')),
+                ('escenario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='scheduling.escenariohorario')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Escenario',
+                'verbose_name_plural': 'Cambios de Escenario',
+                'ordering': ['cambio_id'],
+            },
+        ),
+    ]
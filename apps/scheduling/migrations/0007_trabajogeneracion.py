@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_setup', '0003_alter_ciclo_unique_together_alter_carrera_unidad_and_more'),
+        ('scheduling', '0006_escenarios_horario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoGeneracion',
+            fields=[
+                ('trabajo_id', models.AutoField(primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADO', 'Completado'), ('DETENIDO', 'Detenido por tiempo'), ('CANCELADO', 'Cancelado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20)),
+                ('tiempo_limite_segundos', models.PositiveIntegerField(blank=True, help_text='Presupuesto de tiempo; al agotarse se devuelve lo mejor obtenido', null=True)),
+                ('persistir_parcial', models.BooleanField(default=True, help_text='Si se detiene antes de terminar, guardar el resultado parcial')),
+                ('cancelacion_solicitada', models.BooleanField(default=False)),
+                ('task_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_generacion', to='academic_setup.periodoacademico')),
+                ('periodo_origen', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='academic_setup.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Generación',
+                'verbose_name_plural': 'Trabajos de Generación',
+                'ordering': ['-trabajo_id'],
+            },
+        ),
+    ]
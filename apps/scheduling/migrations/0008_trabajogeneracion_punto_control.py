@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0007_trabajogeneracion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='fecha_punto_control',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='intentos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='punto_control',
+            field=models.JSONField(blank=True, help_text='Estado compacto de la generación en curso; si el worker se cae, la tarea se reanuda desde aquí', null=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0008_trabajogeneracion_punto_control'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='modo_particion',
+            field=models.CharField(blank=True, choices=[('CARRERA', 'Por carrera'), ('CICLO', 'Por carrera y ciclo')], help_text='Si se indica, el período se reparte entre varios workers (ver ParticionGeneracion)', max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='particiones_pendientes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ParticionGeneracion',
+            fields=[
+                ('particion_id', models.AutoField(primary_key=True, serialize=False)),
+                ('clave', models.CharField(help_text="Identifica la partición (ej. 'carrera-3' o 'carrera-3-ciclo-2')", max_length=50)),
+                ('grupo_ids', models.JSONField(default=list)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=20)),
+                ('asignaciones', models.JSONField(blank=True, help_text='Horario propuesto: listas [grupo, materia, docente, espacio, dia, bloque]', null=True)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='particiones', to='scheduling.trabajogeneracion')),
+            ],
+            options={
+                'verbose_name': 'Partición de Generación',
+                'verbose_name_plural': 'Particiones de Generación',
+                'unique_together': {('trabajo', 'clave')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaFranja',
+            fields=[
+                ('reserva_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo_recurso', models.CharField(choices=[('D', 'Docente'), ('E', 'Espacio')], max_length=1)),
+                ('recurso_id', models.IntegerField()),
+                ('particion', models.CharField(max_length=50)),
+                ('bloque_horario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='scheduling.bloqueshorariosdefinicion')),
+                ('trabajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='scheduling.trabajogeneracion')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Franja',
+                'verbose_name_plural': 'Reservas de Franjas',
+                'unique_together': {('trabajo', 'tipo_recurso', 'recurso_id', 'bloque_horario')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0010_versiontabla'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteGeneracion',
+            fields=[
+                ('lote_id', models.AutoField(primary_key=True, serialize=False)),
+                ('cadenas', models.JSONField(default=list, help_text='[[periodo_id, ...], ...]: los períodos de una cadena se generan en orden (comparten docentes en fechas superpuestas); las cadenas, en paralelo')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lote de Generación',
+                'verbose_name_plural': 'Lotes de Generación',
+                'ordering': ['-lote_id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='lote',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='scheduling.lotegeneracion'),
+        ),
+    ]
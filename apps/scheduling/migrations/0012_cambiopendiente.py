@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_setup', '0003_alter_ciclo_unique_together_alter_carrera_unidad_and_more'),
+        ('scheduling', '0011_lote_generacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioPendiente',
+            fields=[
+                ('cambio_id', models.AutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('GRUPO', 'Grupo'), ('DOCENTE', 'Docente'), ('ESPACIO', 'Espacio'), ('RESTRICCION', 'Restricción')], max_length=15)),
+                ('objeto_id', models.IntegerField(help_text='grupo_id, docente_id, espacio_id o restriccion_id según el tipo')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios_pendientes', to='academic_setup.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Cambio Pendiente',
+                'verbose_name_plural': 'Cambios Pendientes',
+                'unique_together': {('periodo', 'tipo', 'objeto_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0012_cambiopendiente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='horariosasignados',
+            name='docente_no_disponible',
+            field=models.BooleanField(default=False, help_text='True si la disponibilidad del docente cambió y ya no incluye este bloque (la asignación quedó inválida)'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic_setup', '0003_alter_ciclo_unique_together_alter_carrera_unidad_and_more'),
+        ('scheduling', '0013_horariosasignados_docente_no_disponible'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPesos',
+            fields=[
+                ('perfil_id', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=100)),
+                ('activo', models.BooleanField(default=False, help_text='Perfil que usa la generación del período')),
+                ('preferencia_negativa', models.PositiveIntegerField(default=10, help_text='Por cada punto de preferencia negativa del docente')),
+                ('preferencia_neutra', models.PositiveIntegerField(default=5, help_text='Bloque disponible pero no preferido')),
+                ('falta_asiento', models.PositiveIntegerField(default=5, help_text='Por cada estudiante que no cabe en el aula')),
+                ('aula_sobredimensionada', models.PositiveIntegerField(default=10, help_text='Aula de más de 2.5 veces el tamaño del grupo')),
+                ('turno', models.PositiveIntegerField(default=20, help_text='Bloque fuera del turno preferente del grupo')),
+                ('aula_no_preferida', models.PositiveIntegerField(default=15, help_text='Por cada regla de aula preferida no cumplida')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='perfiles_pesos', to='academic_setup.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Pesos',
+                'verbose_name_plural': 'Perfiles de Pesos',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('periodo',), name='un_perfil_pesos_activo_por_periodo')],
+                'unique_together': {('nombre', 'periodo')},
+            },
+        ),
+    ]
@@ -89,6 +89,8 @@ class HorariosAsignados(models.Model):
     dia_semana = models.IntegerField(choices=DIA_SEMANA_CHOICES)
     bloque_horario = models.ForeignKey(BloquesHorariosDefinicion, on_delete=models.CASCADE, related_name='clases_en_bloque')
     estado = models.CharField(max_length=50, choices=ESTADO_CHOICES, default='Programado')
+    fijado = models.BooleanField(default=False, help_text="Si es True, la generación automática conserva esta asignación (igual que las 'Confirmado')")
+    docente_no_disponible = models.BooleanField(default=False, help_text="True si la disponibilidad del docente cambió y ya no incluye este bloque (la asignación quedó inválida)")
     observaciones = models.TextField(blank=True, null=True)
 
     def __str__(self):
@@ -128,3 +130,215 @@ class ConfiguracionRestricciones(models.Model):
     class Meta:
         verbose_name = "Configuración de Restricción"
         verbose_name_plural = "Configuraciones de Restricciones"
+
+
+class EscenarioHorario(models.Model):
+    """
+    Escenario "¿qué pasa si...?" sobre el horario publicado de un período. Solo se guardan las
+    diferencias (CambioEscenario) y los ajustes de datos; el horario completo se arma al leerlo.
+    """
+    escenario_id = models.AutoField(primary_key=True)
+    nombre = models.CharField(max_length=100)
+    descripcion = models.TextField(blank=True, null=True)
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='escenarios_horario')
+    ajustes = models.JSONField(
+        default=dict, blank=True,
+        help_text='Ajustes de datos, ej. {"espacios_cerrados": [3], "docentes_no_disponibles": [{"docente_id": 5, "dia_semana": 2}]}'
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.periodo.nombre_periodo})"
+
+    class Meta:
+        unique_together = ('nombre', 'periodo')
+        verbose_name = "Escenario de Horario"
+        verbose_name_plural = "Escenarios de Horario"
+
+
+class CambioEscenario(models.Model):
+    TIPO_CHOICES = [('AGREGAR', 'Agregar'), ('QUITAR', 'Quitar'), ('MODIFICAR', 'Modificar')]
+
+    cambio_id = models.AutoField(primary_key=True)
+    escenario = models.ForeignKey(EscenarioHorario, on_delete=models.CASCADE, related_name='cambios')
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    # QUITAR y MODIFICAR apuntan a una asignación publicada; AGREGAR no
+    horario = models.ForeignKey(HorariosAsignados, on_delete=models.CASCADE, null=True, blank=True, related_name='cambios_en_escenarios')
+    # AGREGAR: todos obligatorios. MODIFICAR: solo los que cambian (null = se mantiene el valor publicado)
+    grupo = models.ForeignKey(Grupos, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    materia = models.ForeignKey(Materias, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    docente = models.ForeignKey(Docentes, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    espacio = models.ForeignKey(EspaciosFisicos, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    dia_semana = models.IntegerField(choices=BloquesHorariosDefinicion.DIA_SEMANA_CHOICES, null=True, blank=True)
+    bloque_horario = models.ForeignKey(BloquesHorariosDefinicion, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    def __str__(self):
+        return f"{self.escenario.nombre}: {self.tipo} {self.horario_id or ''}".strip()
+
+    class Meta:
+        ordering = ['cambio_id']
+        verbose_name = "Cambio de Escenario"
+        verbose_name_plural = "Cambios de Escenario"
+
+
+class TrabajoGeneracion(models.Model):
+    """Ejecución asíncrona (Celery) de la generación de horarios de un período, cancelable y con presupuesto de tiempo."""
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADO', 'Completado'),
+        ('DETENIDO', 'Detenido por tiempo'), ('CANCELADO', 'Cancelado'), ('FALLIDO', 'Fallido')
+    ]
+    ESTADOS_FINALES = ('COMPLETADO', 'DETENIDO', 'CANCELADO', 'FALLIDO')
+    MODO_PARTICION_CHOICES = [('CARRERA', 'Por carrera'), ('CICLO', 'Por carrera y ciclo')]
+
+    trabajo_id = models.AutoField(primary_key=True)
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='trabajos_generacion')
+    periodo_origen = models.ForeignKey(PeriodoAcademico, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    tiempo_limite_segundos = models.PositiveIntegerField(null=True, blank=True, help_text="Presupuesto de tiempo; al agotarse se devuelve lo mejor obtenido")
+    persistir_parcial = models.BooleanField(default=True, help_text="Si se detiene antes de terminar, guardar el resultado parcial")
+    modo_particion = models.CharField(max_length=10, choices=MODO_PARTICION_CHOICES, blank=True, null=True,
+                                      help_text="Si se indica, el período se reparte entre varios workers (ver ParticionGeneracion)")
+    particiones_pendientes = models.PositiveIntegerField(default=0)
+    lote = models.ForeignKey('LoteGeneracion', on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos')
+    cancelacion_solicitada = models.BooleanField(default=False)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    resultado = models.JSONField(null=True, blank=True)
+    punto_control = models.JSONField(null=True, blank=True, help_text="Estado compacto de la generación en curso; si el worker se cae, la tarea se reanuda desde aquí")
+    fecha_punto_control = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Trabajo {self.trabajo_id} - {self.periodo.nombre_periodo} ({self.estado})"
+
+    class Meta:
+        ordering = ['-trabajo_id']
+        verbose_name = "Trabajo de Generación"
+        verbose_name_plural = "Trabajos de Generación"
+
+
+class LoteGeneracion(models.Model):
+    """Generación de varios períodos en un solo pedido: un TrabajoGeneracion por período, agrupados en cadenas."""
+    lote_id = models.AutoField(primary_key=True)
+    cadenas = models.JSONField(default=list, help_text="[[periodo_id, ...], ...]: los períodos de una cadena se generan en orden (comparten docentes en fechas superpuestas); las cadenas, en paralelo")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Lote {self.lote_id} ({sum(len(c) for c in self.cadenas)} períodos)"
+
+    class Meta:
+        ordering = ['-lote_id']
+        verbose_name = "Lote de Generación"
+        verbose_name_plural = "Lotes de Generación"
+
+
+class ParticionGeneracion(models.Model):
+    """Parte de un TrabajoGeneracion distribuido: un subconjunto de grupos del período que genera un worker."""
+    ESTADO_CHOICES = [('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')]
+
+    particion_id = models.AutoField(primary_key=True)
+    trabajo = models.ForeignKey(TrabajoGeneracion, on_delete=models.CASCADE, related_name='particiones')
+    clave = models.CharField(max_length=50, help_text="Identifica la partición (ej. 'carrera-3' o 'carrera-3-ciclo-2')")
+    grupo_ids = models.JSONField(default=list)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    asignaciones = models.JSONField(null=True, blank=True, help_text="Horario propuesto: listas [grupo, materia, docente, espacio, dia, bloque]")
+    resultado = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.trabajo_id} / {self.clave} ({self.estado})"
+
+    class Meta:
+        unique_together = ('trabajo', 'clave')
+        verbose_name = "Partición de Generación"
+        verbose_name_plural = "Particiones de Generación"
+
+
+class ReservaFranja(models.Model):
+    """
+    Reserva de una franja (docente o aula en un bloque) durante una generación distribuida. La restricción única
+    hace que, entre workers concurrentes, solo una partición pueda quedarse con cada franja.
+    """
+    DOCENTE = 'D'
+    ESPACIO = 'E'
+    TIPO_RECURSO_CHOICES = [(DOCENTE, 'Docente'), (ESPACIO, 'Espacio')]
+
+    reserva_id = models.BigAutoField(primary_key=True)
+    trabajo = models.ForeignKey(TrabajoGeneracion, on_delete=models.CASCADE, related_name='reservas')
+    tipo_recurso = models.CharField(max_length=1, choices=TIPO_RECURSO_CHOICES)
+    recurso_id = models.IntegerField()
+    bloque_horario = models.ForeignKey(BloquesHorariosDefinicion, on_delete=models.CASCADE, related_name='+')
+    particion = models.CharField(max_length=50)
+
+    class Meta:
+        unique_together = ('trabajo', 'tipo_recurso', 'recurso_id', 'bloque_horario')
+        verbose_name = "Reserva de Franja"
+        verbose_name_plural = "Reservas de Franjas"
+
+
+class VersionTabla(models.Model):
+    """
+    Contador de cambios por tabla (etiqueta 'app.Modelo'), incrementado por señales en cada escritura.
+    Las versiones forman la clave de caché de los datos de referencia del generador.
+    """
+    tabla = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+
+    class Meta:
+        verbose_name = "Versión de Tabla"
+        verbose_name_plural = "Versiones de Tablas"
+
+
+class CambioPendiente(models.Model):
+    """
+    Dato de entrada del generador que cambió (grupo, docente, aula o restricción) desde la última generación o
+    reparación del período. Lo registran señales y lo consume la reparación incremental (ReparacionService).
+    """
+    TIPO_CHOICES = [('GRUPO', 'Grupo'), ('DOCENTE', 'Docente'), ('ESPACIO', 'Espacio'), ('RESTRICCION', 'Restricción')]
+
+    cambio_id = models.AutoField(primary_key=True)
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='cambios_pendientes')
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    objeto_id = models.IntegerField(help_text="grupo_id, docente_id, espacio_id o restriccion_id según el tipo")
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.periodo_id} / {self.tipo} {self.objeto_id}"
+
+    class Meta:
+        unique_together = ('periodo', 'tipo', 'objeto_id') # Varias ediciones del mismo objeto cuentan como un cambio
+        verbose_name = "Cambio Pendiente"
+        verbose_name_plural = "Cambios Pendientes"
+
+
+class PerfilPesos(models.Model):
+    """
+    Pesos de las restricciones blandas del generador para un período. La generación usa el perfil activo del período
+    (a lo sumo uno); sin perfil activo usa los pesos por defecto (PENALIZACION_* de schedule_generator).
+    """
+    perfil_id = models.AutoField(primary_key=True)
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name='perfiles_pesos')
+    nombre = models.CharField(max_length=100)
+    activo = models.BooleanField(default=False, help_text="Perfil que usa la generación del período")
+    preferencia_negativa = models.PositiveIntegerField(default=10, help_text="Por cada punto de preferencia negativa del docente")
+    preferencia_neutra = models.PositiveIntegerField(default=5, help_text="Bloque disponible pero no preferido")
+    falta_asiento = models.PositiveIntegerField(default=5, help_text="Por cada estudiante que no cabe en el aula")
+    aula_sobredimensionada = models.PositiveIntegerField(default=10, help_text="Aula de más de 2.5 veces el tamaño del grupo")
+    turno = models.PositiveIntegerField(default=20, help_text="Bloque fuera del turno preferente del grupo")
+    aula_no_preferida = models.PositiveIntegerField(default=15, help_text="Por cada regla de aula preferida no cumplida")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.periodo.nombre_periodo}){' [activo]' if self.activo else ''}"
+
+    class Meta:
+        unique_together = ('nombre', 'periodo')
+        constraints = [
+            models.UniqueConstraint(fields=['periodo'], condition=models.Q(activo=True), name='un_perfil_pesos_activo_por_periodo'),
+        ]
+        verbose_name = "Perfil de Pesos"
+        verbose_name_plural = "Perfiles de Pesos"
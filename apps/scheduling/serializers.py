@@ -1,6 +1,9 @@
 #apps/scheduling/serializers.py
 from rest_framework import serializers
-from .models import Grupos, BloquesHorariosDefinicion, DisponibilidadDocentes, HorariosAsignados, ConfiguracionRestricciones
+from .models import (
+    Grupos, BloquesHorariosDefinicion, DisponibilidadDocentes, HorariosAsignados, ConfiguracionRestricciones,
+    EscenarioHorario, CambioEscenario, TrabajoGeneracion, LoteGeneracion, PerfilPesos
+)
 from apps.academic_setup.serializers import MateriasSerializer, CarreraSerializer, EspaciosFisicosSerializer
 from apps.users.serializers import DocentesSerializer
 from apps.academic_setup.models import PeriodoAcademico
@@ -102,11 +105,12 @@ class HorariosAsignadosSerializer(serializers.ModelSerializer):
         # Asegurarse de que 'materia' esté en la lista de campos para que sea procesado
         fields = [
             'horario_id', 'grupo', 'materia', 'docente', 'espacio', 'periodo', 
-            'dia_semana', 'bloque_horario', 'estado', 'observaciones',
+            'dia_semana', 'bloque_horario', 'estado', 'fijado', 'docente_no_disponible', 'observaciones',
             # Campos de detalle para lectura
             'grupo_detalle', 'materia_detalle', 'docente_detalle', 'espacio_detalle', 
             'periodo_nombre', 'dia_semana_display', 'bloque_horario_detalle', 'estado_display'
         ]
+        read_only_fields = ['docente_no_disponible'] # Lo mantiene la señal de DisponibilidadDocentes
         # 'materia' es un campo de escritura (FK), no debe ser read_only aquí.
         # Los campos de detalle como 'materia_detalle' sí son read_only por definición.
 
@@ -119,3 +123,83 @@ class ConfiguracionRestriccionesSerializer(serializers.ModelSerializer):
         fields = ['restriccion_id', 'codigo_restriccion', 'descripcion', 'tipo_aplicacion', 'tipo_aplicacion_display',
                   'entidad_id_1', 'entidad_id_2', 'valor_parametro',
                   'periodo_aplicable', 'periodo_aplicable_nombre', 'esta_activa']
+
+
+class CambioEscenarioSerializer(serializers.ModelSerializer):
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+
+    def validate(self, data):
+        tipo = data.get('tipo', getattr(self.instance, 'tipo', None))
+        escenario = data.get('escenario', getattr(self.instance, 'escenario', None))
+        horario = data.get('horario', getattr(self.instance, 'horario', None))
+
+        # Si se indica el bloque sin el día, el día es el del bloque
+        bloque = data.get('bloque_horario')
+        if bloque is not None and data.get('dia_semana') is None and bloque.dia_semana is not None:
+            data['dia_semana'] = bloque.dia_semana
+
+        if tipo == 'AGREGAR':
+            faltantes = [c for c in ('grupo', 'materia', 'docente', 'espacio', 'dia_semana', 'bloque_horario')
+                         if data.get(c, getattr(self.instance, c, None)) is None]
+            if faltantes:
+                raise serializers.ValidationError({c: 'Obligatorio para un cambio de tipo AGREGAR.' for c in faltantes})
+        elif horario is None:
+            raise serializers.ValidationError({'horario': f'Obligatorio para un cambio de tipo {tipo}.'})
+        elif escenario is not None and horario.periodo_id != escenario.periodo_id:
+            raise serializers.ValidationError({'horario': 'La asignación no pertenece al período del escenario.'})
+        return data
+
+    class Meta:
+        model = CambioEscenario
+        fields = ['cambio_id', 'escenario', 'tipo', 'tipo_display', 'horario',
+                  'grupo', 'materia', 'docente', 'espacio', 'dia_semana', 'bloque_horario']
+
+class EscenarioHorarioSerializer(serializers.ModelSerializer):
+    periodo_nombre = serializers.CharField(source='periodo.nombre_periodo', read_only=True)
+    cambios = CambioEscenarioSerializer(many=True, read_only=True)
+
+    AJUSTES_VALIDOS = {'espacios_cerrados', 'docentes_no_disponibles'}
+
+    def validate_ajustes(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Debe ser un objeto JSON.')
+        desconocidos = set(value) - self.AJUSTES_VALIDOS
+        if desconocidos:
+            raise serializers.ValidationError(f'Ajustes no soportados: {sorted(desconocidos)}.')
+        for bloqueo in value.get('docentes_no_disponibles', []):
+            if not isinstance(bloqueo, dict) or 'docente_id' not in bloqueo or 'dia_semana' not in bloqueo:
+                raise serializers.ValidationError("Cada elemento de 'docentes_no_disponibles' requiere 'docente_id' y 'dia_semana'.")
+        return value
+
+    class Meta:
+        model = EscenarioHorario
+        fields = ['escenario_id', 'nombre', 'descripcion', 'periodo', 'periodo_nombre', 'ajustes',
+                  'fecha_creacion', 'cambios']
+
+class TrabajoGeneracionSerializer(serializers.ModelSerializer):
+    periodo_nombre = serializers.CharField(source='periodo.nombre_periodo', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+
+    class Meta:
+        model = TrabajoGeneracion
+        fields = ['trabajo_id', 'periodo', 'periodo_nombre', 'periodo_origen', 'estado', 'estado_display',
+                  'tiempo_limite_segundos', 'persistir_parcial', 'modo_particion', 'particiones_pendientes', 'lote',
+                  'cancelacion_solicitada', 'task_id', 'resultado', 'intentos', 'fecha_punto_control', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
+        read_only_fields = ['estado', 'particiones_pendientes', 'lote', 'cancelacion_solicitada', 'task_id', 'resultado', 'intentos',
+                            'fecha_punto_control', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
+
+class LoteGeneracionSerializer(serializers.ModelSerializer):
+    trabajos = TrabajoGeneracionSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = LoteGeneracion
+        fields = ['lote_id', 'cadenas', 'fecha_creacion', 'trabajos']
+
+class PerfilPesosSerializer(serializers.ModelSerializer):
+    periodo_nombre = serializers.CharField(source='periodo.nombre_periodo', read_only=True)
+
+    class Meta:
+        model = PerfilPesos
+        fields = ['perfil_id', 'periodo', 'periodo_nombre', 'nombre', 'activo', 'preferencia_negativa', 'preferencia_neutra',
+                  'falta_asiento', 'aula_sobredimensionada', 'turno', 'aula_no_preferida', 'fecha_creacion']
+        read_only_fields = ['fecha_creacion']
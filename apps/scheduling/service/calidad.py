@@ -0,0 +1,153 @@
+# apps/scheduling/service/calidad.py
+"""
+Calidad de un horario ya guardado (generado o editado a mano) o en memoria: penalización blanda total y por componente,
+con el desglose por grupo y por docente. Usa los mismos pesos que calculate_soft_constraint_penalties (los del
+generador o un PesosBlandos dado) y agrega los huecos y la concentración de sesiones en un mismo día, que el
+generador no mide.
+"""
+import time
+from array import array
+from collections import Counter, defaultdict
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import Grupos, HorariosAsignados
+from .schedule_generator import (
+    ScheduleGeneratorService, PesosBlandos, TURNO_CODIGOS, SIN_TURNO, R_PREFERIR_AULA_X_PARA_MATERIA_Y,
+)
+from .indices import iterar_bits
+
+PENALIZACION_HUECO = 5 # Por cada bloque libre entre la primera y la última clase del día (docente o grupo)
+PENALIZACION_MISMO_DIA = 10 # Por cada sesión de más de una misma materia de un grupo en un día
+
+# Componentes que dependen solo de cada asignación (columnas de la evaluación)
+COMPONENTES_SESION = ('preferencias', 'capacidad', 'turno', 'aula_preferida')
+
+
+class CalidadHorarioService:
+    """
+    Lee las asignaciones del período (sin las canceladas) con una sola consulta values_list y las evalúa en una
+    pasada con tablas por posición (preferencia por docente y bloque, capacidad por aula, turno por bloque),
+    guardando cada componente en una columna `array`. Los huecos salen de las máscaras de bloques de cada docente
+    y grupo por día; los bloques que se superponen con una clase no cuentan como hueco.
+    """
+
+    def __init__(self, periodo: PeriodoAcademico, stdout_ref=None, generador: ScheduleGeneratorService = None,
+                 pesos: PesosBlandos = None):
+        self.periodo = periodo
+        self.gen = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref, dry_run=True)
+        self.pesos = pesos if pesos is not None else self.gen.pesos
+        self.capacidad_espacio = {e.espacio_id: e.capacidad for e in self.gen.all_espacios}
+        # {materia_id: [valor_parametro de cada regla de aula preferida]}
+        self.aulas_preferidas = defaultdict(list)
+        for r in self.gen.all_restricciones_config:
+            if r.codigo_restriccion == R_PREFERIR_AULA_X_PARA_MATERIA_Y and r.tipo_aplicacion == "MATERIA":
+                self.aulas_preferidas[r.entidad_id_1].append(r.valor_parametro)
+
+    def _penalizacion_preferencia(self, docente_pos, bloque_pos):
+        preferencia = self.gen.disponibilidad.preferencia(docente_pos, bloque_pos, 0)
+        if preferencia < 0:
+            return -preferencia * self.pesos.preferencia_negativa
+        return self.pesos.preferencia_neutra if preferencia == 0 else 0
+
+    def _penalizacion_capacidad(self, estudiantes, capacidad):
+        if estudiantes <= 0:
+            return 0
+        if capacidad < estudiantes:
+            return (estudiantes - capacidad) * self.pesos.falta_asiento
+        return self.pesos.aula_sobredimensionada if capacidad > estudiantes * 2.5 else 0
+
+    def _huecos(self, ocupados, dia_semana):
+        """Bloques del día entre la primera y la última clase que no tienen clase ni se superponen con una."""
+        cubiertos = ocupados
+        solapados = self.gen.bloques_solapados
+        for pos in iterar_bits(ocupados):
+            cubiertos |= solapados.get(pos, 0)
+        rango = (1 << ocupados.bit_length()) - (ocupados & -ocupados)
+        return (rango & self.gen.mascara_dia[dia_semana] & ~cubiertos).bit_count()
+
+    def evaluar(self, filas=None):
+        """
+        Evalúa las asignaciones guardadas del período o, si se indican, `filas` en memoria
+        [(grupo_id, materia_id, docente_id, espacio_id, bloque_horario_id), ...] (p. ej. el horario de un dry_run).
+        """
+        inicio = time.monotonic()
+        gen = self.gen
+        grupos = {
+            grupo_id: (codigo, estudiantes or 0, TURNO_CODIGOS.get(turno, SIN_TURNO))
+            for grupo_id, codigo, estudiantes, turno in Grupos.objects.filter(periodo=self.periodo).values_list(
+                'grupo_id', 'codigo_grupo', 'numero_estudiantes_estimado', 'turno_preferente'
+            )
+        }
+        if filas is None:
+            filas = HorariosAsignados.objects.filter(periodo=self.periodo).exclude(estado='Cancelado') \
+                .values_list('grupo_id', 'materia_id', 'docente_id', 'espacio_id', 'bloque_horario_id')
+        filas = list(filas)
+
+        turno_bloque = array('b', (b.turno_codigo for b in gen.all_bloques_ordered))
+        dia_bloque = array('b', (b.dia_semana for b in gen.all_bloques_ordered))
+        columnas = {c: array('i', bytes(4 * len(filas))) for c in COMPONENTES_SESION}
+        preferencias, capacidad, turno, aula_preferida = (columnas[c] for c in COMPONENTES_SESION)
+
+        bloques_docente_dia = defaultdict(int) # {(docente_id, dia): máscara}
+        bloques_grupo_dia = defaultdict(int) # {(grupo_id, dia): máscara}
+        sesiones_clase_dia = Counter() # {(grupo_id, materia_id, dia): n}
+        sin_evaluar = 0
+        for i, (grupo_id, materia_id, docente_id, espacio_id, bloque_id) in enumerate(filas):
+            bloque_pos = gen.bloque_posiciones.get(bloque_id)
+            if bloque_pos is None:
+                sin_evaluar += 1 # Bloque que ya no existe
+                continue
+            dia = dia_bloque[bloque_pos]
+            bloques_docente_dia[(docente_id, dia)] |= 1 << bloque_pos
+            bloques_grupo_dia[(grupo_id, dia)] |= 1 << bloque_pos
+            sesiones_clase_dia[(grupo_id, materia_id, dia)] += 1
+
+            docente_pos = gen.docente_posiciones.get(docente_id)
+            capacidad_aula = self.capacidad_espacio.get(espacio_id)
+            if docente_pos is None or capacidad_aula is None:
+                sin_evaluar += 1 # Docente inactivo o aula inexistente: como en el generador, no tienen penalización blanda
+                continue
+            _, estudiantes, turno_grupo = grupos.get(grupo_id, (None, 0, SIN_TURNO))
+            preferencias[i] = self._penalizacion_preferencia(docente_pos, bloque_pos)
+            capacidad[i] = self._penalizacion_capacidad(estudiantes, capacidad_aula)
+            if turno_grupo and turno_grupo != turno_bloque[bloque_pos]:
+                turno[i] = self.pesos.turno
+            preferidas = self.aulas_preferidas.get(materia_id)
+            if preferidas:
+                aula_preferida[i] = self.pesos.aula_no_preferida * sum(1 for v in preferidas if v != str(espacio_id))
+
+        por_grupo = defaultdict(lambda: dict.fromkeys(COMPONENTES_SESION + ('huecos', 'dispersion'), 0))
+        por_docente = defaultdict(lambda: dict.fromkeys(COMPONENTES_SESION + ('huecos',), 0))
+        for i, (grupo_id, _, docente_id, _, _) in enumerate(filas):
+            del_grupo, del_docente = por_grupo[grupo_id], por_docente[docente_id]
+            for componente, columna in columnas.items():
+                del_grupo[componente] += columna[i]
+                del_docente[componente] += columna[i]
+        for (docente_id, dia), ocupados in bloques_docente_dia.items():
+            por_docente[docente_id]['huecos'] += self._huecos(ocupados, dia) * PENALIZACION_HUECO
+        for (grupo_id, dia), ocupados in bloques_grupo_dia.items():
+            por_grupo[grupo_id]['huecos'] += self._huecos(ocupados, dia) * PENALIZACION_HUECO
+        for (grupo_id, _, _), sesiones in sesiones_clase_dia.items():
+            por_grupo[grupo_id]['dispersion'] += (sesiones - 1) * PENALIZACION_MISMO_DIA
+
+        componentes = {c: sum(columna) for c, columna in columnas.items()}
+        componentes['huecos_docente'] = sum(d['huecos'] for d in por_docente.values())
+        componentes['huecos_grupo'] = sum(g['huecos'] for g in por_grupo.values())
+        componentes['dispersion'] = sum(g['dispersion'] for g in por_grupo.values())
+
+        def desglose(totales, clave, codigos):
+            filas_desglose = [{clave: entidad_id, "codigo": codigos(entidad_id), "total": sum(c.values()), **c}
+                              for entidad_id, c in totales.items()]
+            return sorted(filas_desglose, key=lambda f: (-f["total"], f[clave]))
+
+        return {
+            "periodo_id": self.periodo.pk,
+            "asignaciones": len(filas),
+            "asignaciones_sin_evaluar": sin_evaluar,
+            "penalizacion_total": sum(componentes.values()),
+            "penalizacion_blanda_generador": sum(componentes[c] for c in COMPONENTES_SESION),
+            "componentes": componentes,
+            "por_grupo": desglose(por_grupo, "grupo_id", lambda g: grupos.get(g, (None,))[0]),
+            "por_docente": desglose(por_docente, "docente_id", gen.docentes_codigos.get),
+            "duracion_segundos": round(time.monotonic() - inicio, 3),
+        }
@@ -0,0 +1,83 @@
+# apps/scheduling/service/datos_referencia.py
+"""
+Versionado de las tablas que lee el generador al construirse y clave de caché de sus datos de referencia
+(docentes, espacios, bloques, restricciones, disponibilidad y especialidades ya compilados en índices),
+y huella de todas sus entradas para memorizar el resultado de generar un período completo.
+"""
+import hashlib
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import F
+
+from apps.scheduling.models import VersionTabla
+
+# Tablas de las que dependen los datos de referencia del generador (etiquetas 'app.Modelo')
+TABLAS_DATOS_GENERADOR = (
+    'auth.User', # usuario__is_active decide qué docentes se cargan
+    'users.Docentes',
+    'users.DocenteEspecialidades',
+    'academic_setup.EspaciosFisicos',
+    'academic_setup.MateriaEspecialidadesRequeridas',
+    'scheduling.BloquesHorariosDefinicion',
+    'scheduling.ConfiguracionRestricciones',
+    'scheduling.DisponibilidadDocentes',
+)
+# Además de las anteriores, el resultado de una generación depende de los grupos y de sus materias
+TABLAS_ENTRADAS_GENERADOR = TABLAS_DATOS_GENERADOR + (
+    'scheduling.Grupos',
+    'scheduling.Grupos_materias', # Tabla intermedia de Grupos.materias (se versiona con m2m_changed)
+    'academic_setup.Materias',
+)
+# La versión de una tabla solo sube con las señales post_save, post_delete y m2m_changed (ver signals.py).
+# QuerySet.update(), bulk_create(), bulk_update() y el SQL directo no las emiten: después de escribir así en
+# estas tablas hay que llamar a registrar_cambio(tabla), o la caché seguirá sirviendo los datos anteriores.
+# Cambiar si cambia la forma de los datos guardados, para no leer entradas de una versión anterior del código
+FORMATO_DATOS_GENERADOR = 3
+TIEMPO_CACHE_DATOS_GENERADOR = 24 * 60 * 60
+# Cambiar también si cambia la búsqueda del generador: un resultado memorizado debe ser el que daría el código actual
+FORMATO_RESULTADO_GENERADOR = 3
+# Corto a propósito: un UPDATE masivo sin registrar_cambio no cambia la huella y solo se corrige al vencer
+TIEMPO_CACHE_RESULTADO_GENERADOR = 60 * 60
+
+
+def registrar_cambio(tabla):
+    """Incrementa la versión de la tabla (dentro de la transacción de la escritura que la modificó)."""
+    if not VersionTabla.objects.filter(tabla=tabla).update(version=F('version') + 1):
+        VersionTabla.objects.bulk_create([VersionTabla(tabla=tabla, version=1)], ignore_conflicts=True)
+
+
+def clave_datos_generador(periodo_id):
+    """Clave de caché de los datos de referencia de un período; cambia con cualquier escritura en sus tablas."""
+    versiones = dict(VersionTabla.objects.filter(tabla__in=TABLAS_DATOS_GENERADOR).values_list('tabla', 'version'))
+    firma = '-'.join(str(versiones.get(tabla, 0)) for tabla in TABLAS_DATOS_GENERADOR)
+    return f"scheduling:datos_generador:f{FORMATO_DATOS_GENERADOR}:p{periodo_id}:{firma}"
+
+
+def conteo_filas(tablas):
+    """
+    [(filas, pk máximo)] de cada tabla, en una sola consulta. Detecta altas y bajas hechas sin señales
+    (bulk_create, delete() por SQL), que no cambian VersionTabla; las modificaciones con UPDATE no se ven.
+    """
+    consultas = []
+    for i, tabla in enumerate(tablas):
+        meta = apps.get_model(tabla)._meta
+        consultas.append(f"SELECT {i}, COUNT(*), MAX({connection.ops.quote_name(meta.pk.column)}) "
+                         f"FROM {connection.ops.quote_name(meta.db_table)}")
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(consultas))
+        return [(filas, maximo) for _, filas, maximo in sorted(cursor.fetchall())]
+
+
+def clave_resultado_generador(periodo_id, asignaciones_fijas, pesos=()):
+    """
+    Clave de caché del resultado de generar el período completo: huella de las versiones de todas las tablas de
+    entrada y de su cantidad de filas y pk máximo, de las asignaciones confirmadas/fijadas del período, que son
+    las únicas filas de HorariosAsignados que condicionan la búsqueda, y de los pesos blandos usados. La búsqueda
+    es determinista (no hay semilla aleatoria): mismas entradas, mismo horario.
+    """
+    versiones = dict(VersionTabla.objects.filter(tabla__in=TABLAS_ENTRADAS_GENERADOR).values_list('tabla', 'version'))
+    contenido = repr(([versiones.get(tabla, 0) for tabla in TABLAS_ENTRADAS_GENERADOR], conteo_filas(TABLAS_ENTRADAS_GENERADOR),
+                      sorted(asignaciones_fijas), tuple(pesos)))
+    huella = hashlib.sha256(contenido.encode()).hexdigest()
+    return f"scheduling:resultado_generador:f{FORMATO_RESULTADO_GENERADOR}:p{periodo_id}:{huella}"
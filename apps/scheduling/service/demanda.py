@@ -0,0 +1,103 @@
+# apps/scheduling/service/demanda.py
+"""
+Demanda de sesiones semanales por (grupo, materia), compilada con una sola consulta sobre la tabla intermedia
+Grupos.materias. La usan la generación (clases a programar), sus estadísticas y los pre-chequeos.
+"""
+from array import array
+
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, Value, When
+
+from apps.scheduling.models import Grupos
+
+HORAS_ACADEMICAS_POR_SESION_ESTANDAR = 2 # Asumimos que cada bloque cubre esto
+
+
+def _expresion_sesiones():
+    """
+    Sesiones (bloques) semanales que requiere una materia según sus horas académicas totales: ceil(horas / horas por
+    sesión), 0 si no tiene horas. Se calcula en SQL (división entera de enteros).
+    """
+    horas = F('materias__horas_academicas_teoricas') + F('materias__horas_academicas_practicas') \
+        + F('materias__horas_academicas_laboratorio')
+    if HORAS_ACADEMICAS_POR_SESION_ESTANDAR > 0:
+        por_horas = ExpressionWrapper(
+            (horas + Value(HORAS_ACADEMICAS_POR_SESION_ESTANDAR - 1)) / Value(HORAS_ACADEMICAS_POR_SESION_ESTANDAR),
+            output_field=IntegerField()
+        )
+    else:
+        por_horas = Value(1)
+    return Case(When(horas__lte=0, then=Value(0)), default=por_horas, output_field=IntegerField()), horas
+
+
+class DemandaSesiones:
+    """
+    Una fila por (grupo, materia) con sesiones > 0, en columnas paralelas (`array` para los enteros). Las horas y
+    las sesiones se calculan en la consulta, así que no se instancian modelos ni se recorren materias en Python.
+    """
+
+    def __init__(self):
+        self.grupo_ids = array('q')
+        self.materia_ids = array('q')
+        self.sesiones = array('h')
+        self.carrera_ids = array('q')
+        self.ciclos = array('h')
+        self.estudiantes = array('i')
+        self.tipos_espacio = array('q') # 0 = no requiere un tipo de aula
+        self.turnos = [] # turno_preferente del grupo ('M', 'T', 'N' o None)
+        self.grupos_codigos = {} # {grupo_id: codigo_grupo}
+        self.materias_info = {} # {materia_id: (codigo_materia, nombre_materia)}
+
+    @classmethod
+    def desde_bd(cls, periodo=None, grupo_ids=None):
+        """Demanda de los grupos del período o de `grupo_ids` (lo que se indique), con una consulta values_list."""
+        filas = Grupos.materias.through.objects.all()
+        if periodo is not None:
+            filas = filas.filter(grupos__periodo=periodo)
+        if grupo_ids is not None:
+            filas = filas.filter(grupos_id__in=list(grupo_ids))
+        sesiones, horas = _expresion_sesiones()
+        filas = filas.annotate(horas=horas, sesiones=sesiones).filter(sesiones__gt=0).values_list(
+            'grupos_id', 'materias_id', 'sesiones', 'grupos__carrera_id', 'grupos__ciclo_semestral',
+            'grupos__numero_estudiantes_estimado', 'grupos__turno_preferente', 'grupos__codigo_grupo',
+            'materias__requiere_tipo_espacio_especifico_id', 'materias__codigo_materia', 'materias__nombre_materia',
+        )
+        demanda = cls()
+        for grupo_id, materia_id, n, carrera_id, ciclo, estudiantes, turno, codigo_grupo, tipo_espacio_id, \
+                codigo_materia, nombre_materia in filas.iterator():
+            demanda.grupo_ids.append(grupo_id)
+            demanda.materia_ids.append(materia_id)
+            demanda.sesiones.append(n)
+            demanda.carrera_ids.append(carrera_id)
+            demanda.ciclos.append(ciclo or 0)
+            demanda.estudiantes.append(estudiantes or 0)
+            demanda.tipos_espacio.append(tipo_espacio_id or 0)
+            demanda.turnos.append(turno)
+            demanda.grupos_codigos[grupo_id] = codigo_grupo
+            demanda.materias_info[materia_id] = (codigo_materia, nombre_materia)
+        return demanda
+
+    def __len__(self):
+        return len(self.grupo_ids)
+
+    @property
+    def total_sesiones(self):
+        return sum(self.sesiones)
+
+    def subconjunto(self, grupo_ids):
+        """Demanda solo de `grupo_ids`, sin volver a consultar."""
+        grupo_ids = set(grupo_ids)
+        demanda = type(self)()
+        for i, grupo_id in enumerate(self.grupo_ids):
+            if grupo_id not in grupo_ids:
+                continue
+            for columna in ('grupo_ids', 'materia_ids', 'sesiones', 'carrera_ids', 'ciclos', 'estudiantes', 'tipos_espacio', 'turnos'):
+                getattr(demanda, columna).append(getattr(self, columna)[i])
+            demanda.grupos_codigos[grupo_id] = self.grupos_codigos[grupo_id]
+            materia_id = self.materia_ids[i]
+            demanda.materias_info[materia_id] = self.materias_info[materia_id]
+        return demanda
+
+    def filas(self):
+        """(grupo_id, materia_id, sesiones, carrera_id, ciclo, estudiantes, tipo_espacio_id, turno) por fila."""
+        return zip(self.grupo_ids, self.materia_ids, self.sesiones, self.carrera_ids, self.ciclos,
+                   self.estudiantes, self.tipos_espacio, self.turnos)
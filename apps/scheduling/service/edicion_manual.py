@@ -0,0 +1,160 @@
+# apps/scheduling/service/edicion_manual.py
+"""
+Movimiento e intercambio de asignaciones desde la edición manual del horario. Cada cambio se valida contra una
+foto en memoria del horario del período (los índices de ocupación del generador) y se aplica en una transacción.
+"""
+from django.db import IntegrityError, transaction
+
+from apps.scheduling.models import HorariosAsignados
+from .demanda import DemandaSesiones
+from .schedule_generator import ScheduleGeneratorService
+
+# Motivos por los que se rechaza una asignación propuesta
+MOTIVOS_CONFLICTO = {
+    'GRUPO_OCUPADO': "El grupo ya tiene clase en ese bloque o en uno que se superpone.",
+    'DOCENTE_OCUPADO': "El docente ya tiene clase en ese bloque o en uno que se superpone.",
+    'ESPACIO_OCUPADO': "El aula ya está ocupada en ese bloque o en uno que se superpone.",
+    'DOCENTE_NO_DISPONIBLE': "El docente no está disponible en ese bloque.",
+    'DOCENTE_SIN_ESPECIALIDAD': "El docente no tiene todas las especialidades que exige la materia.",
+    'DOCENTE_INACTIVO': "El docente no está activo.",
+    'TOPE_DIARIO_DOCENTE': "El docente alcanzó su máximo de horas en ese día.",
+    'ESPACIO_INCOMPATIBLE': "El aula no es del tipo requerido o no tiene capacidad para el grupo.",
+    'REGLA_DURA': "Una restricción dura configurada impide la asignación.",
+}
+
+
+class ConflictoEdicion(Exception):
+    """El cambio propuesto choca con el horario o con las reglas; `conflictos` trae el detalle."""
+
+    def __init__(self, conflictos):
+        super().__init__("El cambio propuesto genera conflictos.")
+        self.conflictos = conflictos
+
+
+class EdicionHorarioService:
+    """
+    La foto se toma con una consulta al inicio de cada operación, después de bloquear las filas que se editan;
+    cada verificación son lecturas de máscaras de bits. Si otro coordinador escribe en la misma franja entre la
+    foto y la escritura, las restricciones únicas de la tabla lo detectan y se informa como conflicto.
+    """
+
+    def __init__(self, periodo, stdout_ref=None, generador: ScheduleGeneratorService = None):
+        self.periodo = periodo
+        self.gen = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref, dry_run=True)
+        self.bloques_por_id = {b.bloque_def_id: b for b in self.gen.all_bloques_ordered}
+        self.espacios_por_id = {e.espacio_id: e for e in self.gen.all_espacios}
+
+    def _clases(self, grupo_ids):
+        demanda = DemandaSesiones.desde_bd(grupo_ids=grupo_ids)
+        return {(c.grupo_id, c.materia_id): c for c in self.gen.crear_lista_clases_para_programar([], demanda)}
+
+    def _liberar(self, horario):
+        gen = self.gen
+        bloque = self.bloques_por_id.get(horario.bloque_horario_id)
+        if bloque is not None:
+            gen.ocupacion.liberar(gen.docente_posiciones.get(horario.docente_id), gen.espacio_posiciones.get(horario.espacio_id),
+                                  horario.grupo_id, bloque.indice)
+
+    def _ocupar(self, horario):
+        gen = self.gen
+        bloque = self.bloques_por_id[horario.bloque_horario_id]
+        gen.ocupacion.ocupar(gen.docente_posiciones.get(horario.docente_id), gen.espacio_posiciones.get(horario.espacio_id),
+                             horario.grupo_id, bloque.indice)
+
+    def conflictos(self, clase, docente_id, espacio_id, bloque):
+        """Motivos (códigos de MOTIVOS_CONFLICTO) por los que la asignación no es válida en la ocupación actual."""
+        gen = self.gen
+        motivos = []
+        if gen.ocupacion.grupo_ocupado(clase.grupo_id, bloque.indice):
+            motivos.append('GRUPO_OCUPADO')
+
+        docente_pos = gen.docente_posiciones.get(docente_id)
+        if docente_pos is None:
+            motivos.append('DOCENTE_INACTIVO')
+        else:
+            if gen.ocupacion.docente_ocupado(docente_pos, bloque.indice):
+                motivos.append('DOCENTE_OCUPADO')
+            if not gen.disponibilidad.disponible(docente_pos, bloque.indice):
+                motivos.append('DOCENTE_NO_DISPONIBLE')
+            if not gen.mascara_docentes_elegibles(clase.materia_id) >> docente_pos & 1:
+                motivos.append('DOCENTE_SIN_ESPECIALIDAD')
+            if gen.ocupacion.sesiones_docente_en(docente_pos, gen.mascara_dia[bloque.dia_semana]) >= gen.max_sesiones_dia_docente[docente_id]:
+                motivos.append('TOPE_DIARIO_DOCENTE')
+
+        espacio = self.espacios_por_id.get(espacio_id)
+        if espacio is None or espacio not in gen.espacios_compatibles(clase):
+            motivos.append('ESPACIO_INCOMPATIBLE')
+        elif gen.ocupacion.espacio_ocupado(espacio.indice, bloque.indice):
+            motivos.append('ESPACIO_OCUPADO')
+
+        if not gen.check_hard_configured_constraints(clase, docente_id, espacio_id, bloque):
+            motivos.append('REGLA_DURA')
+        return motivos
+
+    def _validar(self, horario, clases):
+        """Valida `horario` (ya con sus nuevos valores) y lo ocupa; devuelve el detalle de sus conflictos."""
+        bloque = self.bloques_por_id.get(horario.bloque_horario_id)
+        clase = clases.get((horario.grupo_id, horario.materia_id))
+        if bloque is None or clase is None:
+            return [{"horario_id": horario.pk, "codigo": 'MATERIA_FUERA_DEL_GRUPO' if bloque else 'BLOQUE_INEXISTENTE',
+                     "mensaje": "La materia ya no pertenece al grupo." if bloque else "El bloque no existe."}]
+        motivos = self.conflictos(clase, horario.docente_id, horario.espacio_id, bloque)
+        self._ocupar(horario)
+        return [{"horario_id": horario.pk, "codigo": m, "mensaje": MOTIVOS_CONFLICTO[m]} for m in motivos]
+
+    def _aplicar(self, horarios, nuevos_valores, dry_run):
+        """
+        Bloquea las filas, toma la foto, valida las asignaciones con sus nuevos valores y, si no hay conflictos
+        (y no es dry_run), las guarda. `nuevos_valores` es {horario_id: {campo: valor}}.
+        """
+        with transaction.atomic():
+            filas = {h.pk: h for h in HorariosAsignados.objects.select_for_update().filter(pk__in=[h.pk for h in horarios])}
+            self.gen.cargar_horario_actual()
+            for horario in filas.values():
+                self._liberar(horario)
+            clases = self._clases({h.grupo_id for h in filas.values()})
+
+            editados = []
+            conflictos = []
+            for horario_id, valores in nuevos_valores.items():
+                horario = filas[horario_id]
+                for campo, valor in valores.items():
+                    setattr(horario, campo, valor)
+                horario.docente_no_disponible = False # Validado contra la disponibilidad actual
+                conflictos.extend(self._validar(horario, clases))
+                editados.append(horario)
+            if conflictos:
+                raise ConflictoEdicion(conflictos)
+            if dry_run:
+                return editados
+
+            campos = ['docente', 'espacio', 'dia_semana', 'bloque_horario', 'docente_no_disponible']
+            try:
+                with transaction.atomic():
+                    if len(editados) > 1:
+                        # En un intercambio una fila ocupa la franja de la otra: primero se las saca de la franja con
+                        # un día provisional único (-horario_id) para no chocar con las restricciones únicas de la tabla
+                        for horario in editados:
+                            HorariosAsignados.objects.filter(pk=horario.pk).update(dia_semana=-horario.pk)
+                    for horario in editados:
+                        horario.save(update_fields=campos)
+            except IntegrityError:
+                raise ConflictoEdicion([{"horario_id": None, "codigo": 'CONFLICTO_CONCURRENTE',
+                                         "mensaje": "Otra edición ocupó la franja mientras se guardaba el cambio."}])
+        return editados
+
+    def mover(self, horario: HorariosAsignados, bloque, docente_id=None, espacio_id=None, dry_run=False):
+        """Mueve la asignación a `bloque` (BloquesHorariosDefinicion), opcionalmente con otro docente o aula."""
+        valores = {'bloque_horario_id': bloque.bloque_def_id, 'dia_semana': bloque.dia_semana}
+        if docente_id is not None:
+            valores['docente_id'] = docente_id
+        if espacio_id is not None:
+            valores['espacio_id'] = espacio_id
+        return self._aplicar([horario], {horario.pk: valores}, dry_run)
+
+    def intercambiar(self, horario_a: HorariosAsignados, horario_b: HorariosAsignados, dry_run=False):
+        """Intercambia los bloques de dos asignaciones; cada una conserva su docente y su aula."""
+        return self._aplicar([horario_a, horario_b], {
+            horario_a.pk: {'bloque_horario_id': horario_b.bloque_horario_id, 'dia_semana': horario_b.dia_semana},
+            horario_b.pk: {'bloque_horario_id': horario_a.bloque_horario_id, 'dia_semana': horario_a.dia_semana},
+        }, dry_run)
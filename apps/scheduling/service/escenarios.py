@@ -0,0 +1,129 @@
+# apps/scheduling/service/escenarios.py
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import HorariosAsignados, EscenarioHorario
+from .schedule_generator import ScheduleGeneratorService, CAMPOS_ASIGNACION
+from .evaluador import EvaluadorHorario
+
+# Métricas del puntaje que se restan entre escenario y horario publicado
+METRICAS_COMPARABLES = (
+    'asignaciones', 'cruces_docente', 'cruces_espacio', 'cruces_grupo', 'exceso_horas_dia_docente',
+    'violaciones_duras', 'penalizacion_blanda', 'sesiones_cubiertas', 'cobertura', 'costo',
+)
+
+
+class EscenarioService:
+    """
+    Materializa y evalúa escenarios "¿qué pasa si...?" de un período. El horario publicado se lee y evalúa
+    una sola vez; cada escenario se evalúa aplicando sus diferencias al evaluador incremental y deshaciéndolas,
+    de modo que comparar muchos escenarios cuesta lo que suman sus cambios, no lo que mide el horario.
+    """
+
+    def __init__(self, periodo: PeriodoAcademico, generador: ScheduleGeneratorService = None, stdout_ref=None):
+        self.periodo = periodo
+        # Reutilizamos los índices del generador (disponibilidad, especialidades, reglas); no se escribe nada en la BD
+        self.generador = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref)
+        self.logger = self.generador.logger
+        self._base = None
+        self._evaluador = None
+
+    def asignaciones_base(self):
+        """{horario_id: asignacion} del horario publicado (sin las canceladas), leído una sola vez."""
+        if self._base is None:
+            filas = HorariosAsignados.objects.filter(periodo=self.periodo).exclude(estado='Cancelado') \
+                .values_list('horario_id', *CAMPOS_ASIGNACION)
+            self._base = {fila[0]: fila[1:] for fila in filas.iterator()}
+        return self._base
+
+    def evaluador_base(self):
+        if self._evaluador is None:
+            self._evaluador = EvaluadorHorario(self.generador).cargar(self.asignaciones_base().values())
+        return self._evaluador
+
+    def diferencias(self, escenario: EscenarioHorario):
+        """
+        Resuelve los cambios del escenario, en orden, contra el horario publicado.
+        Devuelve ({horario_id: asignacion nueva o None si se quita}, [asignaciones agregadas]).
+        """
+        base = self.asignaciones_base()
+        reemplazos = {}
+        agregadas = []
+        cambios = escenario.cambios.order_by('cambio_id').values_list('tipo', 'horario_id', *CAMPOS_ASIGNACION)
+        for tipo, horario_id, *valores in cambios:
+            if tipo == 'AGREGAR':
+                agregadas.append(tuple(valores))
+                continue
+            if horario_id not in base:
+                continue # La asignación ya no está publicada
+            actual = reemplazos.get(horario_id, base[horario_id])
+            if tipo == 'QUITAR' or actual is None:
+                reemplazos[horario_id] = None
+            else: # MODIFICAR: los campos en null conservan el valor vigente
+                reemplazos[horario_id] = tuple(nuevo if nuevo is not None else previo for nuevo, previo in zip(valores, actual))
+        return reemplazos, agregadas
+
+    @staticmethod
+    def leer_ajustes(escenario: EscenarioHorario):
+        """Traduce `escenario.ajustes` a (espacios_cerrados, {(docente_id, dia_semana, bloque_horario_id o None)})."""
+        ajustes = escenario.ajustes or {}
+        espacios_cerrados = {int(e) for e in ajustes.get('espacios_cerrados', [])}
+        docentes_no_disponibles = {
+            (int(d['docente_id']), int(d['dia_semana']), int(d['bloque_horario_id']) if d.get('bloque_horario_id') else None)
+            for d in ajustes.get('docentes_no_disponibles', [])
+        }
+        return espacios_cerrados, docentes_no_disponibles
+
+    def materializar(self, escenario: EscenarioHorario):
+        """Horario completo del escenario (se arma al leerlo; no se guarda)."""
+        reemplazos, agregadas = self.diferencias(escenario)
+        filas = []
+        for horario_id, asignacion in self.asignaciones_base().items():
+            origen = 'PUBLICADA'
+            if horario_id in reemplazos:
+                asignacion = reemplazos[horario_id]
+                origen = 'MODIFICADA'
+                if asignacion is None:
+                    continue
+            filas.append(dict(zip(CAMPOS_ASIGNACION, asignacion), horario_id=horario_id, origen=origen))
+        for asignacion in agregadas:
+            filas.append(dict(zip(CAMPOS_ASIGNACION, asignacion), horario_id=None, origen='AGREGADA'))
+        return filas
+
+    def evaluar(self, escenario: EscenarioHorario):
+        evaluador = self.evaluador_base()
+        base = self.asignaciones_base()
+        puntaje_base = evaluador.puntaje()
+
+        reemplazos, agregadas = self.diferencias(escenario)
+        quitadas = [base[h] for h in reemplazos if evaluador.quitar(base[h])]
+        nuevas = [a for a in reemplazos.values() if a is not None] + agregadas
+        for asignacion in nuevas:
+            evaluador.agregar(asignacion)
+        ajustes_aplicados = evaluador.aplicar_ajustes(*self.leer_ajustes(escenario))
+
+        puntaje = evaluador.puntaje()
+
+        # Deshacer en orden inverso para dejar el evaluador como el horario publicado
+        evaluador.deshacer_ajustes(ajustes_aplicados)
+        for asignacion in nuevas:
+            evaluador.quitar(asignacion)
+        for asignacion in quitadas:
+            evaluador.agregar(asignacion)
+
+        return {
+            "escenario_id": escenario.escenario_id,
+            "nombre": escenario.nombre,
+            "cambios": {
+                "quitadas": sum(1 for a in reemplazos.values() if a is None),
+                "modificadas": sum(1 for a in reemplazos.values() if a is not None),
+                "agregadas": len(agregadas),
+            },
+            "puntaje": puntaje,
+            "diferencia": {m: round(puntaje[m] - puntaje_base[m], 2) for m in METRICAS_COMPARABLES},
+        }
+
+    def comparar(self, escenarios):
+        return {
+            "periodo_id": self.periodo.pk,
+            "publicado": self.evaluador_base().puntaje(),
+            "escenarios": [self.evaluar(escenario) for escenario in escenarios],
+        }
@@ -0,0 +1,220 @@
+# apps/scheduling/service/evaluador.py
+from collections import defaultdict, Counter
+
+from apps.scheduling.models import Grupos
+from .demanda import DemandaSesiones
+from .schedule_generator import ScheduleGeneratorService, ClaseParaProgramar, TURNO_CODIGOS, SIN_TURNO
+
+# Pesos del costo escalar: un problema duro pesa más que cualquier suma razonable de penalizaciones blandas
+PESO_PROBLEMA_DURO = 1000
+PESO_SESION_FALTANTE = 100
+
+
+class EvaluadorHorario:
+    """
+    Evaluador incremental de un horario completo, sobre los índices compactos del generador.
+    Las asignaciones son tuplas (grupo_id, materia_id, docente_id, espacio_id, dia_semana, bloque_horario_id).
+    `agregar` y `quitar` actualizan el puntaje en O(1) (más las reglas configuradas), así que evaluar una
+    variante de un horario ya evaluado cuesta lo que su diferencia: se aplica el cambio, se lee el puntaje
+    y se deshace con la operación inversa.
+    """
+
+    def __init__(self, generador: ScheduleGeneratorService):
+        self.gen = generador
+        self.bloques_por_id = {b.bloque_def_id: b for b in generador.all_bloques_ordered}
+        self.espacios_por_id = {e.espacio_id: e for e in generador.all_espacios}
+
+        # Ajustes de datos (escenarios): aulas cerradas y bloqueos de docentes {(docente_id, dia_semana, bloque_id o None)}
+        self.espacios_cerrados = set()
+        self.docentes_no_disponibles = set()
+
+        self._cargar_demanda()
+        self._evaluaciones = {} # {asignacion: (violaciones_duras, penalizacion)} de las asignaciones estáticas
+        self._espacios_compatibles = {} # {(tipo_espacio, estudiantes): set de espacio_id}
+        self.limpiar()
+
+    def _cargar_demanda(self):
+        """Datos de grupos y sesiones necesarias por (grupo, materia) del período, con dos consultas."""
+        periodo = self.gen.periodo
+        self.grupos = {
+            grupo_id: (carrera_id, ciclo or 0, estudiantes or 0, TURNO_CODIGOS.get(turno, SIN_TURNO))
+            for grupo_id, carrera_id, ciclo, estudiantes, turno in Grupos.objects.filter(periodo=periodo).values_list(
+                'grupo_id', 'carrera_id', 'ciclo_semestral', 'numero_estudiantes_estimado', 'turno_preferente'
+            )
+        }
+        demanda = DemandaSesiones.desde_bd(periodo=periodo)
+        self.tipo_espacio_materia = dict(zip(demanda.materia_ids, demanda.tipos_espacio))
+        self.sesiones_necesarias = dict(zip(zip(demanda.grupo_ids, demanda.materia_ids), demanda.sesiones))
+        self.sesiones_requeridas = demanda.total_sesiones
+
+    def limpiar(self):
+        self.asignaciones = Counter() # Multiconjunto de las asignaciones evaluadas
+        self.conteo_docente = defaultdict(int) # {(docente_id, bloque_id): n}
+        self.conteo_espacio = defaultdict(int) # {(espacio_id, bloque_id): n}
+        self.conteo_grupo = defaultdict(int) # {(grupo_id, bloque_id): n}
+        self.sesiones_docente_dia = defaultdict(int) # {(docente_id, dia_semana): n}
+        self.sesiones_clase = defaultdict(int) # {(grupo_id, materia_id): n}
+
+        self.total_asignaciones = 0
+        self.cruces_docente = 0
+        self.cruces_espacio = 0
+        self.cruces_grupo = 0
+        self.exceso_diario = 0
+        self.violaciones_duras = 0
+        self.penalizacion_blanda = 0
+        self.sesiones_cubiertas = 0
+
+    def _clase(self, grupo_id, materia_id):
+        carrera_id, ciclo, estudiantes, turno = self.grupos.get(grupo_id, (None, 0, 0, SIN_TURNO))
+        return ClaseParaProgramar(
+            grupo_id=grupo_id, materia_id=materia_id, carrera_id=carrera_id, ciclo=ciclo,
+            num_estudiantes=estudiantes, tipo_espacio_requerido=self.tipo_espacio_materia.get(materia_id, 0),
+            turno=turno, sesiones_necesarias=self.sesiones_necesarias.get((grupo_id, materia_id), 0)
+        )
+
+    def _espacio_compatible(self, clase, espacio_id):
+        clave = (clase.tipo_espacio_requerido, clase.num_estudiantes)
+        compatibles = self._espacios_compatibles.get(clave)
+        if compatibles is None:
+            compatibles = self._espacios_compatibles[clave] = {e.espacio_id for e in self.gen.espacios_compatibles(clase)}
+        return espacio_id in compatibles
+
+    def _evaluar(self, asignacion):
+        """(violaciones duras, penalización blanda) de una asignación por sí sola; se cachea."""
+        resultado = self._evaluaciones.get(asignacion)
+        if resultado is not None:
+            return resultado
+
+        grupo_id, materia_id, docente_id, espacio_id, dia_semana, bloque_id = asignacion
+        gen = self.gen
+        violaciones = 0
+        penalizacion = 0
+        bloque = self.bloques_por_id.get(bloque_id)
+        if bloque is None or bloque.dia_semana != dia_semana:
+            violaciones += 1 # Bloque inexistente o día inconsistente con el bloque
+        else:
+            clase = self._clase(grupo_id, materia_id)
+            docente_pos = gen.docente_posiciones.get(docente_id)
+            espacio = self.espacios_por_id.get(espacio_id)
+
+            if docente_pos is None:
+                violaciones += 1 # Docente inactivo
+            else:
+                if not gen.disponibilidad.disponible(docente_pos, bloque.indice):
+                    violaciones += 1
+                if not gen.mascara_docentes_elegibles(materia_id) >> docente_pos & 1:
+                    violaciones += 1
+            if (docente_id, dia_semana, None) in self.docentes_no_disponibles or \
+                    (docente_id, dia_semana, bloque_id) in self.docentes_no_disponibles:
+                violaciones += 1
+            if espacio is None or espacio_id in self.espacios_cerrados:
+                violaciones += 1
+            elif not self._espacio_compatible(clase, espacio_id):
+                violaciones += 1
+            if not gen.check_hard_configured_constraints(clase, docente_id, espacio_id, bloque):
+                violaciones += 1
+            if docente_pos is not None and espacio is not None:
+                penalizacion = gen.calculate_soft_constraint_penalties(clase, docente_pos, espacio, bloque)
+
+        resultado = self._evaluaciones[asignacion] = (violaciones, penalizacion)
+        return resultado
+
+    @staticmethod
+    def _delta_exceso(conteo, clave, signo, limite):
+        """Actualiza un contador y devuelve cuánto cambió su exceso sobre `limite`."""
+        antes = conteo[clave]
+        despues = antes + signo
+        conteo[clave] = despues
+        return max(0, despues - limite) - max(0, antes - limite)
+
+    def _aplicar(self, asignacion, signo):
+        grupo_id, materia_id, docente_id, espacio_id, dia_semana, bloque_id = asignacion
+        self.asignaciones[asignacion] += signo
+        if not self.asignaciones[asignacion]:
+            del self.asignaciones[asignacion]
+        self.total_asignaciones += signo
+
+        self.cruces_docente += self._delta_exceso(self.conteo_docente, (docente_id, bloque_id), signo, 1)
+        self.cruces_espacio += self._delta_exceso(self.conteo_espacio, (espacio_id, bloque_id), signo, 1)
+        self.cruces_grupo += self._delta_exceso(self.conteo_grupo, (grupo_id, bloque_id), signo, 1)
+        self.exceso_diario += self._delta_exceso(
+            self.sesiones_docente_dia, (docente_id, dia_semana), signo, self.gen.max_sesiones_dia_docente[docente_id]
+        )
+
+        necesarias = self.sesiones_necesarias.get((grupo_id, materia_id), 0)
+        antes = self.sesiones_clase[(grupo_id, materia_id)]
+        self.sesiones_clase[(grupo_id, materia_id)] = antes + signo
+        self.sesiones_cubiertas += min(antes + signo, necesarias) - min(antes, necesarias)
+
+        violaciones, penalizacion = self._evaluar(asignacion)
+        self.violaciones_duras += signo * violaciones
+        self.penalizacion_blanda += signo * penalizacion
+
+    def agregar(self, asignacion):
+        self._aplicar(asignacion, 1)
+
+    def quitar(self, asignacion):
+        """Quita una asignación si está presente; devuelve si se quitó."""
+        if not self.asignaciones.get(asignacion):
+            return False
+        self._aplicar(asignacion, -1)
+        return True
+
+    def cargar(self, asignaciones):
+        for asignacion in asignaciones:
+            self._aplicar(asignacion, 1)
+        return self
+
+    def _afectadas_por_ajustes(self, espacios_cerrados, docentes_no_disponibles):
+        espacios = set(espacios_cerrados)
+        docentes = {d for d, _, _ in docentes_no_disponibles}
+        return [a for a in self.asignaciones if a[3] in espacios or a[2] in docentes]
+
+    def aplicar_ajustes(self, espacios_cerrados=(), docentes_no_disponibles=()):
+        """
+        Activa ajustes de datos y re-evalúa solo las asignaciones que tocan esas aulas o docentes.
+        Devuelve lo que hay que pasarle a `deshacer_ajustes` para volver al estado anterior.
+        """
+        nuevos_espacios = set(espacios_cerrados) - self.espacios_cerrados
+        nuevos_bloqueos = set(docentes_no_disponibles) - self.docentes_no_disponibles
+        self._reevaluar(nuevos_espacios, nuevos_bloqueos, activar=True)
+        return nuevos_espacios, nuevos_bloqueos
+
+    def deshacer_ajustes(self, ajustes_aplicados):
+        espacios, bloqueos = ajustes_aplicados
+        self._reevaluar(espacios, bloqueos, activar=False)
+
+    def _reevaluar(self, espacios, bloqueos, activar):
+        if not espacios and not bloqueos:
+            return
+        afectadas = [(a, self.asignaciones[a]) for a in self._afectadas_por_ajustes(espacios, bloqueos)]
+        for asignacion, veces in afectadas:
+            for _ in range(veces):
+                self._aplicar(asignacion, -1)
+            self._evaluaciones.pop(asignacion, None)
+        if activar:
+            self.espacios_cerrados |= espacios
+            self.docentes_no_disponibles |= bloqueos
+        else:
+            self.espacios_cerrados -= espacios
+            self.docentes_no_disponibles -= bloqueos
+        for asignacion, veces in afectadas:
+            for _ in range(veces):
+                self._aplicar(asignacion, 1)
+
+    def puntaje(self):
+        problemas_duros = self.cruces_docente + self.cruces_espacio + self.cruces_grupo + self.exceso_diario + self.violaciones_duras
+        sin_programar = self.sesiones_requeridas - self.sesiones_cubiertas
+        return {
+            "asignaciones": self.total_asignaciones,
+            "cruces_docente": self.cruces_docente,
+            "cruces_espacio": self.cruces_espacio,
+            "cruces_grupo": self.cruces_grupo,
+            "exceso_horas_dia_docente": self.exceso_diario,
+            "violaciones_duras": self.violaciones_duras,
+            "penalizacion_blanda": self.penalizacion_blanda,
+            "sesiones_requeridas": self.sesiones_requeridas,
+            "sesiones_cubiertas": self.sesiones_cubiertas,
+            "cobertura": round(100.0 * self.sesiones_cubiertas / self.sesiones_requeridas, 1) if self.sesiones_requeridas else 100.0,
+            "costo": problemas_duros * PESO_PROBLEMA_DURO + sin_programar * PESO_SESION_FALTANTE + self.penalizacion_blanda,
+        }
@@ -0,0 +1,171 @@
+# apps/scheduling/service/feasibility_analyzer.py
+from collections import defaultdict
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import Grupos
+from .indices import iterar_bits
+from .demanda import DemandaSesiones
+from .schedule_generator import ScheduleGeneratorService, TURNOS_CICLOS_MAP, TURNO_CODIGOS, ESTUDIANTES_POR_DEFECTO
+
+# Umbrales de capacidad (n.º de estudiantes) con los que se agrupa la demanda de aulas
+BANDAS_CAPACIDAD = (0, 20, 30, 40, 60, 100)
+
+
+class FeasibilityAnalyzerService:
+    """
+    Pre-chequeo de factibilidad de un período, sin ejecutar el generador.
+    Para cada turno compara las sesiones requeridas contra la oferta de bloques de grupos,
+    de docentes (por conjunto de especialidades requeridas) y de aulas (por tipo y banda de capacidad).
+    Todas las comparaciones son condiciones necesarias: un déficit garantiza sesiones sin programar,
+    pero la ausencia de déficit no garantiza que el generador las ubique todas.
+    """
+
+    def __init__(self, periodo: PeriodoAcademico, generador: ScheduleGeneratorService = None, stdout_ref=None):
+        self.periodo = periodo
+        # Reutilizamos los índices compactos (bitmaps) que carga el generador; no se escribe nada en la BD
+        self.generador = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref)
+        self.logger = self.generador.logger
+
+    def _cargar_demanda(self):
+        """Sesiones requeridas por (grupo, materia), compiladas con una sola consulta (DemandaSesiones)."""
+        return [
+            (grupo_id, ciclo, estudiantes or ESTUDIANTES_POR_DEFECTO, materia_id, tipo_espacio_id, sesiones)
+            for grupo_id, materia_id, sesiones, _, ciclo, estudiantes, tipo_espacio_id, _
+            in DemandaSesiones.desde_bd(periodo=self.periodo).filas()
+        ]
+
+    def _capacidad_docentes_en_turno(self, mascara_turno):
+        """Sesiones que cada docente puede dar en el turno: disponibilidad por día acotada por su máximo diario."""
+        gen = self.generador
+        capacidad = {}
+        for docente_pos, docente_id in enumerate(gen.all_docente_ids):
+            disponibles = gen.disponibilidad.bloques_libres(docente_pos) & mascara_turno
+            if not disponibles:
+                continue
+            max_dia = gen.max_sesiones_dia_docente[docente_id]
+            capacidad[docente_pos] = sum(
+                min((disponibles & mascara_dia).bit_count(), max_dia) for mascara_dia in gen.mascara_dia.values()
+            )
+        return capacidad
+
+    def _analizar_turno(self, turno_codigo, demanda_turno):
+        gen = self.generador
+        turno_cod_int = TURNO_CODIGOS[turno_codigo]
+        bloques_turno = [b for b in gen.all_bloques_ordered if b.turno_codigo == turno_cod_int]
+        num_bloques = len(bloques_turno)
+        mascara_turno = 0
+        for b in bloques_turno:
+            mascara_turno |= 1 << b.indice
+
+        total_sesiones = sum(fila[5] for fila in demanda_turno)
+        problemas = []
+
+        # 1. Grupos: cada grupo tiene a lo sumo un bloque por sesión dentro del turno
+        sesiones_por_grupo = defaultdict(int)
+        for grupo_id, _, _, _, _, sesiones in demanda_turno:
+            sesiones_por_grupo[grupo_id] += sesiones
+        grupos_excedidos = sorted(g for g, s in sesiones_por_grupo.items() if s > num_bloques)
+        if grupos_excedidos:
+            problemas.append(f"{len(grupos_excedidos)} grupos requieren más sesiones que los {num_bloques} bloques del turno.")
+
+        # 2. Docentes: oferta de docente-bloques por conjunto de especialidades requeridas
+        capacidad_docentes = self._capacidad_docentes_en_turno(mascara_turno)
+        demanda_por_materia = defaultdict(int)
+        for _, _, _, materia_id, _, sesiones in demanda_turno:
+            demanda_por_materia[materia_id] += sesiones
+        demanda_por_mascara = defaultdict(int)
+        materias_por_mascara = defaultdict(list)
+        for materia_id, sesiones in demanda_por_materia.items():
+            mascara = gen.especialidades_index.mascara_materia(materia_id)
+            demanda_por_mascara[mascara] += sesiones
+            materias_por_mascara[mascara].append(materia_id)
+
+        posiciones_especialidad = {pos: esp_id for esp_id, pos in gen.especialidades_index.bits.items()}
+        docentes = []
+        for mascara, demanda in demanda_por_mascara.items():
+            elegibles = gen.mascara_docentes_elegibles(materias_por_mascara[mascara][0])
+            oferta = sum(capacidad_docentes.get(pos, 0) for pos in iterar_bits(elegibles))
+            especialidades = sorted(posiciones_especialidad[pos] for pos in iterar_bits(mascara))
+            docentes.append({
+                "especialidades_requeridas": especialidades,
+                "materias": sorted(materias_por_mascara[mascara]),
+                "docentes_elegibles": elegibles.bit_count(),
+                "sesiones_requeridas": demanda,
+                "docente_bloques_ofertados": oferta,
+                "deficit": max(demanda - oferta, 0),
+            })
+            if demanda > oferta:
+                problemas.append(f"Especialidades {especialidades or 'ninguna'}: se requieren {demanda} sesiones y solo hay {oferta} docente-bloques.")
+        oferta_docentes_total = sum(capacidad_docentes.values())
+        if total_sesiones > oferta_docentes_total:
+            problemas.append(f"Se requieren {total_sesiones} sesiones y los docentes solo ofrecen {oferta_docentes_total} bloques en total.")
+
+        # 3. Aulas: oferta de aula-bloques por tipo de espacio y banda de capacidad (0 = cualquier tipo)
+        espacios = []
+        tipos = {0} | {fila[4] for fila in demanda_turno}
+        for tipo_espacio_id in sorted(tipos):
+            demanda_tipo = [f for f in demanda_turno if tipo_espacio_id == 0 or f[4] == tipo_espacio_id]
+            aulas_tipo = [e for e in gen.all_espacios if tipo_espacio_id == 0 or e.tipo_espacio_id == tipo_espacio_id]
+            for umbral in BANDAS_CAPACIDAD:
+                demanda = sum(f[5] for f in demanda_tipo if f[2] >= umbral)
+                if not demanda:
+                    continue
+                aulas = sum(1 for e in aulas_tipo if e.capacidad >= umbral)
+                oferta = aulas * num_bloques
+                espacios.append({
+                    "tipo_espacio_id": tipo_espacio_id or None,
+                    "capacidad_minima": umbral,
+                    "aulas": aulas,
+                    "sesiones_requeridas": demanda,
+                    "aula_bloques_ofertados": oferta,
+                    "deficit": max(demanda - oferta, 0),
+                })
+                if demanda > oferta:
+                    problemas.append(
+                        f"Aulas{' de tipo ' + str(tipo_espacio_id) if tipo_espacio_id else ''} con capacidad >= {umbral}: "
+                        f"se requieren {demanda} sesiones y solo hay {oferta} aula-bloques."
+                    )
+
+        return {
+            "turno": turno_codigo,
+            "bloques": num_bloques,
+            "grupos": len(sesiones_por_grupo),
+            "sesiones_requeridas": total_sesiones,
+            "grupo_bloques_ofertados": len(sesiones_por_grupo) * num_bloques,
+            "grupos_excedidos": grupos_excedidos,
+            "docente_bloques_ofertados": oferta_docentes_total,
+            "docentes": docentes,
+            "espacios": espacios,
+            "factible": not problemas,
+            "problemas": problemas,
+        }
+
+    def analizar(self):
+        self.logger.info(f"Analizando factibilidad del período {self.periodo.nombre_periodo}...")
+        demanda = self._cargar_demanda()
+
+        turno_por_ciclo = {ciclo: turno for turno, ciclos in TURNOS_CICLOS_MAP.items() for ciclo in ciclos}
+        demanda_por_turno = defaultdict(list)
+        sesiones_sin_turno = 0
+        for fila in demanda:
+            turno = turno_por_ciclo.get(fila[1])
+            if turno is None:
+                sesiones_sin_turno += fila[5] # El generador masivo no programa grupos sin ciclo mapeado a un turno
+            else:
+                demanda_por_turno[turno].append(fila)
+
+        turnos = [self._analizar_turno(turno, demanda_por_turno[turno]) for turno in TURNOS_CICLOS_MAP]
+        problemas = [f"[{t['turno']}] {p}" for t in turnos for p in t["problemas"]]
+        if sesiones_sin_turno:
+            problemas.append(f"{sesiones_sin_turno} sesiones pertenecen a grupos cuyo ciclo no corresponde a ningún turno.")
+
+        resultado = {
+            "periodo_id": self.periodo.pk,
+            "sesiones_requeridas": sum(fila[5] for fila in demanda),
+            "sesiones_sin_turno": sesiones_sin_turno,
+            "factible": not problemas,
+            "problemas": problemas,
+            "turnos": turnos,
+        }
+        self.logger.info(f"Análisis de factibilidad finalizado: {'factible' if resultado['factible'] else f'{len(problemas)} problemas'}.")
+        return resultado
@@ -0,0 +1,240 @@
+# apps/scheduling/service/indices.py
+"""
+Índices compactos (máscaras de bits sobre enteros) que usa el generador de horarios
+y los endpoints que necesitan responder las mismas preguntas de elegibilidad.
+"""
+from array import array
+from collections import defaultdict
+
+from apps.academic_setup.models import MateriaEspecialidadesRequeridas
+from apps.users.models import DocenteEspecialidades
+from apps.scheduling.models import DisponibilidadDocentes
+
+
+def iterar_bits(mascara):
+    """Devuelve las posiciones de los bits encendidos de una máscara, de menor a mayor."""
+    while mascara:
+        bajo = mascara & -mascara
+        yield bajo.bit_length() - 1
+        mascara ^= bajo
+
+
+class EspecialidadesIndex:
+    """
+    Interna cada especialidad en una posición de bit al cargar los datos.
+    Cada docente y cada materia quedan representados por una única máscara entera,
+    de modo que "el docente tiene TODAS las especialidades requeridas" es `req & ~doc == 0`.
+    """
+
+    def __init__(self):
+        self.bits = {} # {especialidad_id: posicion_bit}
+        self.docente_mascaras = {} # {docente_id: mascara}
+        self.materia_mascaras = {} # {materia_id: mascara de especialidades requeridas}
+
+    @classmethod
+    def desde_bd(cls, docente_ids=None, materia_ids=None, especialidad_ids=None):
+        """
+        Construye el índice con dos consultas `values_list`, opcionalmente acotadas. `especialidad_ids` acota las
+        filas de los docentes (basta con las especialidades que exigen las materias que se van a consultar).
+        """
+        index = cls()
+        docentes_qs = DocenteEspecialidades.objects.all()
+        if docente_ids is not None:
+            docentes_qs = docentes_qs.filter(docente_id__in=docente_ids)
+        if especialidad_ids is not None:
+            docentes_qs = docentes_qs.filter(especialidad_id__in=especialidad_ids)
+        materias_qs = MateriaEspecialidadesRequeridas.objects.all()
+        if materia_ids is not None:
+            materias_qs = materias_qs.filter(materia_id__in=materia_ids)
+
+        for docente_id, especialidad_id in docentes_qs.values_list('docente_id', 'especialidad_id'):
+            index.agregar_docente_especialidad(docente_id, especialidad_id)
+        for materia_id, especialidad_id in materias_qs.values_list('materia_id', 'especialidad_id'):
+            index.agregar_materia_especialidad(materia_id, especialidad_id)
+        return index
+
+    def bit(self, especialidad_id):
+        posicion = self.bits.get(especialidad_id)
+        if posicion is None:
+            posicion = self.bits[especialidad_id] = len(self.bits)
+        return 1 << posicion
+
+    def agregar_docente_especialidad(self, docente_id, especialidad_id):
+        self.docente_mascaras[docente_id] = self.docente_mascaras.get(docente_id, 0) | self.bit(especialidad_id)
+
+    def agregar_materia_especialidad(self, materia_id, especialidad_id):
+        self.materia_mascaras[materia_id] = self.materia_mascaras.get(materia_id, 0) | self.bit(especialidad_id)
+
+    def mascara_docente(self, docente_id):
+        return self.docente_mascaras.get(docente_id, 0)
+
+    def mascara_materia(self, materia_id):
+        return self.materia_mascaras.get(materia_id, 0)
+
+    def docente_califica(self, docente_id, materia_id):
+        """True si el docente tiene TODAS las especialidades que exige la materia (o la materia no exige ninguna)."""
+        return self.mascara_materia(materia_id) & ~self.mascara_docente(docente_id) == 0
+
+    def docente_comparte_alguna(self, docente_id, materia_id):
+        """True si el docente tiene AL MENOS UNA de las especialidades que exige la materia."""
+        return self.mascara_materia(materia_id) & self.mascara_docente(docente_id) != 0
+
+    def docentes_elegibles(self, materia_id, docente_ids):
+        """Filtra `docente_ids` a los que califican para la materia, conservando el orden."""
+        requeridas = self.mascara_materia(materia_id)
+        if not requeridas:
+            return list(docente_ids)
+        mascaras = self.docente_mascaras
+        return [d for d in docente_ids if requeridas & ~mascaras.get(d, 0) == 0]
+
+
+class DisponibilidadIndex:
+    """
+    Disponibilidad de los docentes de un período como bitmaps semanales.
+    Los bloques y los docentes se identifican por su posición (0..n-1) en las listas que
+    entrega el llamador. Cada docente tiene una máscara de bloques disponibles (fila) y cada
+    bloque una máscara de docentes disponibles (columna); la preferencia se guarda en un
+    arreglo pequeño por docente.
+    """
+
+    def __init__(self, num_bloques):
+        self.num_bloques = num_bloques
+        self.bloques_por_docente = defaultdict(int) # {docente_pos: mascara de bloques disponibles}
+        self.docentes_por_bloque = [0] * num_bloques # [bloque_pos] -> mascara de docentes disponibles
+        self.preferencias = {} # {docente_pos: array('h') con la preferencia por bloque}
+
+    @classmethod
+    def desde_bd(cls, periodo, bloques, docente_posiciones):
+        """
+        `bloques` es la lista ordenada de bloques (con `bloque_def_id` y `dia_semana`) y
+        `docente_posiciones` el mapa {docente_id: posicion}. Las filas se leen con `values_list`
+        en streaming, sin hidratar modelos.
+        """
+        index = cls(len(bloques))
+        bloque_posiciones = {b.bloque_def_id: (pos, b.dia_semana) for pos, b in enumerate(bloques)}
+        filas = DisponibilidadDocentes.objects.filter(periodo=periodo, esta_disponible=True) \
+            .values_list('docente_id', 'dia_semana', 'bloque_horario_id', 'preferencia')
+        for docente_id, dia_semana, bloque_id, preferencia in filas.iterator():
+            docente_pos = docente_posiciones.get(docente_id)
+            bloque = bloque_posiciones.get(bloque_id)
+            # El día de la fila debe coincidir con el del bloque (así se consultaba el mapa original)
+            if docente_pos is None or bloque is None or bloque[1] != dia_semana:
+                continue
+            index.marcar_disponible(docente_pos, bloque[0], preferencia)
+        return index
+
+    def marcar_disponible(self, docente_pos, bloque_pos, preferencia=0):
+        self.bloques_por_docente[docente_pos] |= 1 << bloque_pos
+        self.docentes_por_bloque[bloque_pos] |= 1 << docente_pos
+        prefs = self.preferencias.get(docente_pos)
+        if prefs is None:
+            prefs = self.preferencias[docente_pos] = array('h', bytes(2 * self.num_bloques))
+        prefs[bloque_pos] = preferencia
+
+    def marcar_no_disponible(self, docente_pos, bloque_pos):
+        self.bloques_por_docente[docente_pos] &= ~(1 << bloque_pos)
+        self.docentes_por_bloque[bloque_pos] &= ~(1 << docente_pos)
+
+    def disponible(self, docente_pos, bloque_pos):
+        return self.bloques_por_docente.get(docente_pos, 0) >> bloque_pos & 1 == 1
+
+    def preferencia(self, docente_pos, bloque_pos, defecto=0):
+        if not self.disponible(docente_pos, bloque_pos):
+            return defecto
+        return self.preferencias[docente_pos][bloque_pos]
+
+    def docentes_libres(self, bloque_pos):
+        """Máscara de docentes disponibles en el bloque (lectura de una columna)."""
+        return self.docentes_por_bloque[bloque_pos]
+
+    def bloques_libres(self, docente_pos):
+        """Máscara de bloques en los que el docente está disponible."""
+        return self.bloques_por_docente.get(docente_pos, 0)
+
+
+class OcupacionIndex:
+    """
+    Ocupación parcial del horario en construcción, con el mismo esquema de bits por bloque.
+    Docentes y espacios se indexan por posición; los grupos por su id. Las consultas de ocupación de un bloque
+    miran su franja: el bloque y los del mismo día que se superponen con él en horario (`solapados`).
+    """
+
+    def __init__(self, num_bloques, solapados=None):
+        self.num_bloques = num_bloques
+        self.solapados = solapados or {} # {bloque_pos: mascara de los OTROS bloques que se superponen con él}
+        self.limpiar()
+
+    def limpiar(self):
+        self.docentes = defaultdict(int) # {docente_pos: mascara de bloques ocupados}
+        self.espacios = defaultdict(int) # {espacio_pos: mascara de bloques ocupados}
+        self.grupos = defaultdict(int) # {grupo_id: mascara de bloques ocupados}
+        self.docentes_por_bloque = [0] * self.num_bloques # [bloque_pos] -> mascara de docentes ocupados
+        self.espacios_por_bloque = [0] * self.num_bloques # [bloque_pos] -> mascara de espacios ocupados
+        self.carga_docentes = defaultdict(int) # {docente_pos: mascara de bloques con clase que cuenta para sus topes}
+
+    def ocupar(self, docente_pos, espacio_pos, grupo_id, bloque_pos, carga=True):
+        """
+        Marca el bloque como ocupado; `docente_pos`/`espacio_pos` pueden ser None (p. ej. un docente ya inactivo).
+        Con `carga=False` (una asignación cancelada) la franja queda ocupada pero no cuenta para los topes del docente.
+        """
+        self.ocupar_recursos(docente_pos, espacio_pos, bloque_pos, carga)
+        self.grupos[grupo_id] |= 1 << bloque_pos
+
+    def ocupar_recursos(self, docente_pos, espacio_pos, bloque_pos, carga=True):
+        """Marca ocupados solo el docente y/o el espacio (p. ej. reservados por otra partición de la generación)."""
+        bit_bloque = 1 << bloque_pos
+        if docente_pos is not None:
+            self.docentes[docente_pos] |= bit_bloque
+            self.docentes_por_bloque[bloque_pos] |= 1 << docente_pos
+            if carga:
+                self.carga_docentes[docente_pos] |= bit_bloque
+        if espacio_pos is not None:
+            self.espacios[espacio_pos] |= bit_bloque
+            self.espacios_por_bloque[bloque_pos] |= 1 << espacio_pos
+
+    def liberar(self, docente_pos, espacio_pos, grupo_id, bloque_pos):
+        """Inversa de `ocupar`; como allí, `docente_pos`/`espacio_pos` pueden ser None."""
+        sin_bloque = ~(1 << bloque_pos)
+        if docente_pos is not None:
+            self.docentes[docente_pos] &= sin_bloque
+            self.docentes_por_bloque[bloque_pos] &= ~(1 << docente_pos)
+            self.carga_docentes[docente_pos] &= sin_bloque
+        if espacio_pos is not None:
+            self.espacios[espacio_pos] &= sin_bloque
+            self.espacios_por_bloque[bloque_pos] &= ~(1 << espacio_pos)
+        self.grupos[grupo_id] &= sin_bloque
+
+    def franja(self, bloque_pos):
+        """Máscara del bloque y de los que se superponen con él."""
+        return 1 << bloque_pos | self.solapados.get(bloque_pos, 0)
+
+    def grupo_ocupado(self, grupo_id, bloque_pos):
+        return self.grupos.get(grupo_id, 0) & self.franja(bloque_pos) != 0
+
+    def docente_ocupado(self, docente_pos, bloque_pos):
+        return self.docentes.get(docente_pos, 0) & self.franja(bloque_pos) != 0
+
+    def espacio_ocupado(self, espacio_pos, bloque_pos):
+        return self.espacios.get(espacio_pos, 0) & self.franja(bloque_pos) != 0
+
+    def _ocupados_en(self, por_bloque, bloque_pos):
+        ocupados = por_bloque[bloque_pos]
+        for otro in iterar_bits(self.solapados.get(bloque_pos, 0)):
+            ocupados |= por_bloque[otro]
+        return ocupados
+
+    def docentes_ocupados_en(self, bloque_pos):
+        """Máscara de docentes con clase en la franja del bloque."""
+        return self._ocupados_en(self.docentes_por_bloque, bloque_pos)
+
+    def espacios_ocupados_en(self, bloque_pos):
+        """Máscara de espacios con clase en la franja del bloque."""
+        return self._ocupados_en(self.espacios_por_bloque, bloque_pos)
+
+    def sesiones_docente_en(self, docente_pos, mascara_bloques):
+        """Sesiones (no canceladas) del docente dentro de `mascara_bloques` (p. ej. un día)."""
+        return (self.carga_docentes.get(docente_pos, 0) & mascara_bloques).bit_count()
+
+    def sesiones_docente(self, docente_pos):
+        """Sesiones (no canceladas) del docente en la semana."""
+        return self.carga_docentes.get(docente_pos, 0).bit_count()
@@ -0,0 +1,74 @@
+# apps/scheduling/service/lotes.py
+"""
+Generación de varios períodos en un lote. Los períodos se agrupan en cadenas: dos períodos van en la misma
+cadena si sus fechas se superponen y comparten algún docente, y dentro de ella se generan en orden, cada
+uno respetando lo que ya tienen asignado esos docentes en los anteriores. Las cadenas no interactúan entre
+sí, así que se generan en paralelo (tareas Celery o procesos distintos).
+"""
+from django.db import transaction
+
+from apps.scheduling.models import DisponibilidadDocentes, HorariosAsignados, LoteGeneracion, TrabajoGeneracion
+
+
+def docentes_del_periodo(periodo_id):
+    """Docentes que el generador puede usar en el período (con disponibilidad cargada) o que ya tienen clases en él."""
+    disponibles = DisponibilidadDocentes.objects.filter(periodo_id=periodo_id, esta_disponible=True) \
+        .values_list('docente_id', flat=True).distinct()
+    asignados = HorariosAsignados.objects.filter(periodo_id=periodo_id).values_list('docente_id', flat=True).distinct()
+    return set(disponibles) | set(asignados)
+
+
+def fechas_superpuestas(periodo_a, periodo_b):
+    return periodo_a.fecha_inicio <= periodo_b.fecha_fin and periodo_b.fecha_inicio <= periodo_a.fecha_fin
+
+
+def agrupar_en_cadenas(periodos):
+    """[[periodo_id, ...], ...]: componentes conexas de la relación "fechas superpuestas y algún docente en común"."""
+    periodos = sorted(periodos, key=lambda p: (p.fecha_inicio, p.pk))
+    docentes = {p.pk: docentes_del_periodo(p.pk) for p in periodos}
+    raiz = {p.pk: p.pk for p in periodos}
+
+    def buscar(periodo_id):
+        while raiz[periodo_id] != periodo_id:
+            raiz[periodo_id] = raiz[raiz[periodo_id]]
+            periodo_id = raiz[periodo_id]
+        return periodo_id
+
+    for i, periodo_a in enumerate(periodos):
+        for periodo_b in periodos[i + 1:]:
+            if fechas_superpuestas(periodo_a, periodo_b) and docentes[periodo_a.pk] & docentes[periodo_b.pk]:
+                raiz[buscar(periodo_b.pk)] = buscar(periodo_a.pk)
+
+    cadenas = {}
+    for periodo in periodos: # Dentro de cada cadena, por fecha de inicio
+        cadenas.setdefault(buscar(periodo.pk), []).append(periodo.pk)
+    return list(cadenas.values())
+
+
+def crear_lote(periodos, tiempo_limite_segundos=None, persistir_parcial=True):
+    """Crea el LoteGeneracion y un TrabajoGeneracion PENDIENTE por período. Devuelve (lote, [[trabajo, ...], ...]) por cadena."""
+    cadenas = agrupar_en_cadenas(periodos)
+    periodos_por_id = {p.pk: p for p in periodos}
+    with transaction.atomic():
+        lote = LoteGeneracion.objects.create(cadenas=cadenas)
+        trabajos = [
+            [
+                TrabajoGeneracion.objects.create(
+                    periodo=periodos_por_id[periodo_id], lote=lote,
+                    tiempo_limite_segundos=tiempo_limite_segundos, persistir_parcial=persistir_parcial
+                )
+                for periodo_id in cadena
+            ]
+            for cadena in cadenas
+        ]
+    return lote, trabajos
+
+
+def periodos_previos_en_cadena(trabajo):
+    """Períodos que se generan antes que el del trabajo en su cadena del lote y se dictan en fechas superpuestas."""
+    if trabajo.lote_id is None:
+        return []
+    cadena = next((c for c in trabajo.lote.cadenas if trabajo.periodo_id in c), [])
+    previos = cadena[:cadena.index(trabajo.periodo_id)] if cadena else []
+    periodos = trabajo.lote.trabajos.filter(periodo_id__in=previos).select_related('periodo')
+    return [t.periodo_id for t in periodos if fechas_superpuestas(t.periodo, trabajo.periodo)]
@@ -0,0 +1,156 @@
+# apps/scheduling/service/reparacion.py
+"""
+Reparación incremental del horario de un período a partir de los cambios registrados en sus datos de entrada
+(CambioPendiente), en lugar de volver a generar el período o el ciclo completo.
+"""
+from collections import Counter, defaultdict
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import CambioPendiente, HorariosAsignados
+from .schedule_generator import ScheduleGeneratorService, TURNOS_CICLOS_MAP, TURNO_CODIGOS, SIN_TURNO
+
+# Tabla ('app.Modelo') -> función que da, para una fila, los cambios [(periodo_id, tipo, objeto_id)];
+# periodo_id None: el cambio afecta a todos los períodos activos
+CAMBIOS_POR_TABLA = {
+    'scheduling.Grupos': lambda fila: [(fila.periodo_id, 'GRUPO', fila.grupo_id)],
+    'scheduling.DisponibilidadDocentes': lambda fila: [(fila.periodo_id, 'DOCENTE', fila.docente_id)],
+    'users.DocenteEspecialidades': lambda fila: [(None, 'DOCENTE', fila.docente_id)],
+    'academic_setup.EspaciosFisicos': lambda fila: [(None, 'ESPACIO', fila.espacio_id)],
+    'scheduling.ConfiguracionRestricciones': lambda fila: [(fila.periodo_aplicable_id, 'RESTRICCION', fila.restriccion_id)],
+}
+
+
+def registrar_cambios_pendientes(cambios):
+    """Registra cambios [(periodo_id | None, tipo, objeto_id)]; los repetidos se ignoran (restricción única)."""
+    periodos_activos = None
+    filas = []
+    for periodo_id, tipo, objeto_id in cambios:
+        if periodo_id is None:
+            if periodos_activos is None:
+                periodos_activos = list(PeriodoAcademico.objects.filter(activo=True).values_list('periodo_id', flat=True))
+            filas.extend(CambioPendiente(periodo_id=p, tipo=tipo, objeto_id=objeto_id) for p in periodos_activos)
+        else:
+            filas.append(CambioPendiente(periodo_id=periodo_id, tipo=tipo, objeto_id=objeto_id))
+    CambioPendiente.objects.bulk_create(filas, ignore_conflicts=True)
+
+
+def marcar_impacto_disponibilidad(docente_id, periodo_id, dia_semana, bloque_id, disponible):
+    """
+    Marca (o desmarca, si el docente vuelve a estar disponible) las asignaciones del docente en ese bloque.
+    La búsqueda va por el índice único (docente, periodo, dia_semana, bloque_horario). Devuelve las filas marcadas.
+    """
+    afectadas = HorariosAsignados.objects.filter(
+        docente_id=docente_id, periodo_id=periodo_id, dia_semana=dia_semana, bloque_horario_id=bloque_id
+    ).exclude(estado='Cancelado')
+    marcadas = afectadas.update(docente_no_disponible=not disponible)
+    return 0 if disponible else marcadas
+
+
+class ReparacionService:
+    """
+    Conserva las sesiones del horario actual que ningún cambio toca, vuelve a validar (con los índices del
+    generador) las de los grupos, docentes y aulas que cambiaron, y busca hueco solo para las clases que
+    perdieron sesiones o que, estando incompletas, tienen entre sus candidatos algo que cambió. El horario
+    resultante se aplica como un diff, igual que la generación.
+    """
+
+    def __init__(self, periodo: PeriodoAcademico, dry_run=False, stdout_ref=None, generador: ScheduleGeneratorService = None):
+        self.periodo = periodo
+        self.generador = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref, dry_run=dry_run)
+        self.logger = self.generador.logger
+
+    def _cambios_pendientes(self):
+        """(cambio_ids, {tipo: {objeto_id}}) de los cambios registrados para el período."""
+        cambio_ids = []
+        afectados = {tipo: set() for tipo, _ in CambioPendiente.TIPO_CHOICES}
+        for cambio_id, tipo, objeto_id in CambioPendiente.objects.filter(periodo=self.periodo).values_list('cambio_id', 'tipo', 'objeto_id'):
+            cambio_ids.append(cambio_id)
+            afectados[tipo].add(objeto_id)
+        return cambio_ids, afectados
+
+    def _sesion_afectada(self, afectados, grupo_id, docente_id, espacio_id):
+        return bool(afectados['RESTRICCION']) or grupo_id in afectados['GRUPO'] \
+            or docente_id in afectados['DOCENTE'] or espacio_id in afectados['ESPACIO']
+
+    def _vale_reintentar(self, clase, afectados):
+        """Una clase incompleta se vuelve a buscar si cambió su grupo, alguna restricción o alguno de sus candidatos."""
+        if afectados['RESTRICCION'] or clase.grupo_id in afectados['GRUPO']:
+            return True
+        gen = self.generador
+        elegibles = gen.mascara_docentes_elegibles(clase.materia_id)
+        for docente_id in afectados['DOCENTE']:
+            docente_pos = gen.docente_posiciones.get(docente_id)
+            if docente_pos is not None and elegibles >> docente_pos & 1:
+                return True
+        return bool(afectados['ESPACIO']) and any(e.espacio_id in afectados['ESPACIO'] for e in gen.espacios_compatibles(clase))
+
+    def reparar(self):
+        cambio_ids, afectados = self._cambios_pendientes()
+        if not cambio_ids:
+            return {"cambios_procesados": 0, "message": "No hay cambios pendientes para el período."}
+
+        gen = self.generador
+        gen.validator.clear_session_assignments()
+        gen.generation_stats = defaultdict(int)
+        gen.iniciar_generacion(HorariosAsignados.objects.filter(periodo=self.periodo))
+        gen.asignaciones_canceladas = [] # La reparación solo toca las sesiones afectadas
+
+        # Sesiones actuales (no fijas), separadas en las que ningún cambio toca y las que hay que volver a validar
+        conservar, revalidar = defaultdict(list), defaultdict(list)
+        previas_por_clase = Counter()
+        for grupo_id, materia_id, docente_id, espacio_id, _, bloque_id in gen.asignaciones_previas:
+            destino = revalidar if self._sesion_afectada(afectados, grupo_id, docente_id, espacio_id) else conservar
+            destino[grupo_id].append((materia_id, docente_id, espacio_id, bloque_id))
+            previas_por_clase[(grupo_id, materia_id)] += 1
+
+        grupos_procesados = set()
+        for turno_codigo, ciclos_del_turno in TURNOS_CICLOS_MAP.items():
+            grupos = list(gen.grupos_del_periodo().filter(ciclo_semestral__in=ciclos_del_turno).order_by('ciclo_semestral'))
+            if not grupos:
+                continue
+            grupos_procesados.update(g.grupo_id for g in grupos)
+            turno_cod_int = TURNO_CODIGOS.get(turno_codigo, SIN_TURNO)
+            bloques_del_turno = [b for b in gen.all_bloques_ordered if b.turno_codigo == turno_cod_int]
+            clases = gen.crear_lista_clases_para_programar(grupos)
+            fijas = {(c.grupo_id, c.materia_id): c.sesiones_programadas for c in clases}
+
+            # Primero las que no cambiaron (siguen siendo factibles salvo cambios no registrados), luego las afectadas
+            conservadas = gen.sembrar_asignaciones(clases, bloques_del_turno, conservar)
+            revalidadas = gen.sembrar_asignaciones(clases, bloques_del_turno, revalidar)
+            gen.generation_stats["sesiones_conservadas"] += sum(conservadas.values())
+            gen.generation_stats["sesiones_revalidadas"] += sum(revalidadas.values())
+
+            for clase in clases:
+                clave = (clase.grupo_id, clase.materia_id)
+                if gen.horario_parcial_clases.get(clave, 0) >= clase.sesiones_necesarias:
+                    continue
+                antes = min(clase.sesiones_necesarias, fijas[clave] + previas_por_clase[clave])
+                perdio_sesiones = gen.horario_parcial_clases.get(clave, 0) < antes
+                if not perdio_sesiones and not self._vale_reintentar(clase, afectados):
+                    gen.unresolved_conflicts.append(clase) # Sigue incompleta como antes: no se repite su búsqueda
+                    continue
+                if gen.debe_detenerse():
+                    break
+                gen.generation_stats["clases_buscadas"] += 1
+                gen.programar_clase(clase, bloques_del_turno)
+
+        # Los grupos sin turno (ciclo sin mapear) no se generan: sus sesiones quedan como están
+        gen.asignaciones_propuestas.extend(a for a in gen.asignaciones_previas if a[0] not in grupos_procesados)
+
+        cambios = gen.aplicar_cambios()
+        if cambios["persistido"]:
+            CambioPendiente.objects.filter(pk__in=cambio_ids).delete()
+        self.logger.info(
+            f"Reparación del período {self.periodo.nombre_periodo}: {len(cambio_ids)} cambios, "
+            f"{cambios['agregadas']} sesiones nuevas y {cambios['eliminadas']} eliminadas."
+        )
+        return {
+            "cambios_procesados": len(cambio_ids),
+            "afectados": {tipo: sorted(ids) for tipo, ids in afectados.items() if ids},
+            "stats": dict(gen.generation_stats),
+            "unresolved_conflicts": gen.serializar_conflictos(),
+            "dry_run": gen.dry_run,
+            "cambios": cambios,
+            "metricas": gen.metricas_calidad(),
+            "detenido": gen.detenido,
+        }
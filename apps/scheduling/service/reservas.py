@@ -0,0 +1,90 @@
+# apps/scheduling/service/reservas.py
+from collections import defaultdict
+
+from django.db.models import Q
+
+from apps.scheduling.models import Grupos, HorariosAsignados, ReservaFranja, TrabajoGeneracion
+from .schedule_generator import FILTRO_ASIGNACIONES_FIJAS
+
+# Franja: (tipo_recurso, recurso_id, bloque_horario_id), con tipo_recurso ReservaFranja.DOCENTE o ReservaFranja.ESPACIO
+# Propietario de las franjas de las asignaciones confirmadas/fijadas, reservadas antes de repartir el trabajo
+PROPIETARIO_FIJAS = 'fijas'
+
+
+def particionar_grupos(periodo, modo_particion):
+    """{clave: [grupo_id, ...]} de los grupos del período, por carrera o por carrera y ciclo."""
+    particiones = defaultdict(list)
+    filas = Grupos.objects.filter(periodo=periodo).order_by('grupo_id').values_list('grupo_id', 'carrera_id', 'ciclo_semestral')
+    for grupo_id, carrera_id, ciclo in filas:
+        clave = f"carrera-{carrera_id}" if modo_particion == 'CARRERA' else f"carrera-{carrera_id}-ciclo-{ciclo or 0}"
+        particiones[clave].append(grupo_id)
+    return dict(particiones)
+
+
+class ReservaFranjasService:
+    """
+    Reserva de franjas en la BD para que varios workers generen partes de un mismo período sin estado compartido
+    en memoria. Las reservas se insertan en lote con `ignore_conflicts` (INSERT ... ON CONFLICT DO NOTHING) y la
+    restricción única de ReservaFranja decide qué partición se queda con cada franja.
+    """
+
+    def __init__(self, trabajo: TrabajoGeneracion, particion: str):
+        self.trabajo = trabajo
+        self.particion = particion
+        self.ultima_reserva_vista = 0 # Para traer solo las reservas nuevas de otras particiones
+
+    @staticmethod
+    def franjas_de_asignacion(asignacion):
+        """Franjas que ocupa una asignación (tupla CAMPOS_ASIGNACION)."""
+        _, _, docente_id, espacio_id, _, bloque_id = asignacion
+        return [(ReservaFranja.DOCENTE, docente_id, bloque_id), (ReservaFranja.ESPACIO, espacio_id, bloque_id)]
+
+    def _filtro(self, franjas):
+        filtro = Q()
+        for tipo, recurso_id, bloque_id in franjas:
+            filtro |= Q(tipo_recurso=tipo, recurso_id=recurso_id, bloque_horario_id=bloque_id)
+        return filtro
+
+    def reclamar(self, franjas):
+        """Intenta reservar las franjas; devuelve el conjunto de las que ya tenía otra partición."""
+        franjas = set(franjas)
+        if not franjas:
+            return set()
+        ReservaFranja.objects.bulk_create([
+            ReservaFranja(trabajo=self.trabajo, tipo_recurso=tipo, recurso_id=recurso_id, bloque_horario_id=bloque_id, particion=self.particion)
+            for tipo, recurso_id, bloque_id in franjas
+        ], ignore_conflicts=True)
+        ajenas = ReservaFranja.objects.filter(trabajo=self.trabajo) \
+            .filter(self._filtro(franjas)).exclude(particion=self.particion) \
+            .values_list('tipo_recurso', 'recurso_id', 'bloque_horario_id')
+        return set(ajenas)
+
+    def liberar(self, franjas):
+        """Libera franjas propias (p. ej. la otra mitad de una sesión que perdió su docente o su aula)."""
+        if franjas:
+            ReservaFranja.objects.filter(trabajo=self.trabajo, particion=self.particion).filter(self._filtro(franjas)).delete()
+
+    def liberar_todas(self):
+        ReservaFranja.objects.filter(trabajo=self.trabajo, particion=self.particion).delete()
+
+    def reservas_de_otros(self):
+        """
+        Franjas reservadas por otras particiones desde la última consulta. Es solo una optimización para evitar
+        conflictos: si alguna se escapa (transacciones que confirman fuera de orden), `reclamar` la detecta igual.
+        """
+        filas = list(ReservaFranja.objects.filter(trabajo=self.trabajo, reserva_id__gt=self.ultima_reserva_vista)
+                     .exclude(particion=self.particion)
+                     .values_list('reserva_id', 'tipo_recurso', 'recurso_id', 'bloque_horario_id'))
+        if filas:
+            self.ultima_reserva_vista = max(fila[0] for fila in filas)
+        return [fila[1:] for fila in filas]
+
+    def reservar_fijas(self):
+        """Reserva a nombre de esta partición (PROPIETARIO_FIJAS) las franjas de las asignaciones confirmadas/fijadas del período."""
+        filas = HorariosAsignados.objects.filter(periodo=self.trabajo.periodo).filter(FILTRO_ASIGNACIONES_FIJAS) \
+            .values_list('docente_id', 'espacio_id', 'bloque_horario_id')
+        ReservaFranja.objects.bulk_create([
+            ReservaFranja(trabajo=self.trabajo, tipo_recurso=tipo, recurso_id=recurso_id, bloque_horario_id=bloque_id, particion=self.particion)
+            for docente_id, espacio_id, bloque_id in filas
+            for tipo, recurso_id in ((ReservaFranja.DOCENTE, docente_id), (ReservaFranja.ESPACIO, espacio_id))
+        ], ignore_conflicts=True)
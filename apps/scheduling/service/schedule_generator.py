@@ -1,6 +1,10 @@
 # apps/scheduling/service/schedule_generator.py
 import random
-from collections import defaultdict, namedtuple
+import re
+import time
+from collections import Counter, defaultdict
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models import Q
 import logging
 
@@ -10,36 +14,251 @@ from apps.academic_setup.models import (
 from apps.users.models import Docentes
 from apps.scheduling.models import (
     Grupos, DisponibilidadDocentes, HorariosAsignados,
-    ConfiguracionRestricciones, BloquesHorariosDefinicion
+    ConfiguracionRestricciones, BloquesHorariosDefinicion, ReservaFranja, CambioPendiente, PerfilPesos
 )
 from .conflict_validator import ConflictValidatorService
+from .indices import EspecialidadesIndex, DisponibilidadIndex, OcupacionIndex, iterar_bits
+from .datos_referencia import (
+    clave_datos_generador, clave_resultado_generador, TIEMPO_CACHE_DATOS_GENERADOR, TIEMPO_CACHE_RESULTADO_GENERADOR
+)
+from .demanda import DemandaSesiones, HORAS_ACADEMICAS_POR_SESION_ESTANDAR
 
 TURNOS_CICLOS_MAP = {
     'M': [1, 2, 3],
     'T': [4, 5, 6, 7],
     'N': [8, 9, 10]
 }
-HORAS_ACADEMICAS_POR_SESION_ESTANDAR = 2 # Asumimos que cada bloque cubre esto
+ESTUDIANTES_POR_DEFECTO = 15 # Capacidad mínima exigida al aula cuando el grupo no tiene estimado
+
+# Códigos enteros de turno usados por la representación compacta (0 = sin turno)
+TURNO_CODIGOS = {'M': 1, 'T': 2, 'N': 3}
+SIN_TURNO = 0
 
 # Constantes para los códigos de restricción (para evitar errores de tipeo)
 R_MAX_HORAS_DIA_DOCENTE = "MAX_HORAS_DIA_DOCENTE"
 R_AULA_EXCLUSIVA_MATERIA = "AULA_EXCLUSIVA_MATERIA"
 R_DOCENTE_NO_DISPONIBLE_BLOQUE_ESP = "DOCENTE_NO_DISPONIBLE_BLOQUE_ESP" # Si se quiere bloquear explícitamente un docente de un bloque
 R_NO_CLASES_DIA_TURNO_CARRERA = "NO_CLASES_DIA_TURNO_CARRERA"
+R_PREFERIR_AULA_X_PARA_MATERIA_Y = "PREFERIR_AULA_X_PARA_MATERIA_Y"
+
+# Pesos de las restricciones blandas (calculate_soft_constraint_penalties)
+PENALIZACION_PREFERENCIA_NEGATIVA = 10 # Por cada punto de preferencia negativa del docente
+PENALIZACION_PREFERENCIA_NEUTRA = 5 # Bloque disponible pero no preferido
+PENALIZACION_FALTA_ASIENTO = 5 # Por cada estudiante que no cabe en el aula
+PENALIZACION_AULA_SOBREDIMENSIONADA = 10 # Aula de más de 2.5 veces el tamaño del grupo
+PENALIZACION_TURNO = 20 # Bloque fuera del turno preferente del grupo
+PENALIZACION_AULA_NO_PREFERIDA = 15 # Por cada regla PREFERIR_AULA_X_PARA_MATERIA_Y no cumplida
+# Campos de PerfilPesos (y de PesosBlandos), en el orden de la huella del resultado memorizado
+CAMPOS_PESOS = ('preferencia_negativa', 'preferencia_neutra', 'falta_asiento', 'aula_sobredimensionada', 'turno', 'aula_no_preferida')
+
+# Asignaciones que la generación no borra ni mueve: confirmadas o fijadas a mano
+FILTRO_ASIGNACIONES_FIJAS = Q(estado='Confirmado') | Q(fijado=True)
+
+# Cada cuánto (segundos) se consulta la función de cancelación durante la búsqueda
+INTERVALO_VERIFICACION_CANCELACION = 0.5
+# Cada cuánto (segundos) se entrega un punto de control a `guardar_punto_control`
+INTERVALO_PUNTO_CONTROL = 30
+# Generación distribuida: veces que se vuelve a buscar una clase cuyas franjas reservó antes otra partición
+MAX_REINTENTOS_RESERVA = 3
+
+# Campos que identifican una asignación al comparar el horario propuesto con el existente
+CAMPOS_ASIGNACION = ('grupo_id', 'materia_id', 'docente_id', 'espacio_id', 'dia_semana', 'bloque_horario_id')
+
+# Atributos que deja _load_initial_data; se guardan juntos en la caché (ver _cargar_datos_referencia)
+ATRIBUTOS_DATOS_REFERENCIA = (
+    'docentes_codigos', 'all_docente_ids', 'docente_posiciones', 'all_espacios', 'espacio_posiciones', 'espacios_nombres',
+    'all_bloques_ordered', 'bloque_posiciones', 'bloques_nombres', 'mascara_dia', 'all_restricciones_config',
+    'disponibilidad', 'especialidades_index', 'max_sesiones_dia_docente', 'max_sesiones_semana_docente', 'bloques_solapados',
+)
 
 
-# Representa la unidad atómica a ser programada: una materia específica para un grupo.
-ClaseParaProgramar = namedtuple('ClaseParaProgramar', [
-    'grupo',
-    'materia',
-    'sesiones_necesarias',
-    'sesiones_programadas'
-])
+class ClaseParaProgramar:
+    """
+    Representa la unidad atómica a ser programada: una materia específica para un grupo.
+    Solo guarda enteros (ids, conteos y códigos); las instancias de modelo se usan únicamente al persistir.
+    """
+    __slots__ = (
+        'grupo_id', 'materia_id', 'carrera_id', 'ciclo', 'num_estudiantes',
+        'tipo_espacio_requerido', 'turno', 'sesiones_necesarias', 'sesiones_programadas', 'diagnostico',
+    )
+
+    def __init__(self, grupo_id, materia_id, carrera_id, ciclo, num_estudiantes,
+                 tipo_espacio_requerido, turno, sesiones_necesarias, sesiones_programadas=0):
+        self.grupo_id = grupo_id
+        self.materia_id = materia_id
+        self.carrera_id = carrera_id
+        self.ciclo = ciclo # 0 si el grupo no tiene ciclo semestral
+        self.num_estudiantes = num_estudiantes # 0 si no hay estimado
+        self.tipo_espacio_requerido = tipo_espacio_requerido # 0 si la materia no exige un tipo de espacio
+        self.turno = turno # Código de TURNO_CODIGOS o SIN_TURNO
+        self.sesiones_necesarias = sesiones_necesarias
+        self.sesiones_programadas = sesiones_programadas
+        self.diagnostico = None # DiagnosticoSesion de la última búsqueda fallida, si la hubo
+
+    def __repr__(self):
+        return (f"ClaseParaProgramar(grupo_id={self.grupo_id}, materia_id={self.materia_id}, "
+                f"sesiones={self.sesiones_programadas}/{self.sesiones_necesarias})")
+
+
+class DiagnosticoSesion:
+    """
+    Explicación compacta de por qué una sesión no encontró hueco: cuántos de los bloques evaluados
+    se perdieron por cada motivo. Se llena durante la misma búsqueda, sin re-ejecutarla.
+    """
+    __slots__ = ('bloques_evaluados', 'conflicto_grupo', 'sin_docente', 'sin_aula', 'reglas_duras')
+
+    MOTIVOS = ('conflicto_grupo', 'sin_docente', 'sin_aula', 'reglas_duras')
+
+    def __init__(self):
+        self.bloques_evaluados = 0
+        self.conflicto_grupo = 0 # El grupo ya tiene clase en el bloque
+        self.sin_docente = 0 # Ningún docente elegible (especialidades) disponible y libre
+        self.sin_aula = 0 # Ningún aula libre del tipo y capacidad requeridos
+        self.reglas_duras = 0 # Había candidatos, pero el máximo diario o ConfiguracionRestricciones los descartó
+
+    def cuello_de_botella(self):
+        """Motivo que explica más bloques perdidos (None si no se evaluó ningún bloque)."""
+        if not self.bloques_evaluados:
+            return None
+        return max(self.MOTIVOS, key=lambda motivo: getattr(self, motivo))
+
+    def como_dict(self):
+        datos = {motivo: getattr(self, motivo) for motivo in self.MOTIVOS}
+        datos['bloques_evaluados'] = self.bloques_evaluados
+        datos['cuello_de_botella'] = self.cuello_de_botella()
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos):
+        diagnostico = cls()
+        for campo in cls.__slots__:
+            setattr(diagnostico, campo, datos.get(campo, 0))
+        return diagnostico
+
+
+class EspacioCompacto:
+    """Datos de un espacio físico que el generador consulta en sus bucles internos."""
+    __slots__ = ('indice', 'espacio_id', 'tipo_espacio_id', 'capacidad')
+
+    def __init__(self, indice, espacio_id, tipo_espacio_id, capacidad):
+        self.indice = indice # Posición del espacio en los bitmaps de ocupación
+        self.espacio_id = espacio_id
+        self.tipo_espacio_id = tipo_espacio_id
+        self.capacidad = capacidad
+
+
+class BloqueCompacto:
+    """Bloque horario con el turno ya codificado como entero."""
+    __slots__ = ('indice', 'bloque_def_id', 'dia_semana', 'turno_codigo')
+
+    def __init__(self, indice, bloque_def_id, dia_semana, turno_codigo):
+        self.indice = indice # Posición (bit) del bloque en los bitmaps semanales
+        self.bloque_def_id = bloque_def_id
+        self.dia_semana = dia_semana
+        self.turno_codigo = turno_codigo
+
+
+class PesosBlandos:
+    """Pesos de las restricciones blandas de una ejecución: los de un PerfilPesos o los PENALIZACION_* por defecto."""
+    __slots__ = CAMPOS_PESOS
+
+    def __init__(self, preferencia_negativa=PENALIZACION_PREFERENCIA_NEGATIVA, preferencia_neutra=PENALIZACION_PREFERENCIA_NEUTRA,
+                 falta_asiento=PENALIZACION_FALTA_ASIENTO, aula_sobredimensionada=PENALIZACION_AULA_SOBREDIMENSIONADA,
+                 turno=PENALIZACION_TURNO, aula_no_preferida=PENALIZACION_AULA_NO_PREFERIDA):
+        self.preferencia_negativa = preferencia_negativa
+        self.preferencia_neutra = preferencia_neutra
+        self.falta_asiento = falta_asiento
+        self.aula_sobredimensionada = aula_sobredimensionada
+        self.turno = turno
+        self.aula_no_preferida = aula_no_preferida
+
+    @classmethod
+    def desde_perfil(cls, perfil: PerfilPesos):
+        return cls(**{campo: getattr(perfil, campo) for campo in CAMPOS_PESOS})
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS_PESOS}
+
+    def como_tupla(self):
+        return tuple(getattr(self, campo) for campo in CAMPOS_PESOS)
+
+
+class OpcionesEjecucion:
+    """
+    Opciones de una ejecución que no cambian el modelo cargado. Generación "anytime": presupuesto de tiempo
+    (`tiempo_limite`, segundos desde la creación del servicio) y cancelación cooperativa (`debe_cancelar()` -> bool);
+    al detenerse se conserva lo programado hasta ese momento y, si `persistir_parcial`, se guarda siempre que
+    cubra al menos tanto como el horario previo. Puntos de control: cada INTERVALO_PUNTO_CONTROL segundos se
+    entrega el estado compacto de la ejecución a `guardar_punto_control(dict)`; con `punto_control` (uno guardado
+    antes) la generación se reanuda desde ahí. Generación distribuida: `reservas` (ReservaFranjasService) reserva
+    en la BD las franjas de docentes y aulas frente a las demás particiones.
+    """
+    __slots__ = ('tiempo_limite', 'debe_cancelar', 'persistir_parcial', 'punto_control', 'guardar_punto_control', 'reservas')
+
+    def __init__(self, tiempo_limite=None, debe_cancelar=None, persistir_parcial=True, punto_control=None, guardar_punto_control=None,
+                 reservas=None):
+        self.tiempo_limite = tiempo_limite
+        self.debe_cancelar = debe_cancelar
+        self.persistir_parcial = persistir_parcial
+        self.punto_control = punto_control
+        self.guardar_punto_control = guardar_punto_control
+        self.reservas = reservas
+
+
+class MaxSesionesDocente(dict):
+    """{docente_id: máximo de sesiones por día}; los docentes sin regla propia usan `defecto` (serializable, a diferencia de un defaultdict con lambda)."""
+
+    def __init__(self, defecto):
+        super().__init__()
+        self.defecto = defecto
+
+    def __missing__(self, docente_id):
+        return self.defecto
+
+    def __reduce__(self):
+        return (self.__class__, (self.defecto,), None, None, iter(self.items()))
 
 
 class ScheduleGeneratorService:
-    def __init__(self, periodo: PeriodoAcademico, stdout_ref=None):
+    """
+    Generador de horarios de un período. Sin guion bajo expone, además de la generación, la API que usan los
+    demás servicios de planificación (factibilidad, evaluador, reparación, etc.): elegibilidad de docentes y
+    espacios, reglas duras y blandas, lista de clases, siembra de asignaciones e inicio, detención y aplicación
+    de una ejecución.
+    """
+    def __init__(self, periodo: PeriodoAcademico, stdout_ref=None, periodo_origen: PeriodoAcademico = None, dry_run=False,
+                 opciones: OpcionesEjecucion = None, grupo_ids=None, datos_referencia=None,
+                 periodos_concurrentes=None, pesos: PesosBlandos = None):
         self.periodo = periodo
+        # En dry_run se genera todo en memoria y se devuelve el diff sin escribir en la BD
+        self.dry_run = dry_run
+        self.opciones = opciones if opciones is not None else OpcionesEjecucion()
+        self.detenido = None # None, 'TIEMPO_AGOTADO' o 'CANCELADO'
+        self._inicio = time.monotonic()
+        self._proximo_chequeo_cancelacion = 0
+
+        # Reanudación desde el punto de control de las opciones, si es de este período
+        self._proximo_punto_control = self._inicio + INTERVALO_PUNTO_CONTROL
+        self.punto_control_inicial = None
+        punto_control = self.opciones.punto_control
+        if punto_control and punto_control.get("periodo_id") == periodo.pk:
+            self.punto_control_inicial = punto_control
+            self._inicio -= punto_control.get("segundos_transcurridos", 0) # El presupuesto de tiempo abarca todos los intentos
+        self.asignaciones_reanudadas = {} # {grupo_id: [(materia_id, docente_id, espacio_id, bloque_def_id), ...]} del punto de control
+        self.clases_fallidas_previas = set() # {(grupo_id, materia_id)} que ya fallaron antes del punto de control
+        self.diagnosticos_previos = {} # {(grupo_id, materia_id): DiagnosticoSesion} de esas clases
+        # Memorización: una generación completa del período con las mismas entradas (ver clave_resultado_generador)
+        # reutiliza el resultado de la última, que se reproduce como un punto de control sin buscar de nuevo
+        self.resultado_memorizado = False
+
+        # Generación distribuida: `grupo_ids` restringe la generación del período a una partición de sus grupos
+        self.grupo_ids = set(grupo_ids) if grupo_ids is not None else None
+        self._sin_reservar = [] # [(asignacion, clase, docente_pos, espacio, bloque, penalizacion)] registradas y aún no reservadas
+        # Generación por lotes: ids de otros períodos, dictados en fechas superpuestas, cuyos docentes ya asignados se respetan
+        self.periodos_concurrentes = list(periodos_concurrentes or [])
+        # Arranque en caliente: si se indica, se reutilizan las asignaciones aún factibles de este período
+        self.periodo_origen = periodo_origen
+        self.asignaciones_origen = None # {grupo_id (destino): [(materia_id, docente_id, espacio_id, bloque_def_id), ...]}, bajo demanda
         self.validator = ConflictValidatorService(periodo=self.periodo)
         self.unresolved_conflicts = []
         self.generation_stats = defaultdict(int) # Usar defaultdict para estadísticas
@@ -47,7 +266,7 @@ class ScheduleGeneratorService:
         if stdout_ref and all(hasattr(stdout_ref, attr) for attr in ['info', 'warning', 'error', 'debug']):
             self.logger = stdout_ref
         else:
-            self.logger = logging.getLogger(f"schedule_generator_service.{self.periodo.id if self.periodo else 'default_period'}")
+            self.logger = logging.getLogger(f"schedule_generator_service.{self.periodo.pk if self.periodo else 'default_period'}")
             if not self.logger.hasHandlers():
                 handler = logging.StreamHandler()
                 formatter = logging.Formatter('%(asctime)s - %(name)s - [%(levelname)s] - %(message)s')
@@ -56,315 +275,918 @@ class ScheduleGeneratorService:
                 self.logger.setLevel(logging.INFO)
                 self.logger.propagate = False
 
-        self.horario_parcial_docentes = defaultdict(lambda: defaultdict(list)) # {docente_id: {dia_semana: [bloque_def_id_asignado, ...]}}
-        self.horario_parcial_espacios = defaultdict(lambda: defaultdict(list)) # {espacio_id: {dia_semana: [bloque_def_id_asignado, ...]}}
-        self.horario_parcial_grupos = defaultdict(lambda: defaultdict(list)) # {grupo_id: {dia_semana: [bloque_def_id_asignado, ...]}}
         self.horario_parcial_clases = defaultdict(int) # {(grupo_id, materia_id): sesiones_programadas}
 
+        # Horario propuesto por la ejecución actual; se escribe al final (aplicar_cambios) como un diff
+        self.alcance_qs = HorariosAsignados.objects.none() # Asignaciones existentes que la ejecución puede reemplazar
+        self.asignaciones_previas = {} # {tupla CAMPOS_ASIGNACION: horario_id} de las no fijas del alcance
+        self.asignaciones_canceladas = [] # horario_id de las canceladas (no fijas) del alcance
+        self.asignaciones_propuestas = [] # [tupla CAMPOS_ASIGNACION]
+        self.penalizacion_total = 0
+        self.clases_generadas = [] # Todas las clases creadas en la ejecución (para las métricas)
+        # Pesos de las restricciones blandas: los indicados, los del perfil activo del período o los por defecto
+        self.pesos = pesos if pesos is not None else self._cargar_pesos()
+
+        # Datos descriptivos (solo para mensajes y logs), llenados al crear las clases a programar
+        self.grupos_codigos = {} # {grupo_id: codigo_grupo}
+        self.materias_info = {} # {materia_id: (codigo_materia, nombre_materia)}
+
+        # `datos_referencia`: los de exportar_datos_referencia() de otro generador del período (p. ej. el servidor residente)
+        self._cargar_datos_referencia(datos_referencia)
+        # Ocupación parcial (docentes, espacios y grupos) como bitmaps sobre las posiciones de los bloques
+        self.ocupacion = OcupacionIndex(len(self.all_bloques_ordered), self.bloques_solapados)
+
+    def _cargar_pesos(self):
+        perfil = PerfilPesos.objects.filter(periodo=self.periodo, activo=True).first()
+        if perfil is None:
+            return PesosBlandos()
+        self.logger.info(f"Usando el perfil de pesos '{perfil.nombre}'.")
+        return PesosBlandos.desde_perfil(perfil)
+
+    def _cargar_datos_referencia(self, datos=None):
+        """
+        Toma los datos de referencia ya compilados de la caché de Django si ninguna de sus tablas cambió desde
+        que se guardaron (la clave incluye la versión de cada tabla); si no, los carga con _load_initial_data y los guarda.
+        Si se reciben `datos` ya compilados (servidor residente), se usan tal cual: la generación no los modifica.
+        """
+        if datos is None:
+            clave = clave_datos_generador(self.periodo.pk)
+            datos = cache.get(clave)
+            if datos is not None:
+                self.logger.info("Datos iniciales tomados de la caché (sin cambios en sus tablas).")
+        if datos is not None:
+            for atributo, valor in datos.items():
+                setattr(self, atributo, valor)
+        else:
+            self._load_initial_data()
+            cache.set(clave, self.exportar_datos_referencia(), TIEMPO_CACHE_DATOS_GENERADOR)
+        # Cachés propias de cada ejecución, calculadas bajo demanda
+        self.docentes_elegibles_por_materia = {} # {materia_id: mascara de posiciones de docentes}
+        self.espacios_compatibles_cache = {} # {(tipo_espacio_requerido, num_estudiantes): [EspacioCompacto, ...]}
 
-        self._load_initial_data()
+    def exportar_datos_referencia(self):
+        """Datos de referencia compilados (solo lectura durante la generación), para reutilizarlos en otro generador del período."""
+        return {atributo: getattr(self, atributo) for atributo in ATRIBUTOS_DATOS_REFERENCIA}
 
     def _load_initial_data(self):
         self.logger.info("Cargando datos iniciales para el generador de horarios...")
-        self.all_docentes = list(Docentes.objects.prefetch_related('especialidades', 'disponibilidades__bloque_horario').filter(usuario__is_active=True))
-        self.all_espacios = list(EspaciosFisicos.objects.select_related('tipo_espacio').all())
-        self.all_bloques_ordered = list(BloquesHorariosDefinicion.objects.all().order_by('dia_semana', 'hora_inicio'))
+        self.docentes_codigos = {}
+        self.max_sesiones_semana_docente = {} # {docente_id: sesiones}, solo los docentes con max_horas_semanales
+        docentes = Docentes.objects.filter(usuario__is_active=True).values_list('docente_id', 'codigo_docente', 'max_horas_semanales')
+        for docente_id, codigo_docente, max_horas_semanales in docentes:
+            self.docentes_codigos[docente_id] = codigo_docente
+            if max_horas_semanales is not None:
+                self.max_sesiones_semana_docente[docente_id] = max_horas_semanales // HORAS_ACADEMICAS_POR_SESION_ESTANDAR
+        self.all_docente_ids = list(self.docentes_codigos) # La posición en esta lista es el bit del docente
+        self.docente_posiciones = {docente_id: pos for pos, docente_id in enumerate(self.all_docente_ids)}
+        self.all_espacios = [
+            EspacioCompacto(pos, espacio_id, tipo_espacio_id, capacidad or 0)
+            for pos, (espacio_id, tipo_espacio_id, capacidad) in
+            enumerate(EspaciosFisicos.objects.values_list('espacio_id', 'tipo_espacio_id', 'capacidad'))
+        ]
+        self.espacio_posiciones = {e.espacio_id: e.indice for e in self.all_espacios}
+        self.espacios_nombres = dict(EspaciosFisicos.objects.values_list('espacio_id', 'nombre_espacio'))
+
+        bloques = BloquesHorariosDefinicion.objects.all().order_by('dia_semana', 'hora_inicio') \
+            .values_list('bloque_def_id', 'dia_semana', 'turno', 'nombre_bloque', 'hora_inicio', 'hora_fin')
+        self.all_bloques_ordered = []
+        self.bloque_posiciones = {} # {bloque_def_id: posición}
+        self.bloques_nombres = {}
+        self.mascara_dia = defaultdict(int) # {dia_semana: mascara de los bloques de ese día}
+        self.bloques_solapados = {} # {posición: mascara de los OTROS bloques del mismo día que se superponen en horario}
+        horarios = []
+        for pos, (bloque_id, dia_semana, turno, nombre_bloque, hora_inicio, hora_fin) in enumerate(bloques):
+            self.all_bloques_ordered.append(BloqueCompacto(pos, bloque_id, dia_semana, TURNO_CODIGOS.get(turno, SIN_TURNO)))
+            self.bloque_posiciones[bloque_id] = pos
+            self.bloques_nombres[bloque_id] = nombre_bloque
+            self.mascara_dia[dia_semana] |= 1 << pos
+            horarios.append((dia_semana, hora_inicio, hora_fin))
+        for pos, (dia_semana, hora_inicio, hora_fin) in enumerate(horarios):
+            for otro, (otro_dia, otro_inicio, otro_fin) in enumerate(horarios):
+                if otro != pos and otro_dia == dia_semana and hora_inicio < otro_fin and otro_inicio < hora_fin:
+                    self.bloques_solapados[pos] = self.bloques_solapados.get(pos, 0) | 1 << otro
 
         self.all_restricciones_config = list(ConfiguracionRestricciones.objects.filter(
             (Q(periodo_aplicable=self.periodo) | Q(periodo_aplicable__isnull=True)),
             esta_activa=True
         ).select_related('periodo_aplicable'))
 
-        self.docente_disponibilidad_map = self._map_docente_disponibilidad()
-        self.docente_especialidades_map = self._map_docente_especialidades()
-        self.materia_especialidades_req_map = self._map_materia_especialidades_requeridas()
+        self.disponibilidad = DisponibilidadIndex.desde_bd(self.periodo, self.all_bloques_ordered, self.docente_posiciones)
+        self.especialidades_index = EspecialidadesIndex.desde_bd()
+        self.max_sesiones_dia_docente = self._map_max_sesiones_dia_docente()
         self.logger.info("Datos iniciales cargados exitosamente.")
 
-    def _map_docente_disponibilidad(self): # Sin cambios
-        self.logger.debug("Mapeando disponibilidad de docentes...")
-        disponibilidades = DisponibilidadDocentes.objects.filter(periodo=self.periodo, esta_disponible=True) \
-            .select_related('docente', 'bloque_horario')
-        dispo_map = defaultdict(lambda: -999)
-        for d in disponibilidades:
-            key = (d.docente_id, d.dia_semana, d.bloque_horario_id)
-            dispo_map[key] = d.preferencia
-        return dispo_map
-
-    def _map_docente_especialidades(self): # Sin cambios
-        self.logger.debug("Mapeando especialidades de docentes...")
-        doc_esp_map = defaultdict(set)
-        for de in Docentes.especialidades.through.objects.all().values('docente_id', 'especialidad_id'):
-            doc_esp_map[de['docente_id']].add(de['especialidad_id'])
-        return doc_esp_map
-
-    def _map_materia_especialidades_requeridas(self): # Sin cambios
-        self.logger.debug("Mapeando especialidades requeridas por materias...")
-        mat_esp_req_map = defaultdict(set)
-        for mer in MateriaEspecialidadesRequeridas.objects.all().values('materia_id', 'especialidad_id'):
-            mat_esp_req_map[mer['materia_id']].add(mer['especialidad_id'])
-        return mat_esp_req_map
-
-    def _check_hard_configured_constraints(self, grupo, materia, docente, espacio, bloque):
+    def mascara_docentes_elegibles(self, materia_id):
+        """Máscara (por posición) de los docentes con TODAS las especialidades requeridas; no depende del bloque, se cachea."""
+        mascara = self.docentes_elegibles_por_materia.get(materia_id)
+        if mascara is None:
+            mascara = 0
+            for docente_id in self.especialidades_index.docentes_elegibles(materia_id, self.all_docente_ids):
+                mascara |= 1 << self.docente_posiciones[docente_id]
+            self.docentes_elegibles_por_materia[materia_id] = mascara
+        return mascara
+
+    def _map_max_sesiones_dia_docente(self):
+        """
+        Precalcula MAX_HORAS_DIA_DOCENTE (HARD) convertido a sesiones para cada docente.
+        Se respeta la regla original: gana la primera restricción (GLOBAL o del DOCENTE) en el orden de carga.
+        """
+        max_horas_global = None
+        max_horas_por_docente = {}
+        for r in self.all_restricciones_config:
+            if r.codigo_restriccion != R_MAX_HORAS_DIA_DOCENTE:
+                continue
+            if r.tipo_aplicacion == "GLOBAL":
+                max_horas_global = r.valor_parametro
+                break # La GLOBAL gana para todos los docentes sin una regla propia anterior a ella
+            if r.tipo_aplicacion == "DOCENTE" and r.entidad_id_1 is not None:
+                max_horas_por_docente.setdefault(r.entidad_id_1, r.valor_parametro)
+
+        max_sesiones_defecto = int(max_horas_global or "6") // HORAS_ACADEMICAS_POR_SESION_ESTANDAR # Convertir horas a sesiones
+        max_sesiones_map = MaxSesionesDocente(max_sesiones_defecto)
+        for docente_id, max_horas_str in max_horas_por_docente.items():
+            max_sesiones_map[docente_id] = int(max_horas_str) // HORAS_ACADEMICAS_POR_SESION_ESTANDAR
+        return max_sesiones_map
+
+    def check_hard_configured_constraints(self, clase: ClaseParaProgramar, docente_id, espacio_id, bloque: BloqueCompacto):
         """
         Verifica las HARD CONSTRAINTS de la tabla ConfiguracionRestricciones.
-        Ahora recibe 'materia' explícitamente.
+        Trabaja sobre ids; docente_id o espacio_id pueden ser None si la verificación es parcial.
         """
         for r in self.all_restricciones_config:
             # Ejemplo 1: Docente X no puede enseñar Materia Y
             if r.codigo_restriccion == "DOCENTE_NO_ENSENA_MATERIA_HARD": # Asumimos que este código es para una hard constraint
-                if r.tipo_aplicacion == "DOCENTE_MATERIA" and docente and r.entidad_id_1 == docente.docente_id and r.entidad_id_2 == materia.materia_id:
-                    self.logger.debug(f"Conflicto HARD Config: Docente {docente.codigo_docente} no puede enseñar {materia.codigo_materia}")
+                if r.tipo_aplicacion == "DOCENTE_MATERIA" and docente_id and r.entidad_id_1 == docente_id and r.entidad_id_2 == clase.materia_id:
+                    self.logger.debug(f"Conflicto HARD Config: Docente {docente_id} no puede enseñar materia {clase.materia_id}")
                     return False
 
             # Ejemplo 2: Materia X solo en Aula Y (HARD)
             if r.codigo_restriccion == R_AULA_EXCLUSIVA_MATERIA and r.tipo_aplicacion == "MATERIA":
-                if espacio and r.entidad_id_1 == materia.materia_id and str(espacio.espacio_id) != r.valor_parametro:
-                    self.logger.debug(f"Conflicto HARD Config: Materia {materia.codigo_materia} debe estar en aula ID {r.valor_parametro}, no en {espacio.nombre_espacio}")
+                if espacio_id and r.entidad_id_1 == clase.materia_id and str(espacio_id) != r.valor_parametro:
+                    self.logger.debug(f"Conflicto HARD Config: Materia {clase.materia_id} debe estar en aula ID {r.valor_parametro}, no en {espacio_id}")
                     return False
 
             # Ejemplo 3: No clases en un día/turno para una carrera
             if r.codigo_restriccion == R_NO_CLASES_DIA_TURNO_CARRERA and r.tipo_aplicacion == "CARRERA_DIA_TURNO":
                 # Asumimos valor_parametro como "DIA_NUM-TURNO_COD", ej. "5-T" para Viernes Tarde
                 dia_restringido, turno_restringido = r.valor_parametro.split('-')
-                if r.entidad_id_1 == grupo.carrera_id and \
+                if r.entidad_id_1 == clase.carrera_id and \
                         str(bloque.dia_semana) == dia_restringido and \
-                        bloque.turno == turno_restringido:
-                    self.logger.debug(f"Conflicto HARD Config: Carrera {grupo.carrera.codigo_carrera} no tiene clases el {dia_restringido} turno {turno_restringido}")
+                        bloque.turno_codigo == TURNO_CODIGOS.get(turno_restringido):
+                    self.logger.debug(f"Conflicto HARD Config: Carrera {clase.carrera_id} no tiene clases el {dia_restringido} turno {turno_restringido}")
                     return False
 
             # TODO: Añadir lógica para más códigos de restricción HARD
         return True
 
-    def _calculate_soft_constraint_penalties(self, grupo, materia, docente, espacio, bloque):
-        """Calcula penalizaciones por violaciones de SOFT CONSTRAINTS. Ahora recibe 'materia'"""
+    def calculate_soft_constraint_penalties(self, clase: ClaseParaProgramar, docente_pos, espacio: EspacioCompacto, bloque: BloqueCompacto):
+        """Calcula penalizaciones por violaciones de SOFT CONSTRAINTS, con los pesos de la ejecución (self.pesos)."""
         penalty = 0
+        pesos = self.pesos
 
         # Preferencia del docente (ya estaba, la mantenemos y ajustamos)
-        preferencia_docente = self.docente_disponibilidad_map.get(
-            (docente.docente_id, bloque.dia_semana, bloque.bloque_def_id), 0
-        )
-        if preferencia_docente < 0: penalty += (abs(preferencia_docente) * 10)
-        elif preferencia_docente == 0: penalty += 5
+        preferencia_docente = self.disponibilidad.preferencia(docente_pos, bloque.indice, 0)
+        if preferencia_docente < 0: penalty += (abs(preferencia_docente) * pesos.preferencia_negativa)
+        elif preferencia_docente == 0: penalty += pesos.preferencia_neutra
         # Si es > 0 (preferido), no se podría restar (bonificación)
         # elif preferencia_docente > 0: penalty -= (preferencia_docente * 2)
 
         # Capacidad del aula
-        num_estudiantes = grupo.numero_estudiantes_estimado or 0
+        num_estudiantes = clase.num_estudiantes
         if num_estudiantes > 0: # Solo aplicar si hay estudiantes estimados
             if espacio.capacidad < num_estudiantes:
-                penalty += (num_estudiantes - espacio.capacidad) * 5 # Penalización más alta por falta de espacio
+                penalty += (num_estudiantes - espacio.capacidad) * pesos.falta_asiento # Penalización más alta por falta de espacio
             elif espacio.capacidad > num_estudiantes * 2.5: # Aula demasiado grande
-                penalty += 10
+                penalty += pesos.aula_sobredimensionada
 
         # Turno preferente del grupo
-        if grupo.turno_preferente and grupo.turno_preferente != bloque.turno:
-            penalty += 20
+        if clase.turno and clase.turno != bloque.turno_codigo:
+            penalty += pesos.turno
 
         # Aplicar ConfiguracionRestricciones de tipo SOFT
         for r in self.all_restricciones_config:
-            if r.codigo_restriccion == "PREFERIR_AULA_X_PARA_MATERIA_Y": # Asumir soft
-                if r.tipo_aplicacion == "MATERIA" and r.entidad_id_1 == materia.materia_id and str(espacio.espacio_id) != r.valor_parametro:
-                    penalty += 15 # Penalización por no usar el aula preferida
+            if r.codigo_restriccion == R_PREFERIR_AULA_X_PARA_MATERIA_Y: # Asumir soft
+                if r.tipo_aplicacion == "MATERIA" and r.entidad_id_1 == clase.materia_id and str(espacio.espacio_id) != r.valor_parametro:
+                    penalty += pesos.aula_no_preferida # Penalización por no usar el aula preferida
 
             if r.codigo_restriccion == "EVITAR_HUECOS_LARGOS_DOCENTE": # Soft, requiere lógica más compleja
                 # Lógica para chequear el horario parcial del docente y penalizar huecos
-                # sesiones_docente_dia = self.horario_parcial_docentes[docente.docente_id][bloque.dia_semana]
+                # sesiones_docente_dia = self.ocupacion.sesiones_docente_en(docente_pos, self.mascara_dia[bloque.dia_semana])
                 # ... calcular huecos ...
                 pass
 
             # TODO: Añadir lógica para más códigos de restricción SOFT
         return penalty
 
-    def _crear_lista_clases_para_programar(self, grupos_del_turno):
-        self.logger.debug(f"Creando lista de clases a programar desde {len(grupos_del_turno)} grupos...")
-
-        clases_a_programar = []
-        for g in grupos_del_turno:
-            for materia_obj in g.materias.all(): # Iterar sobre todas las materias del grupo
-                horas_materia = materia_obj.horas_totales
-            sesiones_necesarias = 0
-            if HORAS_ACADEMICAS_POR_SESION_ESTANDAR > 0 and horas_materia > 0:
-                sesiones_necesarias = (horas_materia + HORAS_ACADEMICAS_POR_SESION_ESTANDAR - 1) // HORAS_ACADEMICAS_POR_SESION_ESTANDAR
-            elif horas_materia > 0:
-                sesiones_necesarias = 1
-
-                if sesiones_necesarias > 0:
-                    clase = ClaseParaProgramar(
-                        grupo=g,
-                        materia=materia_obj,
-                        sesiones_necesarias=sesiones_necesarias,
-                        sesiones_programadas=0
-                    )
-                    clases_a_programar.append(clase)
+    def crear_lista_clases_para_programar(self, grupos_del_turno, demanda: DemandaSesiones = None):
+        """
+        Clases (grupo, materia) con sesiones por programar de los grupos indicados. La demanda se compila con una
+        consulta (DemandaSesiones); si se recibe ya compilada para estos grupos, no se consulta de nuevo.
+        """
+        if demanda is None:
+            demanda = DemandaSesiones.desde_bd(grupo_ids=[g.grupo_id for g in grupos_del_turno])
+        self.logger.debug(f"Creando lista de clases a programar desde {len(demanda)} pares grupo-materia...")
+        self.grupos_codigos.update(demanda.grupos_codigos)
+        self.materias_info.update(demanda.materias_info)
+
+        clases_a_programar = [
+            ClaseParaProgramar(
+                grupo_id=grupo_id,
+                materia_id=materia_id,
+                carrera_id=carrera_id,
+                ciclo=ciclo,
+                num_estudiantes=estudiantes,
+                tipo_espacio_requerido=tipo_espacio_id,
+                turno=TURNO_CODIGOS.get(turno, SIN_TURNO),
+                sesiones_necesarias=sesiones_necesarias,
+                sesiones_programadas=self.horario_parcial_clases.get((grupo_id, materia_id), 0) # Sesiones fijas ya cargadas
+            )
+            for grupo_id, materia_id, sesiones_necesarias, carrera_id, ciclo, estudiantes, tipo_espacio_id, turno in demanda.filas()
+        ]
 
         def sort_key(clase: ClaseParaProgramar):
-            ciclo = clase.grupo.ciclo_semestral or 99
-            requiere_lab_especifico = 1 if clase.materia.requiere_tipo_espacio_especifico else 0
+            ciclo = clase.ciclo or 99
+            requiere_lab_especifico = 1 if clase.tipo_espacio_requerido else 0
             # num_restricciones = ... (lógica más compleja si se necesita)
-            return (ciclo, -requiere_lab_especifico, -clase.sesiones_necesarias, clase.grupo.grupo_id, clase.materia.materia_id)
+            return (ciclo, -requiere_lab_especifico, -clase.sesiones_necesarias, clase.grupo_id, clase.materia_id)
 
         self.logger.info(f"Se generaron {len(clases_a_programar)} clases únicas para programar.")
+        self.clases_generadas.extend(clases_a_programar)
         return sorted(clases_a_programar, key=sort_key)
 
-    def _get_docentes_candidatos(self, materia: Materias, grupo: Grupos, bloque: BloquesHorariosDefinicion): # Añadido grupo
-        candidatos = []
-        especialidades_requeridas = self.materia_especialidades_req_map.get(materia.materia_id, set())
+    def mascara_docentes_libres(self, clase: ClaseParaProgramar, bloque: BloqueCompacto):
+        """
+        Lectura de columnas: docentes disponibles en el bloque, con TODAS las especialidades requeridas y sin clase
+        en él ni en un bloque que se superponga.
+        """
+        return self.disponibilidad.docentes_libres(bloque.indice) \
+            & self.mascara_docentes_elegibles(clase.materia_id) \
+            & ~self.ocupacion.docentes_ocupados_en(bloque.indice)
 
-        for docente in self.all_docentes:
-            preferencia = self.docente_disponibilidad_map.get(
-                (docente.docente_id, bloque.dia_semana, bloque.bloque_def_id), -999
-            )
-            if preferencia < -900: continue
+    def get_docentes_candidatos(self, clase: ClaseParaProgramar, bloque: BloqueCompacto, libres):
+        """Filtra la máscara de docentes libres por las reglas duras; devuelve posiciones de docentes."""
+        candidatos = []
+        mascara_dia = self.mascara_dia[bloque.dia_semana]
 
-            if especialidades_requeridas:
-                docente_especialidades = self.docente_especialidades_map.get(docente.docente_id, set())
-                if not especialidades_requeridas.issubset(docente_especialidades): # Docente debe tener TODAS las especialidades requeridas
-                    continue
+        for docente_pos in iterar_bits(libres):
+            docente_id = self.all_docente_ids[docente_pos]
 
-            # Verificar MAX_HORAS_DIA_DOCENTE (HARD)
-            # Esta es una implementación de ejemplo, puede ser más sofisticada
-            sesiones_hoy_docente = len(self.horario_parcial_docentes[docente.docente_id][bloque.dia_semana])
-            max_horas_dia_str = "6" # Default
-            for r in self.all_restricciones_config:
-                if r.codigo_restriccion == R_MAX_HORAS_DIA_DOCENTE and \
-                        (r.tipo_aplicacion == "GLOBAL" or (r.tipo_aplicacion == "DOCENTE" and r.entidad_id_1 == docente.docente_id)):
-                    max_horas_dia_str = r.valor_parametro
-                    break # Tomar la más específica o la primera global
-
-            max_sesiones_dia = int(max_horas_dia_str) // HORAS_ACADEMICAS_POR_SESION_ESTANDAR # Convertir horas a sesiones
-            if sesiones_hoy_docente >= max_sesiones_dia:
-                self.logger.debug(f"Docente {docente.codigo_docente} ha alcanzado max sesiones ({max_sesiones_dia}) para día {bloque.dia_semana}")
+            # Verificar MAX_HORAS_DIA_DOCENTE (HARD), ya convertido a sesiones al cargar los datos
+            if self.ocupacion.sesiones_docente_en(docente_pos, mascara_dia) >= self.max_sesiones_dia_docente[docente_id]:
                 continue
 
-            if not self._check_hard_configured_constraints(grupo, materia, docente, None, bloque): # Chequear restricciones que solo involucran docente/grupo/bloque
+            if not self.check_hard_configured_constraints(clase, docente_id, None, bloque): # Chequear restricciones que solo involucran docente/grupo/bloque
                 continue
 
-            candidatos.append(docente)
+            candidatos.append(docente_pos)
 
         # Ordenar candidatos por alguna preferencia (ej. menor carga actual, mayor preferencia por el bloque)
         # random.shuffle(candidatos) # O simplemente aleatorizar
         return candidatos
 
-    def _get_espacios_candidatos(self, materia: Materias, grupo: Grupos, bloque: BloquesHorariosDefinicion): # Añadido bloque
-        candidatos = []
-        num_estudiantes = grupo.numero_estudiantes_estimado or 15
-
-        for espacio in self.all_espacios:
-            if materia.requiere_tipo_espacio_especifico and materia.requiere_tipo_espacio_especifico != espacio.tipo_espacio:
-                continue
-            if espacio.capacidad < num_estudiantes:
-                continue
-            if not self._check_hard_configured_constraints(grupo, materia, None, espacio, bloque): # Chequear restricciones que solo involucran espacio/grupo/bloque
-                continue
-            candidatos.append(espacio)
-
-        # Ordenar por "mejor ajuste" de capacidad
-        # random.shuffle(candidatos)
-        return sorted(candidatos, key=lambda e: abs(e.capacidad - num_estudiantes))
+    def espacios_compatibles(self, clase: ClaseParaProgramar):
+        """Espacios del tipo y capacidad requeridos, ordenados por "mejor ajuste" de capacidad (no depende del bloque, se cachea)."""
+        num_estudiantes = clase.num_estudiantes or ESTUDIANTES_POR_DEFECTO
+        clave = (clase.tipo_espacio_requerido, num_estudiantes)
+        compatibles = self.espacios_compatibles_cache.get(clave)
+        if compatibles is None:
+            compatibles = [
+                espacio for espacio in self.all_espacios
+                if (not clase.tipo_espacio_requerido or clase.tipo_espacio_requerido == espacio.tipo_espacio_id)
+                and espacio.capacidad >= num_estudiantes
+            ]
+            compatibles.sort(key=lambda e: abs(e.capacidad - num_estudiantes))
+            self.espacios_compatibles_cache[clave] = compatibles
+        return compatibles
+
+    def get_espacios_candidatos(self, clase: ClaseParaProgramar, bloque: BloqueCompacto, espacios_libres):
+        """Filtra los espacios libres del bloque por las reglas duras que solo involucran espacio/grupo/bloque."""
+        return [
+            espacio for espacio in espacios_libres
+            if self.check_hard_configured_constraints(clase, None, espacio.espacio_id, bloque)
+        ]
 
     def _find_best_assignment_for_session(self, clase: ClaseParaProgramar, bloques_del_turno):
-        """Intenta encontrar el mejor docente, espacio y bloque para una sesión de una clase."""
-        grupo = clase.grupo
-        materia = clase.materia
+        """
+        Intenta encontrar el mejor docente, espacio y bloque para una sesión de una clase.
+        De paso registra en `clase.diagnostico` por qué se descartó cada bloque.
+        """
         mejor_opcion = None
         menor_penalizacion = float('inf')
+        espacios_compatibles = self.espacios_compatibles(clase)
+        diagnostico = DiagnosticoSesion()
 
         for bloque in bloques_del_turno:
-            # 1. Verificar si el bloque ya está ocupado para el grupo
-            if bloque.bloque_def_id in self.horario_parcial_grupos.get(grupo.grupo_id, {}).get(bloque.dia_semana, []):
+            diagnostico.bloques_evaluados += 1
+
+            # 1. Verificar si el bloque (o uno que se superpone) ya está ocupado para el grupo
+            if self.ocupacion.grupo_ocupado(clase.grupo_id, bloque.indice):
+                diagnostico.conflicto_grupo += 1
+                continue
+
+            # 2. Obtener candidatos (docentes y espacios), distinguiendo el motivo del descarte
+            docentes_libres = self.mascara_docentes_libres(clase, bloque)
+            if not docentes_libres:
+                diagnostico.sin_docente += 1
                 continue
 
-            # 2. Obtener candidatos (docentes y espacios)
-            docentes_candidatos = self._get_docentes_candidatos(materia, grupo, bloque)
-            espacios_candidatos = self._get_espacios_candidatos(materia, grupo, bloque)
+            espacios_ocupados = self.ocupacion.espacios_ocupados_en(bloque.indice)
+            espacios_libres = [e for e in espacios_compatibles if not espacios_ocupados >> e.indice & 1]
+            if not espacios_libres:
+                diagnostico.sin_aula += 1
+                continue
 
+            docentes_candidatos = self.get_docentes_candidatos(clase, bloque, docentes_libres)
+            espacios_candidatos = self.get_espacios_candidatos(clase, bloque, espacios_libres)
             if not docentes_candidatos or not espacios_candidatos:
+                diagnostico.reglas_duras += 1
                 continue
 
             # 3. Evaluar combinaciones para encontrar la de menor penalización
-            for docente in docentes_candidatos:
-                # Verificar si el docente está ocupado en ese bloque
-                if bloque.bloque_def_id in self.horario_parcial_docentes.get(docente.docente_id, {}).get(bloque.dia_semana, []):
-                    continue
+            # (docentes y espacios candidatos ya vienen filtrados por la ocupación del bloque)
+            hubo_combinacion = False
+            for docente_pos in docentes_candidatos:
+                docente_id = self.all_docente_ids[docente_pos]
 
                 for espacio in espacios_candidatos:
-                    # Verificar si el espacio está ocupado en ese bloque
-                    if bloque.bloque_def_id in self.horario_parcial_espacios.get(espacio.espacio_id, {}).get(bloque.dia_semana, []):
-                        continue
-
                     # 3.1 Verificar Hard Constraints (ya se hace dentro de get_candidatos, pero podemos re-verificar por si acaso)
-                    if not self._check_hard_configured_constraints(grupo, materia, docente, espacio, bloque):
+                    if not self.check_hard_configured_constraints(clase, docente_id, espacio.espacio_id, bloque):
                         continue
+                    hubo_combinacion = True
 
                     # 3.2 Calcular penalizaciones de Soft Constraints
-                    penalizacion = self._calculate_soft_constraint_penalties(grupo, materia, docente, espacio, bloque)
+                    penalizacion = self.calculate_soft_constraint_penalties(clase, docente_pos, espacio, bloque)
 
                     if penalizacion < menor_penalizacion:
                         menor_penalizacion = penalizacion
-                        mejor_opcion = (docente, espacio, bloque)
+                        mejor_opcion = (docente_pos, espacio, bloque)
 
+            if not hubo_combinacion:
+                diagnostico.reglas_duras += 1
+
+        if mejor_opcion is None:
+            clase.diagnostico = diagnostico
         return mejor_opcion, menor_penalizacion
 
-    def generar_horarios_por_turno(self, turno_codigo, ciclos_del_turno):
+    def _registrar_asignacion(self, clase: ClaseParaProgramar, docente_pos, espacio: EspacioCompacto, bloque: BloqueCompacto, penalizacion=0):
+        """Agrega una sesión al horario propuesto y actualiza el estado parcial del generador (se persiste en aplicar_cambios)."""
+        self.asignaciones_propuestas.append((
+            clase.grupo_id, clase.materia_id, self.all_docente_ids[docente_pos],
+            espacio.espacio_id, bloque.dia_semana, bloque.bloque_def_id
+        ))
+        self.penalizacion_total += penalizacion
+
+        self.ocupacion.ocupar(docente_pos, espacio.indice, clase.grupo_id, bloque.indice)
+        self.horario_parcial_clases[(clase.grupo_id, clase.materia_id)] += 1
+        clase.sesiones_programadas += 1
+        if self.opciones.reservas is not None:
+            self._sin_reservar.append((self.asignaciones_propuestas[-1], clase, docente_pos, espacio, bloque, penalizacion))
+
+    def _quitar_asignacion(self, asignacion, clase: ClaseParaProgramar, docente_pos, espacio: EspacioCompacto, bloque: BloqueCompacto, penalizacion=0):
+        """Deshace un _registrar_asignacion."""
+        self.asignaciones_propuestas.remove(asignacion)
+        self.penalizacion_total -= penalizacion
+        self.ocupacion.liberar(docente_pos, espacio.indice, clase.grupo_id, bloque.indice)
+        self.horario_parcial_clases[(clase.grupo_id, clase.materia_id)] -= 1
+        clase.sesiones_programadas -= 1
+
+    def _marcar_franjas_ajenas(self, franjas):
+        """Marca como ocupadas las franjas (tipo_recurso, recurso_id, bloque_id) reservadas por otras particiones."""
+        for tipo, recurso_id, bloque_id in franjas:
+            bloque_pos = self.bloque_posiciones.get(bloque_id)
+            if bloque_pos is None:
+                continue
+            if tipo == ReservaFranja.DOCENTE:
+                self.ocupacion.ocupar_recursos(self.docente_posiciones.get(recurso_id), None, bloque_pos)
+            else:
+                self.ocupacion.ocupar_recursos(None, self.espacio_posiciones.get(recurso_id), bloque_pos)
+
+    def _confirmar_reservas(self):
+        """
+        Reserva en lote las franjas de las sesiones registradas desde la última confirmación. Las sesiones que
+        chocan con franjas de otra partición se deshacen (liberando la franja propia que sí obtuvieron) y esas
+        franjas quedan marcadas como ocupadas. Devuelve {clase: sesiones deshechas}.
+        """
+        pendientes, self._sin_reservar = self._sin_reservar, []
+        ajenas = self.opciones.reservas.reclamar(
+            franja for pendiente in pendientes for franja in self.opciones.reservas.franjas_de_asignacion(pendiente[0])
+        )
+        deshechas = defaultdict(int)
+        if not ajenas:
+            return deshechas
+
+        a_liberar = []
+        for asignacion, clase, docente_pos, espacio, bloque, penalizacion in pendientes:
+            franjas = self.opciones.reservas.franjas_de_asignacion(asignacion)
+            if ajenas.isdisjoint(franjas):
+                continue
+            self._quitar_asignacion(asignacion, clase, docente_pos, espacio, bloque, penalizacion)
+            a_liberar.extend(f for f in franjas if f not in ajenas)
+            deshechas[clase] += 1
+        self.opciones.reservas.liberar(a_liberar)
+        self._marcar_franjas_ajenas(ajenas)
+        self.generation_stats["reservas_perdidas"] += sum(deshechas.values())
+        return deshechas
+
+    def _programar_con_reservas(self, clases, bloques_disponibles):
+        """
+        Generación distribuida: busca localmente todas las clases del turno y reserva sus franjas en lote (una
+        inserción y una consulta por ronda). Las clases con sesiones cuyas franjas ya tenía otra partición se
+        buscan de nuevo en la ronda siguiente, hasta MAX_REINTENTOS_RESERVA veces.
+        """
+        self._marcar_franjas_ajenas(self.opciones.reservas.reservas_de_otros())
+        pendientes = clases
+        for _ in range(MAX_REINTENTOS_RESERVA + 1):
+            fallidas = set()
+            for clase in pendientes:
+                if self.debe_detenerse():
+                    break
+                if self.programar_clase(clase, bloques_disponibles)[1]:
+                    fallidas.add(clase)
+            # Las que fallaron ya están entre las no resueltas y no les quedan huecos locales
+            pendientes = [clase for clase in self._confirmar_reservas() if clase not in fallidas]
+            if not pendientes:
+                return
+        self.unresolved_conflicts.extend(pendientes)
+
+    def consolidar(self, asignaciones_particiones, detenido=None):
+        """
+        Generación distribuida: aplica sobre el período, como un único diff, la unión de los horarios de las
+        particiones (tuplas CAMPOS_ASIGNACION), verificada con _consolidar_particiones. `detenido` es el motivo
+        si alguna partición se detuvo antes de terminar: la escritura sigue entonces la regla de persistir_parcial.
+        Devuelve {"cambios": diff, "descartadas": [sesiones de las particiones que no se registraron]}.
+        """
+        self.iniciar_generacion(HorariosAsignados.objects.filter(periodo=self.periodo))
+        descartadas = self._consolidar_particiones(asignaciones_particiones)
+        self.detenido = detenido
+        return {"cambios": self.aplicar_cambios(), "descartadas": descartadas}
+
+    def _consolidar_particiones(self, asignaciones):
+        """
+        Registra la unión de los horarios de las particiones verificando cada sesión contra la ocupación del
+        período, como al sembrar. Las reservas solo hacen exclusivas las franjas exactas y cada partición mide
+        los topes con su propia carga, así que la unión puede pasar el tope diario de un docente o chocar en
+        bloques superpuestos; esas sesiones se descartan y sus clases se vuelven a buscar aquí, ya con todo el
+        horario a la vista. Devuelve las descartadas.
+        """
+        clases = self.crear_lista_clases_para_programar(Grupos.objects.filter(periodo=self.periodo))
+        por_grupo = defaultdict(list)
+        for grupo_id, materia_id, docente_id, espacio_id, _, bloque_id in asignaciones:
+            por_grupo[grupo_id].append((materia_id, docente_id, espacio_id, bloque_id))
+        self.sembrar_asignaciones(clases, self.all_bloques_ordered, por_grupo)
+
+        descartadas = list((Counter(tuple(a) for a in asignaciones) - Counter(self.asignaciones_propuestas)).elements())
+        a_reprogramar = {(a[0], a[1]) for a in descartadas}
+        for clase in clases:
+            if (clase.grupo_id, clase.materia_id) not in a_reprogramar:
+                continue
+            turno = next((t for t, ciclos in TURNOS_CICLOS_MAP.items() if clase.ciclo in ciclos), None)
+            bloques = [b for b in self.all_bloques_ordered if b.turno_codigo == TURNO_CODIGOS.get(turno, SIN_TURNO)]
+            self.programar_clase(clase, bloques)
+        self.generation_stats["sesiones_descartadas_al_consolidar"] += len(descartadas)
+        return descartadas
+
+    def programar_clase(self, clase: ClaseParaProgramar, bloques_disponibles):
+        """
+        Programa las sesiones pendientes de una clase. Devuelve (sesiones_exitosas, hubo_fallo).
+        Se deja de intentar con la clase en cuanto una sesión no encuentra hueco.
+        """
+        sesiones_exitosas = 0
+        sesiones_ya_programadas = self.horario_parcial_clases.get((clase.grupo_id, clase.materia_id), 0)
+        if (clase.grupo_id, clase.materia_id) in self.clases_fallidas_previas:
+            # Ya falló antes del punto de control: no se repite su búsqueda
+            clase.diagnostico = self.diagnosticos_previos.get((clase.grupo_id, clase.materia_id))
+            self.unresolved_conflicts.append(clase)
+            return sesiones_exitosas, True
+
+        for i in range(clase.sesiones_necesarias - sesiones_ya_programadas):
+            if self.debe_detenerse():
+                break
+            self._guardar_punto_control_periodico()
+            mejor_opcion, penalizacion = self._find_best_assignment_for_session(clase, bloques_disponibles)
+
+            if not mejor_opcion:
+                self.logger.warning(
+                    f"[ASIGNACIÓN FALLIDA] No se encontró asignación para la sesión {sesiones_ya_programadas + i + 1}/{clase.sesiones_necesarias} "
+                    f"de la clase {self.describir_clase(clase)}. Diagnóstico: {clase.diagnostico.como_dict()}"
+                )
+                self.unresolved_conflicts.append(clase)
+                return sesiones_exitosas, True
+
+            docente_pos, espacio, bloque = mejor_opcion
+            self.logger.debug(
+                f"[ASIGNACIÓN OK] Clase: {self.describir_clase(clase)} "
+                f"en Bloque: {self.bloques_nombres.get(bloque.bloque_def_id)} con Doc: {self.docentes_codigos.get(self.all_docente_ids[docente_pos])}, "
+                f"Esp: {self.espacios_nombres.get(espacio.espacio_id)} (Penalización: {penalizacion})"
+            )
+            self._registrar_asignacion(clase, docente_pos, espacio, bloque, penalizacion)
+            sesiones_exitosas += 1
+
+        return sesiones_exitosas, False
+
+    def iniciar_generacion(self, asignaciones_qs):
+        """
+        Reinicia el estado de la ejecución para el alcance `asignaciones_qs` (período, grupo o ciclo).
+        Toma una foto de las asignaciones reemplazables del alcance y carga las confirmadas/fijadas en
+        la ocupación como inamovibles. No escribe nada: el borrado y la inserción ocurren en aplicar_cambios.
+        """
+        self.unresolved_conflicts = []
+        self.ocupacion.limpiar()
+        self.horario_parcial_clases.clear()
+        self.asignaciones_propuestas = []
+        self.penalizacion_total = 0
+        self.clases_generadas = []
+
+        self.alcance_qs = asignaciones_qs
+        self.asignaciones_fijas = [] # [(grupo_id, materia_id, docente_id, espacio_id, bloque_def_id)], para la huella del resultado
+        self.asignaciones_previas = {}
+        self.asignaciones_canceladas = [] # Las canceladas no fijas se borran siempre, como antes
+        for fila in asignaciones_qs.exclude(FILTRO_ASIGNACIONES_FIJAS).values_list('horario_id', 'estado', *CAMPOS_ASIGNACION).iterator():
+            if fila[1] == 'Cancelado':
+                self.asignaciones_canceladas.append(fila[0])
+            else:
+                self.asignaciones_previas[fila[2:]] = fila[0]
+
+        bloques_por_id = {b.bloque_def_id: b for b in self.all_bloques_ordered}
+        espacio_posiciones = {e.espacio_id: e.indice for e in self.all_espacios}
+        fijas = 0
+        filas = asignaciones_qs.filter(FILTRO_ASIGNACIONES_FIJAS) \
+            .values_list('grupo_id', 'materia_id', 'docente_id', 'espacio_id', 'bloque_horario_id')
+        for grupo_id, materia_id, docente_id, espacio_id, bloque_id in filas.iterator():
+            self.asignaciones_fijas.append((grupo_id, materia_id, docente_id, espacio_id, bloque_id))
+            bloque = bloques_por_id.get(bloque_id)
+            if bloque is None:
+                continue
+            self.ocupacion.ocupar(self.docente_posiciones.get(docente_id), espacio_posiciones.get(espacio_id), grupo_id, bloque.indice)
+            self.horario_parcial_clases[(grupo_id, materia_id)] += 1
+            fijas += 1
+
+        self.generation_stats["sesiones_fijas"] += fijas
+        if fijas:
+            self.logger.info(f"Se conservan {fijas} asignaciones confirmadas/fijadas.")
+        return fijas
+
+    def _cargar_ocupacion_fuera_del_alcance(self, clases):
+        """
+        Para la generación por grupo o por ciclo: marca como ocupados los docentes y aulas que ya tienen clase con
+        otros grupos del período. Solo se leen las filas de los docentes elegibles y las aulas compatibles con `clases`.
+        Sin esto se podían proponer cruces con el resto del horario (IntegrityError al guardar).
+        """
+        docentes_mascara = 0
+        espacio_ids = set()
+        for clase in clases:
+            docentes_mascara |= self.mascara_docentes_elegibles(clase.materia_id)
+            espacio_ids.update(e.espacio_id for e in self.espacios_compatibles(clase))
+        if not docentes_mascara and not espacio_ids:
+            return 0
+
+        if docentes_mascara == (1 << len(self.all_docente_ids)) - 1:
+            filtro = Q() # Alguna materia no exige especialidades: cualquier docente es relevante
+        else:
+            docente_ids = [self.all_docente_ids[pos] for pos in iterar_bits(docentes_mascara)]
+            filtro = Q(docente_id__in=docente_ids) | Q(espacio_id__in=espacio_ids)
+        # Las canceladas también ocupan la franja (restricciones únicas de la tabla), pero no cuentan para los topes del docente
+        filas = HorariosAsignados.objects.filter(periodo=self.periodo).filter(filtro) \
+            .exclude(horario_id__in=self.alcance_qs.values('horario_id')) \
+            .values_list('docente_id', 'espacio_id', 'bloque_horario_id', 'estado')
+        ocupadas = 0
+        for docente_id, espacio_id, bloque_id, estado in filas.iterator():
+            bloque_pos = self.bloque_posiciones.get(bloque_id)
+            if bloque_pos is None:
+                continue
+            self.ocupacion.ocupar_recursos(self.docente_posiciones.get(docente_id), self.espacio_posiciones.get(espacio_id), bloque_pos,
+                                           carga=estado != 'Cancelado')
+            ocupadas += 1
+        self.logger.info(f"{ocupadas} asignaciones de otros grupos ocupan docentes o aulas relevantes.")
+        return ocupadas
+
+    def cargar_horario_actual(self):
+        """
+        Para la planificación manual (sugerencias, suplencias, movimientos): ocupa docentes, aulas y grupos con todas
+        las asignaciones del período, también las canceladas, que ocupan la franja para las restricciones únicas de
+        la tabla pero no cuentan para los topes diario y semanal del docente. Devuelve las filas
+        (horario_id, estado, *CAMPOS_ASIGNACION).
+        """
+        self.ocupacion.limpiar()
+        filas = list(HorariosAsignados.objects.filter(periodo=self.periodo).values_list('horario_id', 'estado', *CAMPOS_ASIGNACION))
+        for _, estado, grupo_id, _, docente_id, espacio_id, _, bloque_id in filas:
+            bloque_pos = self.bloque_posiciones.get(bloque_id)
+            if bloque_pos is not None:
+                self.ocupacion.ocupar(self.docente_posiciones.get(docente_id), self.espacio_posiciones.get(espacio_id), grupo_id, bloque_pos,
+                                      carga=estado != 'Cancelado')
+        return filas
+
+    def _cargar_ocupacion_de_periodos_concurrentes(self):
+        """Marca como ocupados los bloques en que los docentes ya dictan clase en `periodos_concurrentes`."""
+        if not self.periodos_concurrentes:
+            return 0
+        filas = HorariosAsignados.objects.filter(periodo_id__in=self.periodos_concurrentes).exclude(estado='Cancelado') \
+            .values_list('docente_id', 'bloque_horario_id')
+        ocupadas = 0
+        for docente_id, bloque_id in filas.iterator():
+            docente_pos = self.docente_posiciones.get(docente_id)
+            bloque_pos = self.bloque_posiciones.get(bloque_id)
+            if docente_pos is None or bloque_pos is None:
+                continue
+            self.ocupacion.ocupar_recursos(docente_pos, None, bloque_pos)
+            ocupadas += 1
+        self.generation_stats["sesiones_otros_periodos"] += ocupadas
+        self.logger.info(f"{ocupadas} clases de los períodos {self.periodos_concurrentes} ocupan docentes de este período.")
+        return ocupadas
+
+    def aplicar_cambios(self):
+        """
+        Compara el horario propuesto con la foto tomada en iniciar_generacion. Salvo en dry_run, aplica
+        solo el diff (borra lo que sobra e inserta lo nuevo) en una única transacción. Devuelve el diff.
+        """
+        propuestas = set(self.asignaciones_propuestas)
+        agregadas = [a for a in self.asignaciones_propuestas if a not in self.asignaciones_previas]
+        eliminadas = [a for a in self.asignaciones_previas if a not in propuestas]
+
+        persistir = not self.dry_run
+        if persistir and self.detenido:
+            # Ejecución incompleta: se guarda solo si se pidió y si no empeora el horario que ya existía
+            persistir = self.opciones.persistir_parcial and len(self.asignaciones_propuestas) >= len(self.asignaciones_previas)
+            if not persistir:
+                self.logger.warning("Generación incompleta: se mantiene el horario previo (no se escriben cambios).")
+
+        if persistir:
+            with transaction.atomic():
+                ids_a_borrar = [self.asignaciones_previas[a] for a in eliminadas] + self.asignaciones_canceladas
+                HorariosAsignados.objects.filter(horario_id__in=ids_a_borrar).delete()
+                HorariosAsignados.objects.bulk_create([
+                    HorariosAsignados(periodo=self.periodo, estado='Programado', **dict(zip(CAMPOS_ASIGNACION, a)))
+                    for a in agregadas
+                ])
+            self.logger.info(f"Cambios aplicados: {len(agregadas)} asignaciones nuevas, {len(eliminadas)} eliminadas.")
+        elif self.dry_run:
+            self.logger.info(f"[DRY RUN] Se proponen {len(agregadas)} asignaciones nuevas y {len(eliminadas)} eliminadas (sin escribir en la BD).")
+
+        return {
+            "persistido": persistir,
+            "agregadas": len(agregadas),
+            "eliminadas": len(eliminadas),
+            "conservadas": len(propuestas) - len(agregadas),
+            "detalle_agregadas": [dict(zip(CAMPOS_ASIGNACION, a)) for a in agregadas],
+            "detalle_eliminadas": [dict(zip(CAMPOS_ASIGNACION, a)) for a in eliminadas],
+        }
+
+    def metricas_calidad(self):
+        """Métricas de la ejecución actual (cobertura y penalización de restricciones blandas)."""
+        requeridas = sum(c.sesiones_necesarias for c in self.clases_generadas)
+        programadas = sum(min(c.sesiones_programadas, c.sesiones_necesarias) for c in self.clases_generadas)
+        propuestas = len(self.asignaciones_propuestas)
+        return {
+            "sesiones_requeridas": requeridas,
+            "sesiones_programadas": programadas,
+            "sesiones_sin_programar": requeridas - programadas,
+            "cobertura": round(100.0 * programadas / requeridas, 1) if requeridas else 100.0,
+            "clases_sin_resolver": len(self.unresolved_conflicts),
+            "penalizacion_total": self.penalizacion_total,
+            "penalizacion_promedio": round(self.penalizacion_total / propuestas, 2) if propuestas else 0,
+            "duracion_segundos": round(time.monotonic() - self._inicio, 3),
+        }
+
+    def _asignacion_factible(self, clase: ClaseParaProgramar, docente_pos, espacio: EspacioCompacto, bloque: BloqueCompacto):
+        """Verifica una asignación concreta contra la ocupación actual y las mismas reglas duras que usa la búsqueda."""
+        if self.ocupacion.grupo_ocupado(clase.grupo_id, bloque.indice):
+            return False
+        if not self.mascara_docentes_libres(clase, bloque) >> docente_pos & 1:
+            return False
+        docente_id = self.all_docente_ids[docente_pos]
+        if self.ocupacion.sesiones_docente_en(docente_pos, self.mascara_dia[bloque.dia_semana]) >= self.max_sesiones_dia_docente[docente_id]:
+            return False
+        if self.ocupacion.espacio_ocupado(espacio.indice, bloque.indice) or espacio not in self.espacios_compatibles(clase):
+            return False
+        return self.check_hard_configured_constraints(clase, docente_id, espacio.espacio_id, bloque)
+
+    @staticmethod
+    def _seccion_grupo(codigo_grupo):
+        """Sufijo numérico del código del grupo (la "sección"), p. ej. 'G025CE2026I2' -> '2'."""
+        coincidencia = re.search(r'(\d+)$', codigo_grupo or '')
+        return coincidencia.group(1) if coincidencia else ''
+
+    def _mapear_grupos_origen(self):
+        """
+        Relaciona los grupos del período origen con los del período actual. Devuelve {grupo_origen_id: grupo_destino_id}.
+        1. Por patrón de código: el código con el nombre del período reemplazado (p. ej. G025CE2025II1 -> G025CE2026I1).
+        2. Para los restantes, por carrera, ciclo y sección (sufijo numérico del código).
+        """
+        campos = ('grupo_id', 'codigo_grupo', 'carrera_id', 'ciclo_semestral')
+        grupos_destino = list(Grupos.objects.filter(periodo=self.periodo).values_list(*campos))
+        grupos_origen = list(Grupos.objects.filter(periodo=self.periodo_origen).values_list(*campos))
+
+        def patron(codigo, periodo):
+            token = periodo.nombre_periodo.replace('-', '')
+            return codigo.replace(token, '{periodo}') if token else codigo
+
+        destino_por_patron = {patron(codigo, self.periodo): grupo_id for grupo_id, codigo, _, _ in grupos_destino}
+        mapeo = {}
+        for grupo_id, codigo, _, _ in grupos_origen:
+            destino = destino_por_patron.get(patron(codigo, self.periodo_origen))
+            if destino is not None:
+                mapeo[grupo_id] = destino
+
+        destinos_usados = set(mapeo.values())
+        destino_por_seccion = {}
+        for grupo_id, codigo, carrera_id, ciclo in grupos_destino:
+            if grupo_id not in destinos_usados:
+                destino_por_seccion.setdefault((carrera_id, ciclo, self._seccion_grupo(codigo)), grupo_id)
+        for grupo_id, codigo, carrera_id, ciclo in grupos_origen:
+            if grupo_id in mapeo:
+                continue
+            destino = destino_por_seccion.pop((carrera_id, ciclo, self._seccion_grupo(codigo)), None)
+            if destino is not None:
+                mapeo[grupo_id] = destino
+        return mapeo
+
+    def _cargar_asignaciones_origen(self):
+        mapeo = self._mapear_grupos_origen()
+        asignaciones = defaultdict(list)
+        filas = HorariosAsignados.objects.filter(periodo=self.periodo_origen, grupo_id__in=list(mapeo)) \
+            .exclude(estado='Cancelado') \
+            .order_by('dia_semana', 'bloque_horario__hora_inicio') \
+            .values_list('grupo_id', 'materia_id', 'docente_id', 'espacio_id', 'bloque_horario_id')
+        for grupo_origen_id, materia_id, docente_id, espacio_id, bloque_id in filas.iterator():
+            asignaciones[mapeo[grupo_origen_id]].append((materia_id, docente_id, espacio_id, bloque_id))
+        self.logger.info(
+            f"Arranque en caliente desde {self.periodo_origen.nombre_periodo}: {len(mapeo)} grupos relacionados, "
+            f"{sum(len(a) for a in asignaciones.values())} asignaciones previas."
+        )
+        return asignaciones
+
+    def sembrar_asignaciones(self, clases, bloques_permitidos, asignaciones_por_grupo):
+        """
+        Registra, antes de la búsqueda, las asignaciones dadas ({grupo_id: [(materia_id, docente_id, espacio_id,
+        bloque_def_id), ...]}) que siguen siendo factibles para las clases. Devuelve {grupo_id: sesiones registradas}.
+        """
+        registradas = defaultdict(int)
+        clases_por_clave = {(c.grupo_id, c.materia_id): c for c in clases}
+        bloques_por_id = {b.bloque_def_id: b for b in bloques_permitidos}
+        espacios_por_id = {e.espacio_id: e for e in self.all_espacios}
+        for grupo_id in dict.fromkeys(c.grupo_id for c in clases):
+            for materia_id, docente_id, espacio_id, bloque_id in asignaciones_por_grupo.get(grupo_id, ()):
+                clase = clases_por_clave.get((grupo_id, materia_id))
+                bloque = bloques_por_id.get(bloque_id)
+                docente_pos = self.docente_posiciones.get(docente_id)
+                espacio = espacios_por_id.get(espacio_id)
+                if clase is None or bloque is None or docente_pos is None or espacio is None:
+                    continue # La materia, el bloque, el docente o el aula ya no existen en este período
+                if self.horario_parcial_clases.get((grupo_id, materia_id), 0) >= clase.sesiones_necesarias:
+                    continue
+                if not self._asignacion_factible(clase, docente_pos, espacio, bloque):
+                    continue
+                penalizacion = self.calculate_soft_constraint_penalties(clase, docente_pos, espacio, bloque)
+                self._registrar_asignacion(clase, docente_pos, espacio, bloque, penalizacion)
+                registradas[grupo_id] += 1
+        return registradas
+
+    def _sembrar_desde_periodo_origen(self, clases, bloques_permitidos):
+        """
+        Registra las asignaciones del período origen que siguen siendo factibles para las clases dadas,
+        antes de la búsqueda; el resto de las sesiones se busca normalmente. Devuelve {grupo_id: sesiones reutilizadas}.
+        """
+        if self.periodo_origen is None:
+            return defaultdict(int)
+        if self.asignaciones_origen is None:
+            self.asignaciones_origen = self._cargar_asignaciones_origen()
+
+        reutilizadas = self.sembrar_asignaciones(clases, bloques_permitidos, self.asignaciones_origen)
+        self.generation_stats["sesiones_reutilizadas"] += sum(reutilizadas.values())
+        return reutilizadas
+
+    def punto_control(self):
+        """Estado compacto de la ejecución: lo programado hasta ahora (tuplas de ids) y las clases que ya fallaron."""
+        return {
+            "periodo_id": self.periodo.pk,
+            "asignaciones": [list(a) for a in self.asignaciones_propuestas],
+            "clases_fallidas": [[c.grupo_id, c.materia_id] for c in self.unresolved_conflicts],
+            "diagnosticos": [[c.grupo_id, c.materia_id, c.diagnostico.como_dict()] for c in self.unresolved_conflicts if c.diagnostico],
+            "sesiones_reutilizadas": self.generation_stats.get("sesiones_reutilizadas", 0),
+            "segundos_transcurridos": round(time.monotonic() - self._inicio, 3),
+        }
+
+    def _guardar_punto_control_periodico(self):
+        if self.opciones.guardar_punto_control is None or time.monotonic() < self._proximo_punto_control:
+            return
+        estado = self.punto_control()
+        try:
+            self.opciones.guardar_punto_control(estado)
+        except Exception as e: # Un punto de control perdido no debe abortar la generación
+            self.logger.error(f"No se pudo guardar el punto de control: {str(e)}")
+        self._proximo_punto_control = time.monotonic() + INTERVALO_PUNTO_CONTROL
+        self.logger.info(f"Punto de control guardado ({len(estado['asignaciones'])} asignaciones).")
+
+    def _cargar_punto_control(self):
+        """
+        Prepara la reanudación desde `punto_control_inicial`: sus asignaciones se vuelven a registrar (si siguen
+        siendo factibles) al crear las clases de cada turno, en el mismo orden en que se generaron, y las clases
+        que ya habían fallado no se vuelven a buscar. Lo que dejó de ser factible se busca de nuevo.
+        """
+        self.asignaciones_reanudadas = {}
+        self.clases_fallidas_previas = set()
+        self.diagnosticos_previos = {}
+        if self.punto_control_inicial is None:
+            return
+        asignaciones = self.punto_control_inicial.get("asignaciones", [])
+        for grupo_id, materia_id, docente_id, espacio_id, _, bloque_id in asignaciones:
+            self.asignaciones_reanudadas.setdefault(grupo_id, []).append((materia_id, docente_id, espacio_id, bloque_id))
+        self.clases_fallidas_previas = {tuple(clave) for clave in self.punto_control_inicial.get("clases_fallidas", [])}
+        self.diagnosticos_previos = {
+            (grupo_id, materia_id): DiagnosticoSesion.desde_dict(datos)
+            for grupo_id, materia_id, datos in self.punto_control_inicial.get("diagnosticos", [])
+        }
+        self.generation_stats["sesiones_reutilizadas"] += self.punto_control_inicial.get("sesiones_reutilizadas", 0)
+        self.logger.info(
+            f"Reanudando desde {'el resultado memorizado' if self.resultado_memorizado else 'un punto de control'}: {len(asignaciones)} asignaciones y "
+            f"{len(self.clases_fallidas_previas)} clases sin resolver."
+        )
+
+    def _clave_resultado(self):
+        """
+        Clave del resultado memorizado del período, o None si la ejecución no es memorizable (partición, arranque en
+        caliente o lote: dependen de otras particiones o períodos, fuera de la huella).
+        """
+        if self.grupo_ids is not None or self.opciones.reservas is not None or self.periodo_origen is not None or self.periodos_concurrentes:
+            return None
+        return clave_resultado_generador(self.periodo.pk, self.asignaciones_fijas, self.pesos.como_tupla())
+
+    def debe_detenerse(self):
+        """Chequeo cooperativo entre sesiones: presupuesto de tiempo agotado o cancelación solicitada."""
+        if self.detenido:
+            return True
+        ahora = time.monotonic()
+        if self.opciones.tiempo_limite is not None and ahora - self._inicio >= self.opciones.tiempo_limite:
+            self.detenido = 'TIEMPO_AGOTADO'
+        elif self.opciones.debe_cancelar is not None and ahora >= self._proximo_chequeo_cancelacion:
+            self._proximo_chequeo_cancelacion = ahora + INTERVALO_VERIFICACION_CANCELACION
+            if self.opciones.debe_cancelar():
+                self.detenido = 'CANCELADO'
+        if self.detenido:
+            self.logger.warning(f"Generación detenida ({self.detenido}) tras {ahora - self._inicio:.2f}s; se conserva lo programado hasta ahora.")
+            return True
+        return False
+
+    def describir_clase(self, clase: ClaseParaProgramar):
+        codigo_materia = self.materias_info.get(clase.materia_id, (str(clase.materia_id), ''))[0]
+        return f"{self.grupos_codigos.get(clase.grupo_id, clase.grupo_id)}/{codigo_materia}"
+
+    def serializar_conflictos(self, conflictos=None):
+        """Convierte las clases no resueltas a diccionarios serializables (JSON)."""
+        serializados = []
+        for conflict in (self.unresolved_conflicts if conflictos is None else conflictos):
+            _, nombre_materia = self.materias_info.get(conflict.materia_id, ('', ''))
+            serializados.append({
+                'grupo_id': conflict.grupo_id,
+                'grupo_codigo': self.grupos_codigos.get(conflict.grupo_id),
+                'materia_id': conflict.materia_id,
+                'materia_nombre': nombre_materia,
+                'sesiones_necesarias': conflict.sesiones_necesarias,
+                'sesiones_programadas': conflict.sesiones_programadas,
+                'razon': f"No se pudo programar {conflict.sesiones_necesarias - conflict.sesiones_programadas} sesiones de {nombre_materia}",
+                'diagnostico': conflict.diagnostico.como_dict() if conflict.diagnostico else None
+            })
+        return serializados
+
+    def grupos_del_periodo(self):
+        """Grupos del período (solo los de `grupo_ids` cuando se genera una partición)."""
+        grupos = Grupos.objects.filter(periodo=self.periodo)
+        if self.grupo_ids is not None:
+            grupos = grupos.filter(grupo_id__in=self.grupo_ids)
+        return grupos
+
+    def generar_horarios_por_turno(self, turno_codigo, ciclos_del_turno, demanda: DemandaSesiones = None):
+        """`demanda`: la del período ya compilada (se toma la parte de los grupos del turno); si no, se consulta."""
         self.logger.info(f"--- Iniciando generación para TURNO: {turno_codigo} (Ciclos: {ciclos_del_turno}) ---")
-        grupos_del_turno = Grupos.objects.filter(
-            periodo=self.periodo,
+        grupos_del_turno = self.grupos_del_periodo().filter(
             ciclo_semestral__in=ciclos_del_turno
-        ).prefetch_related('materias__requiere_tipo_espacio_especifico').order_by('ciclo_semestral')
+        ).order_by('ciclo_semestral')
 
         if not grupos_del_turno:
             self.logger.warning(f"No se encontraron grupos para el turno {turno_codigo}. Saltando...")
             return
 
-        bloques_del_turno = [b for b in self.all_bloques_ordered if b.turno == turno_codigo]
-        clases_priorizadas = self._crear_lista_clases_para_programar(grupos_del_turno)
+        turno_cod_int = TURNO_CODIGOS.get(turno_codigo, SIN_TURNO)
+        bloques_del_turno = [b for b in self.all_bloques_ordered if b.turno_codigo == turno_cod_int]
+        if demanda is not None:
+            demanda = demanda.subconjunto(g.grupo_id for g in grupos_del_turno)
+        clases_priorizadas = self.crear_lista_clases_para_programar(grupos_del_turno, demanda)
+        if self.asignaciones_reanudadas:
+            reanudadas = self.sembrar_asignaciones(clases_priorizadas, bloques_del_turno, self.asignaciones_reanudadas)
+            self.generation_stats["sesiones_memorizadas" if self.resultado_memorizado else "sesiones_reanudadas"] += sum(reanudadas.values())
+        self._sembrar_desde_periodo_origen(clases_priorizadas, bloques_del_turno)
+        if self.opciones.reservas is not None:
+            self._confirmar_reservas() # Las sembradas que otra partición ya reservó se buscan normalmente
 
         clases_a_reintentar = []
 
-        for clase_idx, clase_info in enumerate(clases_priorizadas):
-            # Necesitamos un objeto mutable para actualizar las sesiones programadas
-            clase_actual = clase_info
-
-            sesiones_ya_programadas = self.horario_parcial_clases.get((clase_actual.grupo.grupo_id, clase_actual.materia.materia_id), 0)
-
-            for i in range(clase_actual.sesiones_necesarias - sesiones_ya_programadas):
-                mejor_opcion, penalizacion = self._find_best_assignment_for_session(clase_actual, bloques_del_turno)
-
-                if mejor_opcion:
-                    docente, espacio, bloque = mejor_opcion
-                    self.logger.debug(
-                        f"[ASIGNACIÓN OK] Clase: {clase_actual.grupo.codigo_grupo}/{clase_actual.materia.codigo_materia} "
-                        f"en Bloque: {bloque.nombre_bloque} con Doc: {docente.codigo_docente}, "
-                        f"Esp: {espacio.nombre_espacio} (Penalización: {penalizacion})"
-                    )
-
-                    # Guardar en la base de datos
-                    HorariosAsignados.objects.create(
-                        grupo=clase_actual.grupo,
-                        materia=clase_actual.materia, # ¡Añadir la materia al horario!
-                        docente=docente,
-                        espacio=espacio,
-                        periodo=self.periodo,
-                        dia_semana=bloque.dia_semana,
-                        bloque_horario=bloque,
-                        estado='Programado'
-                    )
-
-                    # Actualizar estado parcial
-                    self.horario_parcial_docentes[docente.docente_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    self.horario_parcial_espacios[espacio.espacio_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    self.horario_parcial_grupos[clase_actual.grupo.grupo_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    self.horario_parcial_clases[(clase_actual.grupo.grupo_id, clase_actual.materia.materia_id)] += 1
-
-                else:
-                    self.logger.warning(
-                        f"[ASIGNACIÓN FALLIDA] No se encontró asignación para la sesión {i+1}/{clase_actual.sesiones_necesarias} "
-                        f"de la clase {clase_actual.grupo.codigo_grupo}/{clase_actual.materia.codigo_materia}. Se reintentará más tarde."
-                    )
-                    # Si no se encuentra una sesión, se podría añadir a una cola de reintento.
-                    # Por ahora, simplemente lo registramos.
-                    self.unresolved_conflicts.append(clase_actual)
-                    break # Dejar de intentar programar más sesiones para esta clase si una falla
+        if self.opciones.reservas is not None:
+            self._programar_con_reservas(clases_priorizadas, bloques_del_turno)
+        else:
+            for clase_actual in clases_priorizadas:
+                if self.debe_detenerse():
+                    break
+                self.programar_clase(clase_actual, bloques_del_turno)
 
         self.logger.info(f"--- Finalizada generación para TURNO: {turno_codigo} ---")
         self.generation_stats["sesiones_programadas_total"] += len(clases_priorizadas)
@@ -380,60 +1202,48 @@ class ScheduleGeneratorService:
         """
         self.logger.info(f"--- Iniciando generación específica para Grupo ID: {grupo_id} ---")
         try:
-            grupo_obj = Grupos.objects.prefetch_related(
-                'materias__requiere_tipo_espacio_especifico'
-            ).get(grupo_id=grupo_id, periodo=self.periodo)
+            grupo_obj = Grupos.objects.get(grupo_id=grupo_id, periodo=self.periodo)
         except Grupos.DoesNotExist:
             self.logger.error(f"No se encontró el grupo con ID {grupo_id} en el período actual.")
             return {"error": f"Grupo {grupo_id} no encontrado."}
 
-        # Borrar horario previo solo para este grupo
-        HorariosAsignados.objects.filter(grupo=grupo_obj).delete()
-        self.logger.info(f"Horario previo del grupo {grupo_obj.codigo_grupo} eliminado.")
+        # Se reemplaza el horario previo solo de este grupo (se conservan las asignaciones confirmadas/fijadas)
+        fijas = self.iniciar_generacion(HorariosAsignados.objects.filter(grupo=grupo_obj))
+        self.logger.info(f"Regenerando el horario del grupo {grupo_obj.codigo_grupo} ({fijas} sesiones fijas conservadas).")
 
-        clases_a_programar = self._crear_lista_clases_para_programar([grupo_obj])
+        clases_a_programar = self.crear_lista_clases_para_programar([grupo_obj])
         if not clases_a_programar:
             self.logger.warning(f"El grupo {grupo_obj.codigo_grupo} no tiene clases para programar.")
+            self.aplicar_cambios() # El horario previo del grupo igual se elimina
             return {"warning": "El grupo no tiene clases para programar."}
-        
+        self._cargar_ocupacion_fuera_del_alcance(clases_a_programar)
+
         # Usar todos los bloques o filtrar por turno preferente del grupo si existe
         bloques_disponibles = self.all_bloques_ordered
         if grupo_obj.turno_preferente:
-            bloques_disponibles = [b for b in self.all_bloques_ordered if b.turno == grupo_obj.turno_preferente]
+            turno_cod_int = TURNO_CODIGOS.get(grupo_obj.turno_preferente, SIN_TURNO)
+            bloques_disponibles = [b for b in self.all_bloques_ordered if b.turno_codigo == turno_cod_int]
             self.logger.info(f"Filtrando bloques para el turno preferente del grupo: {grupo_obj.turno_preferente}")
 
-        sesiones_exitosas = 0
+        sesiones_exitosas = sum(self._sembrar_desde_periodo_origen(clases_a_programar, bloques_disponibles).values())
         sesiones_fallidas = 0
 
         for clase_actual in clases_a_programar:
-            for i in range(clase_actual.sesiones_necesarias):
-                mejor_opcion, penalizacion = self._find_best_assignment_for_session(clase_actual, bloques_disponibles)
-
-                if mejor_opcion:
-                    docente, espacio, bloque = mejor_opcion
-                    self.logger.debug(f"[ASIGNACIÓN OK] Clase: {clase_actual.grupo.codigo_grupo}/{clase_actual.materia.codigo_materia} en Bloque: {bloque.nombre_bloque}")
-                    
-                    HorariosAsignados.objects.create(
-                        grupo=clase_actual.grupo, materia=clase_actual.materia,
-                        docente=docente, espacio=espacio, periodo=self.periodo,
-                        dia_semana=bloque.dia_semana, bloque_horario=bloque, estado='Programado'
-                    )
-
-                    self.horario_parcial_docentes[docente.docente_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    self.horario_parcial_espacios[espacio.espacio_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    self.horario_parcial_grupos[clase_actual.grupo.grupo_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                    sesiones_exitosas += 1
-                else:
-                    self.logger.warning(f"[ASIGNACIÓN FALLIDA] No se encontró hueco para la sesión {i+1} de {clase_actual.materia.codigo_materia}.")
-                    self.unresolved_conflicts.append(clase_actual)
-                    sesiones_fallidas += 1
-                    break
+            if self.debe_detenerse():
+                break
+            exitosas, hubo_fallo = self.programar_clase(clase_actual, bloques_disponibles)
+            sesiones_exitosas += exitosas
+            sesiones_fallidas += 1 if hubo_fallo else 0
 
         resumen = {
             "grupo_procesado": grupo_obj.codigo_grupo,
             "sesiones_exitosas": sesiones_exitosas,
             "sesiones_fallidas": sesiones_fallidas,
-            "conflictos": [f"No se pudo programar la materia {c.materia.codigo_materia}" for c in self.unresolved_conflicts]
+            "conflictos": [f"No se pudo programar la materia {self.materias_info[c.materia_id][0]}" for c in self.unresolved_conflicts],
+            "dry_run": self.dry_run,
+            "cambios": self.aplicar_cambios(),
+            "metricas": self.metricas_calidad(),
+            "detenido": self.detenido
         }
         self.logger.info(f"--- Finalizada generación para Grupo ID: {grupo_id}. Resumen: {resumen} ---")
         return resumen
@@ -444,7 +1254,7 @@ class ScheduleGeneratorService:
         dentro del período académico del servicio.
         """
         self.logger.info(f"--- Iniciando generación masiva para Ciclo ID: {ciclo_id} en Período: {self.periodo.nombre_periodo} ---")
-        
+
         # 1. Encontrar la carrera y el orden del ciclo
         try:
             ciclo_obj = Ciclo.objects.get(pk=ciclo_id)
@@ -459,51 +1269,42 @@ class ScheduleGeneratorService:
             periodo=self.periodo,
             carrera=carrera_obj,
             ciclo_semestral=ciclo_orden
-        ).prefetch_related('materias')
+        )
 
         if not grupos_del_ciclo.exists():
             msg = f"No se encontraron grupos para el ciclo {ciclo_orden} de la carrera '{carrera_obj.nombre_carrera}' en el período '{self.periodo.nombre_periodo}'."
             self.logger.warning(msg)
             return {"warning": msg}
-        
+
         self.logger.info(f"Se encontraron {len(grupos_del_ciclo)} grupos para procesar: {[g.codigo_grupo for g in grupos_del_ciclo]}")
 
-        # 3. Borrar los horarios existentes para estos grupos
-        HorariosAsignados.objects.filter(grupo__in=grupos_del_ciclo).delete()
-        self.logger.info(f"Eliminados los horarios previos para los {len(grupos_del_ciclo)} grupos del ciclo.")
+        # 3. Se reemplazan los horarios existentes de estos grupos (se conservan las asignaciones confirmadas/fijadas)
+        self.iniciar_generacion(HorariosAsignados.objects.filter(grupo__in=grupos_del_ciclo))
+        self.logger.info(f"Regenerando los horarios previos de los {len(grupos_del_ciclo)} grupos del ciclo.")
 
         # 4. Crear la lista completa de clases a programar para todos los grupos
-        clases_a_programar = self._crear_lista_clases_para_programar(grupos_del_ciclo)
-        
+        clases_a_programar = self.crear_lista_clases_para_programar(grupos_del_ciclo)
+        self._cargar_ocupacion_fuera_del_alcance(clases_a_programar)
+
         bloques_disponibles = self.all_bloques_ordered # Usar todos los bloques
-        
+        # Sesiones sembradas desde el período origen (arranque en caliente)
+        reutilizadas_por_grupo = self._sembrar_desde_periodo_origen(clases_a_programar, bloques_disponibles)
+
         # 5. Iterar y asignar
         resumen_total = {"grupos_procesados": [], "total_sesiones_exitosas": 0, "total_sesiones_fallidas": 0}
 
         for grupo in grupos_del_ciclo:
-            clases_del_grupo = [c for c in clases_a_programar if c.grupo.grupo_id == grupo.grupo_id]
-            sesiones_exitosas_grupo = 0
+            clases_del_grupo = [c for c in clases_a_programar if c.grupo_id == grupo.grupo_id]
+            sesiones_exitosas_grupo = reutilizadas_por_grupo[grupo.grupo_id]
             sesiones_fallidas_grupo = 0
 
             for clase_actual in clases_del_grupo:
-                for i in range(clase_actual.sesiones_necesarias):
-                    mejor_opcion, _ = self._find_best_assignment_for_session(clase_actual, bloques_disponibles)
-                    if mejor_opcion:
-                        docente, espacio, bloque = mejor_opcion
-                        HorariosAsignados.objects.create(
-                            grupo=clase_actual.grupo, materia=clase_actual.materia,
-                            docente=docente, espacio=espacio, periodo=self.periodo,
-                            dia_semana=bloque.dia_semana, bloque_horario=bloque, estado='Programado'
-                        )
-                        self.horario_parcial_docentes[docente.docente_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                        self.horario_parcial_espacios[espacio.espacio_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                        self.horario_parcial_grupos[grupo.grupo_id][bloque.dia_semana].append(bloque.bloque_def_id)
-                        sesiones_exitosas_grupo += 1
-                else:
-                        self.unresolved_conflicts.append(clase_actual)
-                        sesiones_fallidas_grupo += 1
-                        break # No seguir con esta materia si una sesión falla
-            
+                if self.debe_detenerse():
+                    break
+                exitosas, hubo_fallo = self.programar_clase(clase_actual, bloques_disponibles)
+                sesiones_exitosas_grupo += exitosas
+                sesiones_fallidas_grupo += 1 if hubo_fallo else 0
+
             resumen_total["grupos_procesados"].append({
                 "codigo_grupo": grupo.codigo_grupo,
                 "sesiones_exitosas": sesiones_exitosas_grupo,
@@ -512,45 +1313,61 @@ class ScheduleGeneratorService:
             resumen_total["total_sesiones_exitosas"] += sesiones_exitosas_grupo
             resumen_total["total_sesiones_fallidas"] += sesiones_fallidas_grupo
 
+        resumen_total["dry_run"] = self.dry_run
+        resumen_total["cambios"] = self.aplicar_cambios()
+        resumen_total["metricas"] = self.metricas_calidad()
+        resumen_total["detenido"] = self.detenido
         self.logger.info(f"--- Finalizada generación masiva para Ciclo ID: {ciclo_id}. Resumen: {resumen_total} ---")
         return resumen_total
 
     def generar_horarios_automaticos(self):
         self.logger.info(f"=== Iniciando generación de horarios para el período: {self.periodo.nombre_periodo} ===")
-        HorariosAsignados.objects.filter(periodo=self.periodo).delete()
         self.validator.clear_session_assignments()
-        self.unresolved_conflicts = []
         self.generation_stats = defaultdict(int) # Reiniciar con defaultdict
-        self.horario_parcial_docentes.clear()
-        self.horario_parcial_espacios.clear()
-        self.horario_parcial_grupos.clear()
-        self.horario_parcial_clases.clear()
-
-        todos_grupos_del_periodo_obj = list(Grupos.objects.filter(periodo=self.periodo).prefetch_related('materias'))
-        total_sesiones_req = 0
-        for g in todos_grupos_del_periodo_obj:
-            # Ahora cada grupo puede tener múltiples materias
-            for materia in g.materias.all():
-                horas_materia = materia.horas_totales
-            sesiones_para_este_grupo = 0
-            if HORAS_ACADEMICAS_POR_SESION_ESTANDAR > 0 and horas_materia > 0:
-                sesiones_para_este_grupo = (horas_materia + HORAS_ACADEMICAS_POR_SESION_ESTANDAR - 1) // HORAS_ACADEMICAS_POR_SESION_ESTANDAR
-            elif horas_materia > 0:
-                sesiones_para_este_grupo = 1
-            total_sesiones_req += sesiones_para_este_grupo
-        self.generation_stats["sesiones_requeridas_total"] = total_sesiones_req
+        # Se reemplaza lo generado antes; las asignaciones confirmadas/fijadas se cargan como inamovibles
+        alcance = HorariosAsignados.objects.filter(periodo=self.periodo)
+        if self.grupo_ids is not None:
+            alcance = alcance.filter(grupo_id__in=self.grupo_ids)
+        self.iniciar_generacion(alcance)
+        self._cargar_ocupacion_de_periodos_concurrentes()
+        # Una generación completa del período deja sin efecto los cambios pendientes de reparación registrados hasta ahora
+        periodo_completo = self.grupo_ids is None and self.opciones.reservas is None
+        cambios_pendientes = list(CambioPendiente.objects.filter(periodo=self.periodo).values_list('cambio_id', flat=True)) \
+            if periodo_completo else []
+        clave_resultado = self._clave_resultado()
+        if clave_resultado is not None and self.punto_control_inicial is None:
+            memorizado = cache.get(clave_resultado)
+            if memorizado is not None:
+                self.logger.info("Sin cambios en las entradas desde la última generación completa: se reutiliza su resultado.")
+                self.punto_control_inicial = memorizado
+                self.resultado_memorizado = True
+        self._cargar_punto_control()
+
+        # Sesiones requeridas de todas las materias de los grupos en generación (una consulta)
+        grupo_ids = list(self.grupo_ids) if self.grupo_ids is not None else None
+        demanda = DemandaSesiones.desde_bd(periodo=self.periodo, grupo_ids=grupo_ids)
+        self.generation_stats["sesiones_requeridas_total"] = demanda.total_sesiones
 
         for turno_cod, ciclos_del_turno in TURNOS_CICLOS_MAP.items():
-            self.generar_horarios_por_turno(turno_codigo=turno_cod, ciclos_del_turno=ciclos_del_turno)
+            self.generar_horarios_por_turno(turno_codigo=turno_cod, ciclos_del_turno=ciclos_del_turno, demanda=demanda)
 
+        cambios = self.aplicar_cambios()
+        if cambios_pendientes and cambios["persistido"] and not self.detenido:
+            CambioPendiente.objects.filter(cambio_id__in=cambios_pendientes).delete()
+        if clave_resultado is not None and not self.detenido and not self.resultado_memorizado:
+            cache.set(clave_resultado, self.punto_control(), TIEMPO_CACHE_RESULTADO_GENERADOR)
         self.logger.info("=== Proceso de generación finalizado. ===")
         self.logger.info(f"Estadísticas: {dict(self.generation_stats)}") # Convertir a dict para logging
         if self.unresolved_conflicts:
             self.logger.warning("Conflictos no resueltos / Sesiones no asignadas:")
             for conflict in self.unresolved_conflicts:
-                self.logger.warning(f"  - {conflict}")
+                self.logger.warning(f"  - {self.describir_clase(conflict)}")
 
         return {
             "stats": dict(self.generation_stats), # Convertir a dict para la respuesta JSON
-            "unresolved_conflicts": self.unresolved_conflicts
+            "unresolved_conflicts": self.unresolved_conflicts,
+            "dry_run": self.dry_run,
+            "cambios": cambios,
+            "metricas": self.metricas_calidad(),
+            "detenido": self.detenido
         }
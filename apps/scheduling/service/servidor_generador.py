@@ -0,0 +1,235 @@
+# apps/scheduling/service/servidor_generador.py
+"""
+Servidor local y residente del generador (`python manage.py servidor_generador`) y su cliente.
+El servidor mantiene en memoria los datos de referencia compilados de cada período y atiende, de a una,
+solicitudes JSON por un socket TCP local; las vistas le delegan las consultas interactivas (factibilidad,
+sugerencias y edición manual) y, si no está levantado, las resuelven en su propio proceso como siempre. La generación por grupo
+y por ciclo no pasa por aquí: escribe en la BD y tarda, y en un servidor de un solo hilo bloquearía a las demás.
+"""
+import json
+import logging
+import socket
+import socketserver
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.academic_setup.models import PeriodoAcademico
+from apps.scheduling.models import Grupos, HorariosAsignados, BloquesHorariosDefinicion
+from .datos_referencia import clave_datos_generador
+from .edicion_manual import EdicionHorarioService, ConflictoEdicion
+from .feasibility_analyzer import FeasibilityAnalyzerService
+from .schedule_generator import ScheduleGeneratorService
+from .suplencias import PlanificadorSuplencias
+from .sugerencias import SugerenciaFranjas
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACION_POR_DEFECTO = {'HOST': '127.0.0.1', 'PUERTO': 8765, 'TIMEOUT_SEGUNDOS': 60}
+
+# Campos de una asignación que cambian en la edición manual; el servidor devuelve sus nuevos valores
+CAMPOS_EDICION = ['docente_id', 'espacio_id', 'dia_semana', 'bloque_horario_id', 'docente_no_disponible']
+
+
+def configuracion_servidor():
+    """settings.GENERADOR_DAEMON completado con los valores por defecto (None si está deshabilitado)."""
+    configuracion = getattr(settings, 'GENERADOR_DAEMON', None)
+    if not configuracion:
+        return None
+    return {**CONFIGURACION_POR_DEFECTO, **configuracion}
+
+
+class ServidorGeneradorNoDisponible(Exception):
+    """No hay servidor configurado o no acepta conexiones: quien llama genera en su propio proceso."""
+
+
+class ServidorGeneradorError(Exception):
+    """El servidor recibió la solicitud pero falló al atenderla."""
+
+
+def solicitar_al_servidor(operacion, **parametros):
+    """Envía una solicitud al servidor residente y devuelve su resultado."""
+    configuracion = configuracion_servidor()
+    if configuracion is None:
+        raise ServidorGeneradorNoDisponible("El servidor del generador no está configurado.")
+    try:
+        conexion = socket.create_connection((configuracion['HOST'], configuracion['PUERTO']), timeout=1)
+    except OSError as e:
+        raise ServidorGeneradorNoDisponible(str(e))
+
+    # Una vez aceptada la solicitud ya no se reintenta localmente: el servidor podría haberla aplicado
+    with conexion:
+        conexion.settimeout(configuracion['TIMEOUT_SEGUNDOS'])
+        try:
+            # `vence`: si la solicitud espera en la cola más que el timeout del cliente, el servidor la descarta
+            vence = time.time() + configuracion['TIMEOUT_SEGUNDOS']
+            conexion.sendall(json.dumps({"operacion": operacion, "parametros": parametros, "vence": vence}).encode() + b'\n')
+            linea = conexion.makefile('rb').readline()
+        except OSError as e:
+            raise ServidorGeneradorError(f"Sin respuesta del servidor del generador: {str(e)}")
+    if not linea:
+        raise ServidorGeneradorError("El servidor del generador cerró la conexión sin responder.")
+    respuesta = json.loads(linea)
+    if not respuesta.get("ok"):
+        raise ServidorGeneradorError(respuesta.get("error", "Error desconocido en el servidor del generador."))
+    return respuesta["resultado"]
+
+
+def analizar_factibilidad(periodo, stdout_ref=None):
+    """Pre-chequeo de factibilidad: en el servidor residente si está levantado; si no, en este proceso."""
+    try:
+        return solicitar_al_servidor('analisis_factibilidad', periodo_id=periodo.pk)
+    except ServidorGeneradorNoDisponible:
+        return FeasibilityAnalyzerService(periodo=periodo, stdout_ref=stdout_ref).analizar()
+
+
+def sugerir_suplentes(periodo, docente_id, dia_semana, limite):
+    """Suplentes para las sesiones de un docente en un día: en el servidor residente si está levantado; si no, en este proceso."""
+    try:
+        return solicitar_al_servidor('sugerir_suplentes', periodo_id=periodo.pk, docente_id=docente_id,
+                                     dia_semana=dia_semana, limite=limite)
+    except ServidorGeneradorNoDisponible:
+        return PlanificadorSuplencias(periodo=periodo).sugerir(docente_id, dia_semana, limite)
+
+
+def sugerir_franjas(grupo, materia_id, limite, docente_id=None, dia_semana=None):
+    """Opciones para una sesión de un grupo y materia: en el servidor residente si está levantado; si no, en este proceso."""
+    try:
+        return solicitar_al_servidor('sugerir_franjas', grupo_id=grupo.grupo_id, materia_id=materia_id, limite=limite,
+                                     docente_id=docente_id, dia_semana=dia_semana)
+    except ServidorGeneradorNoDisponible:
+        return SugerenciaFranjas(grupo=grupo).sugerir(materia_id, limite, docente_id=docente_id, dia_semana=dia_semana)
+
+
+def _asignaciones_editadas(resultado):
+    """Reconstruye las asignaciones editadas por el servidor (o lanza ConflictoEdicion con sus conflictos)."""
+    if resultado.get("conflictos"):
+        raise ConflictoEdicion(resultado["conflictos"])
+    filas = HorariosAsignados.objects.in_bulk([int(horario_id) for horario_id in resultado["editados"]])
+    editados = []
+    for horario_id, valores in resultado["editados"].items():
+        horario = filas[int(horario_id)]
+        for campo, valor in valores.items():
+            setattr(horario, campo, valor)
+        editados.append(horario)
+    return editados
+
+
+def mover_asignacion(horario, bloque, docente_id=None, espacio_id=None, dry_run=False, stdout_ref=None):
+    """Edición manual (mover): en el servidor residente si está levantado; si no, en este proceso."""
+    try:
+        return _asignaciones_editadas(solicitar_al_servidor(
+            'mover', horario_id=horario.pk, bloque_horario_id=bloque.bloque_def_id, docente_id=docente_id,
+            espacio_id=espacio_id, dry_run=dry_run
+        ))
+    except ServidorGeneradorNoDisponible:
+        servicio = EdicionHorarioService(periodo=horario.periodo, stdout_ref=stdout_ref)
+        return servicio.mover(horario, bloque, docente_id=docente_id, espacio_id=espacio_id, dry_run=dry_run)
+
+
+def intercambiar_asignaciones(horario_a, horario_b, dry_run=False, stdout_ref=None):
+    """Edición manual (intercambiar): en el servidor residente si está levantado; si no, en este proceso."""
+    try:
+        return _asignaciones_editadas(solicitar_al_servidor(
+            'intercambiar', horario_id=horario_a.pk, con=horario_b.pk, dry_run=dry_run
+        ))
+    except ServidorGeneradorNoDisponible:
+        return EdicionHorarioService(periodo=horario_a.periodo, stdout_ref=stdout_ref).intercambiar(horario_a, horario_b, dry_run=dry_run)
+
+
+class GeneradorResidente:
+    """
+    Datos de referencia compilados por período, en memoria. Antes de cada solicitud se compara la clave de
+    versiones de sus tablas (una consulta); si alguna tabla cambió, se recompilan. Cada solicitud usa un
+    ScheduleGeneratorService nuevo sobre esos datos (el estado de cada ejecución no se comparte).
+    """
+
+    def __init__(self, stdout_ref=None):
+        self.logger = stdout_ref or logger
+        self.modelos = {} # {periodo_id: (clave_de_versiones, datos_de_referencia)}
+
+    def generador(self, periodo, **kwargs):
+        clave = clave_datos_generador(periodo.pk)
+        actual = self.modelos.get(periodo.pk)
+        if actual is not None and actual[0] == clave:
+            return ScheduleGeneratorService(periodo=periodo, stdout_ref=self.logger, datos_referencia=actual[1], **kwargs)
+        generador = ScheduleGeneratorService(periodo=periodo, stdout_ref=self.logger, **kwargs)
+        self.modelos[periodo.pk] = (clave, generador.exportar_datos_referencia())
+        self.logger.info(f"Modelo del período {periodo.nombre_periodo} compilado en memoria.")
+        return generador
+
+    def refrescar(self):
+        """Recompila los modelos cuyas tablas cambiaron, para que la próxima solicitud no espere la carga."""
+        for periodo in PeriodoAcademico.objects.filter(pk__in=list(self.modelos)):
+            self.generador(periodo)
+
+    def atender(self, operacion, parametros):
+        if operacion == 'ping':
+            return {"periodos_en_memoria": sorted(self.modelos)}
+        if operacion == 'analisis_factibilidad':
+            periodo = PeriodoAcademico.objects.get(pk=parametros['periodo_id'])
+            return FeasibilityAnalyzerService(periodo=periodo, generador=self.generador(periodo)).analizar()
+        if operacion == 'sugerir_suplentes':
+            periodo = PeriodoAcademico.objects.get(pk=parametros['periodo_id'])
+            planificador = PlanificadorSuplencias(periodo=periodo, generador=self.generador(periodo, dry_run=True))
+            return planificador.sugerir(parametros['docente_id'], parametros['dia_semana'], parametros['limite'])
+        if operacion == 'sugerir_franjas':
+            grupo = Grupos.objects.select_related('periodo').get(pk=parametros['grupo_id'])
+            sugerencia = SugerenciaFranjas(grupo=grupo, generador=self.generador(grupo.periodo, dry_run=True))
+            return sugerencia.sugerir(parametros['materia_id'], parametros['limite'],
+                                      docente_id=parametros.get('docente_id'), dia_semana=parametros.get('dia_semana'))
+        if operacion in ('mover', 'intercambiar'):
+            return self._editar(operacion, parametros)
+        raise ValueError(f"Operación no soportada: {operacion}")
+
+    def _editar(self, operacion, parametros):
+        """Edición manual sobre el modelo en memoria; devuelve los nuevos valores o los conflictos."""
+        horario = HorariosAsignados.objects.select_related('periodo').get(pk=parametros['horario_id'])
+        servicio = EdicionHorarioService(periodo=horario.periodo, generador=self.generador(horario.periodo, dry_run=True))
+        dry_run = bool(parametros.get('dry_run'))
+        try:
+            if operacion == 'mover':
+                bloque = BloquesHorariosDefinicion.objects.get(pk=parametros['bloque_horario_id'])
+                editados = servicio.mover(horario, bloque, docente_id=parametros.get('docente_id'),
+                                          espacio_id=parametros.get('espacio_id'), dry_run=dry_run)
+            else:
+                otro = HorariosAsignados.objects.get(pk=parametros['con'])
+                editados = servicio.intercambiar(horario, otro, dry_run=dry_run)
+        except ConflictoEdicion as e:
+            return {"conflictos": e.conflictos}
+        return {"editados": {h.pk: {campo: getattr(h, campo) for campo in CAMPOS_EDICION} for h in editados}}
+
+
+class _ManejadorSolicitud(socketserver.StreamRequestHandler):
+    def handle(self):
+        close_old_connections()
+        try:
+            solicitud = json.loads(self.rfile.readline())
+            if solicitud.get('vence') and time.time() > solicitud['vence']:
+                raise TimeoutError("La solicitud venció en la cola del servidor; no se atendió.")
+            resultado = self.server.residente.atender(solicitud.get('operacion'), solicitud.get('parametros') or {})
+            respuesta = {"ok": True, "resultado": resultado}
+        except Exception as e:
+            self.server.residente.logger.error(f"Error al atender una solicitud: {str(e)}", exc_info=True)
+            respuesta = {"ok": False, "error": str(e)}
+        finally:
+            close_old_connections()
+        self.wfile.write(json.dumps(respuesta, default=str).encode() + b'\n')
+
+
+class ServidorGenerador(socketserver.TCPServer):
+    """Servidor TCP local de un solo hilo: las solicitudes se atienden en orden, como una cola."""
+    allow_reuse_address = True
+
+    def __init__(self, direccion, residente: GeneradorResidente, intervalo_refresco=None):
+        super().__init__(direccion, _ManejadorSolicitud)
+        self.residente = residente
+        self.timeout = intervalo_refresco # Sin solicitudes durante este tiempo -> handle_timeout
+
+    def handle_timeout(self):
+        close_old_connections()
+        try:
+            self.residente.refrescar()
+        finally:
+            close_old_connections()
@@ -0,0 +1,99 @@
+# apps/scheduling/service/sugerencias.py
+"""
+Sugerencia de franjas para la programación manual: las mejores opciones (bloque, docente, aula) para una sesión
+de un grupo y una materia, con los mismos filtros y penalizaciones que usa el generador.
+"""
+import heapq
+
+from apps.scheduling.models import Grupos
+from .schedule_generator import ScheduleGeneratorService, TURNO_CODIGOS, SIN_TURNO
+
+OPCIONES_POR_DEFECTO = 10
+
+
+class SugerenciaFranjas:
+    """
+    Carga el horario actual del período en la ocupación (una consulta) y recorre los bloques como lo hace
+    _find_best_assignment_for_session, pero conservando las `limite` combinaciones de menor penalización en
+    lugar de solo la mejor. Los bloques son los del turno preferente del grupo (todos si no tiene), igual que
+    en la generación por grupo.
+    """
+
+    def __init__(self, grupo: Grupos, stdout_ref=None, generador: ScheduleGeneratorService = None):
+        self.grupo = grupo
+        self.gen = generador or ScheduleGeneratorService(periodo=grupo.periodo, stdout_ref=stdout_ref, dry_run=True)
+
+    def _bloques(self, dia_semana=None):
+        bloques = self.gen.all_bloques_ordered
+        if self.grupo.turno_preferente:
+            turno_cod_int = TURNO_CODIGOS.get(self.grupo.turno_preferente, SIN_TURNO)
+            bloques = [b for b in bloques if b.turno_codigo == turno_cod_int]
+        if dia_semana is not None:
+            bloques = [b for b in bloques if b.dia_semana == dia_semana]
+        return bloques
+
+    def _opciones(self, clase, bloques, docente_pos=None):
+        """Genera (penalizacion, bloque, docente_pos, espacio) de todas las combinaciones factibles."""
+        gen = self.gen
+        espacios_compatibles = gen.espacios_compatibles(clase)
+        for bloque in bloques:
+            if gen.ocupacion.grupo_ocupado(clase.grupo_id, bloque.indice):
+                continue
+            docentes_libres = gen.mascara_docentes_libres(clase, bloque)
+            if docente_pos is not None:
+                docentes_libres &= 1 << docente_pos
+            if not docentes_libres:
+                continue
+            espacios_ocupados = gen.ocupacion.espacios_ocupados_en(bloque.indice)
+            espacios_libres = [e for e in espacios_compatibles if not espacios_ocupados >> e.indice & 1]
+            espacios_candidatos = gen.get_espacios_candidatos(clase, bloque, espacios_libres)
+            if not espacios_candidatos:
+                continue
+            for candidato_pos in gen.get_docentes_candidatos(clase, bloque, docentes_libres):
+                docente_id = gen.all_docente_ids[candidato_pos]
+                for espacio in espacios_candidatos:
+                    if not gen.check_hard_configured_constraints(clase, docente_id, espacio.espacio_id, bloque):
+                        continue
+                    yield gen.calculate_soft_constraint_penalties(clase, candidato_pos, espacio, bloque), bloque, candidato_pos, espacio
+
+    def sugerir(self, materia_id, limite=OPCIONES_POR_DEFECTO, docente_id=None, dia_semana=None):
+        """Devuelve None si la materia no es del grupo (o no requiere sesiones); si no, las opciones ordenadas."""
+        gen = self.gen
+        clase = next((c for c in gen.crear_lista_clases_para_programar([self.grupo]) if c.materia_id == materia_id), None)
+        if clase is None:
+            return None
+
+        filas = gen.cargar_horario_actual()
+        programadas = sum(1 for _, estado, grupo_id, m_id, *_ in filas
+                          if grupo_id == clase.grupo_id and m_id == materia_id and estado != 'Cancelado')
+        docente_pos = None
+        if docente_id is not None:
+            docente_pos = gen.docente_posiciones.get(docente_id)
+            if docente_pos is None:
+                return self._respuesta(clase, programadas, []) # Docente inactivo: no puede proponerse
+
+        # Empates por orden de bloque, docente y aula, como en la búsqueda del generador
+        mejores = heapq.nsmallest(
+            limite, self._opciones(clase, self._bloques(dia_semana), docente_pos),
+            key=lambda o: (o[0], o[1].indice, o[2], o[3].indice)
+        )
+        opciones = [{
+            "bloque_horario_id": bloque.bloque_def_id,
+            "dia_semana": bloque.dia_semana,
+            "bloque_nombre": gen.bloques_nombres.get(bloque.bloque_def_id),
+            "docente_id": gen.all_docente_ids[pos],
+            "codigo_docente": gen.docentes_codigos.get(gen.all_docente_ids[pos]),
+            "espacio_id": espacio.espacio_id,
+            "espacio_nombre": gen.espacios_nombres.get(espacio.espacio_id),
+            "penalizacion": penalizacion,
+        } for penalizacion, bloque, pos, espacio in mejores]
+        return self._respuesta(clase, programadas, opciones)
+
+    def _respuesta(self, clase, programadas, opciones):
+        return {
+            "grupo_id": clase.grupo_id,
+            "materia_id": clase.materia_id,
+            "sesiones_necesarias": clase.sesiones_necesarias,
+            "sesiones_programadas": programadas,
+            "opciones": opciones,
+        }
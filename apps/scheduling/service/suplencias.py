@@ -0,0 +1,95 @@
+# apps/scheduling/service/suplencias.py
+"""
+Planificador de suplencias: para las sesiones de un docente ausente en un día, propone docentes que podrían
+reemplazarlo en cada una, usando los índices compactos del generador (especialidades, disponibilidad y ocupación).
+"""
+from apps.academic_setup.models import PeriodoAcademico
+from apps.users.models import Docentes
+from .demanda import DemandaSesiones
+from .schedule_generator import ScheduleGeneratorService
+
+SUPLENTES_POR_SESION = 5
+
+
+class PlanificadorSuplencias:
+    """
+    Carga el horario del período en la ocupación (una consulta) y, por cada sesión del docente ausente, lee la
+    columna del bloque: docentes disponibles, con todas las especialidades de la materia y sin clase en él. Sobre
+    esos candidatos se aplican el tope diario (MAX_HORAS_DIA_DOCENTE), el semanal (max_horas_semanales) y las
+    reglas duras configuradas, y se ordenan por la penalización blanda que usaría el generador y por carga.
+    """
+
+    def __init__(self, periodo: PeriodoAcademico, stdout_ref=None, generador: ScheduleGeneratorService = None):
+        self.periodo = periodo
+        self.gen = generador or ScheduleGeneratorService(periodo=periodo, stdout_ref=stdout_ref, dry_run=True)
+        self.bloques_por_id = {b.bloque_def_id: b for b in self.gen.all_bloques_ordered}
+        self.espacios_por_id = {e.espacio_id: e for e in self.gen.all_espacios}
+
+    def _clases(self, sesiones):
+        """{(grupo_id, materia_id): ClaseParaProgramar} de los grupos de las sesiones, para las reglas del generador."""
+        demanda = DemandaSesiones.desde_bd(grupo_ids={s[1] for s in sesiones})
+        return {(c.grupo_id, c.materia_id): c for c in self.gen.crear_lista_clases_para_programar([], demanda)}
+
+    def _suplentes_de_sesion(self, clase, docente_ausente_pos, espacio, bloque, limite):
+        gen = self.gen
+        libres = gen.mascara_docentes_libres(clase, bloque)
+        if docente_ausente_pos is not None:
+            libres &= ~(1 << docente_ausente_pos)
+        mascara_dia = gen.mascara_dia[bloque.dia_semana]
+        suplentes = []
+        # get_docentes_candidatos aplica el tope diario y las reglas duras configuradas
+        for docente_pos in gen.get_docentes_candidatos(clase, bloque, libres):
+            docente_id = gen.all_docente_ids[docente_pos]
+            sesiones_semana = gen.ocupacion.sesiones_docente(docente_pos)
+            max_semana = gen.max_sesiones_semana_docente.get(docente_id)
+            if max_semana is not None and sesiones_semana >= max_semana:
+                continue
+            suplentes.append({
+                "docente_id": docente_id,
+                "codigo_docente": gen.docentes_codigos.get(docente_id),
+                "penalizacion": gen.calculate_soft_constraint_penalties(clase, docente_pos, espacio, bloque) if espacio else 0,
+                "preferencia": gen.disponibilidad.preferencia(docente_pos, bloque.indice, 0),
+                "sesiones_dia": gen.ocupacion.sesiones_docente_en(docente_pos, mascara_dia),
+                "max_sesiones_dia": gen.max_sesiones_dia_docente[docente_id],
+                "sesiones_semana": sesiones_semana,
+                "max_sesiones_semana": max_semana,
+            })
+        # Menor penalización primero; a igualdad, el que menos carga tiene ese día y en la semana
+        suplentes.sort(key=lambda s: (s["penalizacion"], -s["preferencia"], s["sesiones_dia"], s["sesiones_semana"], s["docente_id"]))
+        return suplentes[:limite], len(suplentes)
+
+    def sugerir(self, docente_id, dia_semana, limite=SUPLENTES_POR_SESION):
+        del_ausente = sorted(
+            ((horario_id, *campos) for horario_id, estado, *campos in self.gen.cargar_horario_actual()
+             if campos[2] == docente_id and campos[4] == dia_semana and estado != 'Cancelado'),
+            key=lambda s: self.gen.bloque_posiciones.get(s[6], -1)
+        )
+        clases = self._clases(del_ausente)
+        docente_ausente_pos = self.gen.docente_posiciones.get(docente_id)
+
+        resultado = []
+        for horario_id, grupo_id, materia_id, _, espacio_id, _, bloque_id in del_ausente:
+            bloque = self.bloques_por_id.get(bloque_id)
+            clase = clases.get((grupo_id, materia_id))
+            if bloque is None or clase is None:
+                suplentes, elegibles = [], 0 # Bloque o materia que ya no existen: no hay a quién proponer
+            else:
+                suplentes, elegibles = self._suplentes_de_sesion(clase, docente_ausente_pos, self.espacios_por_id.get(espacio_id), bloque, limite)
+            resultado.append({
+                "horario_id": horario_id,
+                "grupo_id": grupo_id,
+                "materia_id": materia_id,
+                "espacio_id": espacio_id,
+                "bloque_horario_id": bloque_id,
+                "bloque_nombre": self.gen.bloques_nombres.get(bloque_id),
+                "suplentes_posibles": elegibles,
+                "suplentes": suplentes,
+            })
+
+        # Nombres solo de los docentes propuestos (una consulta)
+        propuestos = {s["docente_id"] for sesion in resultado for s in sesion["suplentes"]}
+        nombres = {d: f"{n} {a}" for d, n, a in Docentes.objects.filter(pk__in=propuestos).values_list('docente_id', 'nombres', 'apellidos')}
+        for sesion in resultado:
+            for s in sesion["suplentes"]:
+                s["nombre"] = nombres.get(s["docente_id"])
+        return {"docente_id": docente_id, "dia_semana": dia_semana, "sesiones": resultado}
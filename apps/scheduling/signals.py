@@ -0,0 +1,75 @@
+# apps/scheduling/signals.py
+from django.apps import apps
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from apps.academic_setup.models import PeriodoAcademico
+from .models import Grupos, DisponibilidadDocentes
+from .service.datos_referencia import TABLAS_ENTRADAS_GENERADOR, registrar_cambio
+from .service.reparacion import CAMBIOS_POR_TABLA, registrar_cambios_pendientes, marcar_impacto_disponibilidad
+
+
+def _tabla_modificada(sender, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return # Un inicio de sesión no cambia los datos del generador
+    registrar_cambio(sender._meta.label)
+
+
+def _relacion_modificada(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        registrar_cambio(sender._meta.label)
+
+
+def conectar_versionado_tablas():
+    for tabla in TABLAS_ENTRADAS_GENERADOR:
+        modelo = apps.get_model(tabla)
+        if modelo._meta.auto_created:
+            # Tabla intermedia de un ManyToManyField: add/remove/set/clear no emiten post_save
+            m2m_changed.connect(_relacion_modificada, sender=modelo, dispatch_uid=f"version_tabla_m2m_{tabla}")
+            continue
+        post_save.connect(_tabla_modificada, sender=modelo, dispatch_uid=f"version_tabla_save_{tabla}")
+        post_delete.connect(_tabla_modificada, sender=modelo, dispatch_uid=f"version_tabla_delete_{tabla}")
+
+
+def _fila_modificada(sender, instance, **kwargs):
+    origen = kwargs.get('origin')
+    if isinstance(origen, PeriodoAcademico) or (isinstance(origen, QuerySet) and origen.model is PeriodoAcademico):
+        return # Se borra el período entero: no queda nada que reparar
+    registrar_cambios_pendientes(CAMBIOS_POR_TABLA[sender._meta.label](instance))
+
+
+def _materias_de_grupo_modificadas(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            registrar_cambios_pendientes([(instance.periodo_id, 'GRUPO', instance.grupo_id)])
+        return
+    # Desde la materia: pk_set son los grupos; en clear hay que leerlos antes de que se borre la relación
+    if action in ('post_add', 'post_remove'):
+        grupos = Grupos.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        grupos = instance.grupos.all()
+    else:
+        return
+    registrar_cambios_pendientes([(periodo_id, 'GRUPO', grupo_id) for grupo_id, periodo_id in grupos.values_list('grupo_id', 'periodo_id')])
+
+
+def conectar_cambios_pendientes():
+    """Registra como CambioPendiente los grupos, docentes, aulas y restricciones que se modifican (reparación incremental)."""
+    for tabla in CAMBIOS_POR_TABLA:
+        modelo = apps.get_model(tabla)
+        post_save.connect(_fila_modificada, sender=modelo, dispatch_uid=f"cambio_pendiente_save_{tabla}")
+        post_delete.connect(_fila_modificada, sender=modelo, dispatch_uid=f"cambio_pendiente_delete_{tabla}")
+    m2m_changed.connect(_materias_de_grupo_modificadas, sender=Grupos.materias.through, dispatch_uid="cambio_pendiente_m2m_grupos_materias")
+
+
+def _disponibilidad_modificada(sender, instance, **kwargs):
+    # El generador solo usa las filas con esta_disponible=True: borrar la fila también deja al docente sin ese bloque
+    disponible = instance.esta_disponible and kwargs.get('signal') is not post_delete
+    marcar_impacto_disponibilidad(instance.docente_id, instance.periodo_id, instance.dia_semana, instance.bloque_horario_id, disponible)
+
+
+def conectar_impacto_disponibilidad():
+    """Marca las asignaciones que quedan inválidas cuando un docente deja de estar disponible en un bloque."""
+    post_save.connect(_disponibilidad_modificada, sender=DisponibilidadDocentes, dispatch_uid="impacto_disponibilidad_save")
+    post_delete.connect(_disponibilidad_modificada, sender=DisponibilidadDocentes, dispatch_uid="impacto_disponibilidad_delete")
@@ -1,29 +1,245 @@
 # apps/scheduling/tasks.py
+from collections import Counter
 from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
 from apps.academic_setup.models import PeriodoAcademico
-from .service.schedule_generator import ScheduleGeneratorService
+from .models import TrabajoGeneracion, ParticionGeneracion
+from .service.schedule_generator import ScheduleGeneratorService, OpcionesEjecucion
+from .service.reservas import ReservaFranjasService, particionar_grupos, PROPIETARIO_FIJAS
+from .service.lotes import periodos_previos_en_cadena
+from .service.reparacion import ReparacionService
 import logging # Usar el sistema de logging de Python/Django
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True)
-def generar_horarios_task(self, periodo_id):
+# Motivo de detención del generador -> estado final del TrabajoGeneracion
+ESTADO_POR_DETENCION = {'TIEMPO_AGOTADO': 'DETENIDO', 'CANCELADO': 'CANCELADO'}
+
+
+def _finalizar_trabajo(trabajo, estado, resultado):
+    if trabajo is None:
+        return
+    trabajo.estado = estado
+    trabajo.resultado = resultado
+    trabajo.punto_control = None # Ya no hay nada que reanudar
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'resultado', 'punto_control', 'fecha_fin'])
+
+
+# acks_late + reject_on_worker_lost: si el worker muere a mitad de la ejecución, el broker vuelve a entregar
+# la tarea y esta se reanuda desde el último punto de control del TrabajoGeneracion.
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def generar_horarios_task(self, periodo_id, periodo_origen_id=None, trabajo_id=None, tiempo_limite=None, persistir_parcial=True,
+                          datos_referencia=None):
+    # `datos_referencia`: ya compilados para el período; solo con .apply() en el mismo proceso (no se serializan)
     logger.info(f"Iniciando tarea de generación de horarios para periodo_id: {periodo_id} (Task ID: {self.request.id})")
+
+    # Si la tarea viene de un TrabajoGeneracion, sus parámetros y su estado se toman/registran ahí
+    trabajo = TrabajoGeneracion.objects.filter(pk=trabajo_id).first() if trabajo_id else None
+    if trabajo is not None:
+        if trabajo.estado in TrabajoGeneracion.ESTADOS_FINALES:
+            return {"status": "SKIPPED", "periodo_id": periodo_id, "trabajo_id": trabajo.pk, "estado": trabajo.estado}
+        if trabajo.cancelacion_solicitada:
+            _finalizar_trabajo(trabajo, 'CANCELADO', None)
+            return {"status": "CANCELLED", "periodo_id": periodo_id, "trabajo_id": trabajo.pk}
+        periodo_origen_id = trabajo.periodo_origen_id
+        tiempo_limite = trabajo.tiempo_limite_segundos
+        persistir_parcial = trabajo.persistir_parcial
+        if trabajo.punto_control:
+            logger.info(f"Trabajo {trabajo.pk}: reanudando desde el punto de control del {trabajo.fecha_punto_control}.")
+        trabajo.estado = 'EN_CURSO'
+        trabajo.task_id = self.request.id
+        trabajo.intentos += 1
+        trabajo.fecha_inicio = trabajo.fecha_inicio or timezone.now()
+        trabajo.save(update_fields=['estado', 'task_id', 'intentos', 'fecha_inicio'])
+
     try:
         periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        # Arranque en caliente opcional desde otro período
+        periodo_origen = PeriodoAcademico.objects.get(pk=periodo_origen_id) if periodo_origen_id else None
         # Crear una instancia del logger de Django o Python para pasar al servicio
         # para que los logs del servicio vayan al sistema de logging de Celery/Django.
         task_logger = logging.getLogger(f"schedule_generator_task.{self.request.id}")
 
-        generator_service = ScheduleGeneratorService(periodo=periodo, stdout_ref=task_logger) # Pasa el logger
+        # Cancelación cooperativa: el generador consulta la bandera del trabajo entre sesiones
+        debe_cancelar = None
+        guardar_punto_control = None
+        if trabajo is not None:
+            debe_cancelar = lambda: TrabajoGeneracion.objects.filter(pk=trabajo.pk, cancelacion_solicitada=True).exists()
+            guardar_punto_control = lambda estado: TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(
+                punto_control=estado, fecha_punto_control=timezone.now()
+            )
+
+        generator_service = ScheduleGeneratorService(
+            periodo=periodo, stdout_ref=task_logger, # Pasa el logger
+            periodo_origen=periodo_origen,
+            opciones=OpcionesEjecucion(
+                tiempo_limite=tiempo_limite, debe_cancelar=debe_cancelar, persistir_parcial=persistir_parcial,
+                punto_control=trabajo.punto_control if trabajo is not None else None,
+                guardar_punto_control=guardar_punto_control,
+            ),
+            # En un lote, los docentes ya asignados en los períodos generados antes en la cadena
+            periodos_concurrentes=periodos_previos_en_cadena(trabajo) if trabajo is not None else None,
+            datos_referencia=datos_referencia
+        )
         resultado = generator_service.generar_horarios_automaticos()
+        resultado["unresolved_conflicts"] = generator_service.serializar_conflictos() # Resultado serializable para Celery
 
-        logger.info(f"Generación para periodo_id: {periodo_id} completada. Stats: {resultado.get('stats')}")
+        estado = ESTADO_POR_DETENCION.get(resultado.get("detenido"), 'COMPLETADO')
+        _finalizar_trabajo(trabajo, estado, resultado)
+        logger.info(f"Generación para periodo_id: {periodo_id} finalizada ({estado}). Stats: {resultado.get('stats')}")
         # Aquí podrías guardar el resultado en algún lugar (BD, caché) o enviar una notificación.
-        return {"status": "COMPLETED", "periodo_id": periodo_id, "resultado": resultado}
+        return {"status": "COMPLETED", "estado": estado, "periodo_id": periodo_id, "resultado": resultado}
     except PeriodoAcademico.DoesNotExist:
         logger.error(f"Error en tarea: Período académico {periodo_id} no encontrado.")
+        _finalizar_trabajo(trabajo, 'FALLIDO', {"error": "Período no encontrado"})
         return {"status": "FAILED", "periodo_id": periodo_id, "error": "Período no encontrado"}
     except Exception as e:
         logger.error(f"Error catastrófico en tarea de generación para periodo_id: {periodo_id}. Error: {str(e)}", exc_info=True)
+        _finalizar_trabajo(trabajo, 'FALLIDO', {"error": str(e)})
+        return {"status": "FAILED", "periodo_id": periodo_id, "error": str(e)}
+
+
+@shared_task(bind=True)
+def reparar_horario_task(self, periodo_id):
+    """Reparación incremental del período en segundo plano (ver ReparacionService)."""
+    try:
+        periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        resultado = ReparacionService(periodo=periodo, stdout_ref=logging.getLogger(f"reparacion_task.{self.request.id}")).reparar()
+    except PeriodoAcademico.DoesNotExist:
+        logger.error(f"Error en tarea de reparación: Período académico {periodo_id} no encontrado.")
+        return {"status": "FAILED", "periodo_id": periodo_id, "error": "Período no encontrado"}
+    except Exception as e:
+        logger.error(f"Error en tarea de reparación para periodo_id: {periodo_id}. Error: {str(e)}", exc_info=True)
         return {"status": "FAILED", "periodo_id": periodo_id, "error": str(e)}
+    logger.info(f"Reparación del período {periodo_id} finalizada: {resultado.get('cambios_procesados')} cambios procesados.")
+    return {"status": "COMPLETED", "periodo_id": periodo_id, "resultado": resultado}
+
+
+@shared_task(bind=True)
+def generar_horarios_distribuido_task(self, trabajo_id):
+    """
+    Coordinador de una generación distribuida: reparte los grupos del período según `trabajo.modo_particion`
+    y encola una `generar_particion_task` por partición. Los workers no comparten memoria: se coordinan con
+    las reservas de franjas (ReservaFranja) y la última partición en terminar aplica el horario completo.
+    """
+    trabajo = TrabajoGeneracion.objects.select_related('periodo').get(pk=trabajo_id)
+    if trabajo.estado in TrabajoGeneracion.ESTADOS_FINALES:
+        return {"status": "SKIPPED", "trabajo_id": trabajo.pk, "estado": trabajo.estado}
+
+    particiones = particionar_grupos(trabajo.periodo, trabajo.modo_particion)
+    if not particiones:
+        _finalizar_trabajo(trabajo, 'COMPLETADO', {"warning": "El período no tiene grupos."})
+        return {"status": "COMPLETED", "trabajo_id": trabajo.pk}
+
+    # Las franjas de las asignaciones confirmadas/fijadas quedan reservadas antes de que arranque cualquier partición
+    ReservaFranjasService(trabajo, PROPIETARIO_FIJAS).reservar_fijas()
+    with transaction.atomic():
+        creadas = [
+            ParticionGeneracion.objects.create(trabajo=trabajo, clave=clave, grupo_ids=grupo_ids)
+            for clave, grupo_ids in particiones.items()
+        ]
+        trabajo.estado = 'EN_CURSO'
+        trabajo.task_id = self.request.id
+        trabajo.fecha_inicio = timezone.now()
+        trabajo.particiones_pendientes = len(creadas)
+        trabajo.save(update_fields=['estado', 'task_id', 'fecha_inicio', 'particiones_pendientes'])
+
+    for particion in creadas:
+        generar_particion_task.delay(particion.pk)
+    logger.info(f"Trabajo {trabajo.pk}: {len(creadas)} particiones encoladas ({trabajo.modo_particion}).")
+    return {"status": "DISPATCHED", "trabajo_id": trabajo.pk, "particiones": [p.clave for p in creadas]}
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def generar_particion_task(self, particion_id):
+    """Genera los grupos de una partición reservando sus franjas en la BD; no escribe en HorariosAsignados."""
+    particion = ParticionGeneracion.objects.select_related('trabajo__periodo').get(pk=particion_id)
+    trabajo = particion.trabajo
+    if particion.estado in ('COMPLETADA', 'FALLIDA'):
+        return {"status": "SKIPPED", "particion_id": particion.pk}
+
+    particion.estado = 'EN_CURSO'
+    particion.save(update_fields=['estado'])
+    reservas = ReservaFranjasService(trabajo, particion.clave)
+    reservas.liberar_todas() # Si es un reintento, lo reservado por el intento anterior ya no vale
+    try:
+        generator_service = ScheduleGeneratorService(
+            periodo=trabajo.periodo, stdout_ref=logging.getLogger(f"schedule_generator_task.{self.request.id}"),
+            dry_run=True, # El horario completo se aplica al consolidar
+            opciones=OpcionesEjecucion(
+                tiempo_limite=trabajo.tiempo_limite_segundos, persistir_parcial=trabajo.persistir_parcial,
+                debe_cancelar=lambda: TrabajoGeneracion.objects.filter(pk=trabajo.pk, cancelacion_solicitada=True).exists(),
+                reservas=reservas,
+            ),
+            grupo_ids=particion.grupo_ids
+        )
+        resultado = generator_service.generar_horarios_automaticos()
+        particion.asignaciones = [list(a) for a in generator_service.asignaciones_propuestas]
+        particion.resultado = {
+            "stats": resultado["stats"],
+            "unresolved_conflicts": generator_service.serializar_conflictos(),
+            "metricas": resultado["metricas"],
+            "detenido": resultado["detenido"],
+        }
+        particion.estado = 'COMPLETADA'
+    except Exception as e:
+        logger.error(f"Error en la partición {particion.clave} del trabajo {trabajo.pk}: {str(e)}", exc_info=True)
+        particion.resultado = {"error": str(e)}
+        particion.estado = 'FALLIDA'
+    particion.save(update_fields=['asignaciones', 'resultado', 'estado'])
+
+    with transaction.atomic():
+        trabajo = TrabajoGeneracion.objects.select_for_update().get(pk=trabajo.pk)
+        trabajo.particiones_pendientes -= 1
+        trabajo.save(update_fields=['particiones_pendientes'])
+        es_la_ultima = trabajo.particiones_pendientes == 0
+    if es_la_ultima:
+        _consolidar_trabajo_distribuido(trabajo)
+    return {"status": "COMPLETED", "particion_id": particion.pk, "estado": particion.estado}
+
+
+def _consolidar_trabajo_distribuido(trabajo):
+    """Une los horarios de las particiones y aplica un único diff sobre el período (misma lógica que la generación local)."""
+    particiones = list(trabajo.particiones.all())
+    fallidas = [p.clave for p in particiones if p.estado != 'COMPLETADA']
+    if fallidas:
+        trabajo.reservas.all().delete()
+        _finalizar_trabajo(trabajo, 'FALLIDO', {"error": f"Particiones fallidas: {fallidas}"})
+        return
+
+    try:
+        generator_service = ScheduleGeneratorService(
+            periodo=trabajo.periodo, opciones=OpcionesEjecucion(persistir_parcial=trabajo.persistir_parcial)
+        )
+        detenciones = [p.resultado["detenido"] for p in particiones if p.resultado.get("detenido")]
+        # La unión se vuelve a verificar: topes diarios y bloques superpuestos entre particiones
+        consolidado = generator_service.consolidar(
+            [a for p in particiones for a in p.asignaciones], detenido=detenciones[0] if detenciones else None
+        )
+        cambios = consolidado["cambios"]
+        if consolidado["descartadas"]:
+            logger.warning(f"Trabajo {trabajo.pk}: {len(consolidado['descartadas'])} sesiones de las particiones descartadas al consolidar.")
+    except Exception as e:
+        logger.error(f"Error al consolidar el trabajo {trabajo.pk}: {str(e)}", exc_info=True)
+        trabajo.reservas.all().delete()
+        _finalizar_trabajo(trabajo, 'FALLIDO', {"error": str(e)})
+        return
+
+    stats = Counter()
+    for p in particiones:
+        stats.update(p.resultado["stats"])
+    stats.update(generator_service.generation_stats)
+    resultado = {
+        "stats": dict(stats),
+        "unresolved_conflicts": [c for p in particiones for c in p.resultado["unresolved_conflicts"]]
+                                + generator_service.serializar_conflictos(),
+        "cambios": cambios,
+        "detenido": generator_service.detenido,
+        "particiones": {p.clave: p.resultado["metricas"] for p in particiones},
+    }
+    trabajo.reservas.all().delete() # Las reservas solo sirven mientras corren las particiones
+    estado = ESTADO_POR_DETENCION.get(generator_service.detenido, 'COMPLETADO')
+    _finalizar_trabajo(trabajo, estado, resultado)
+    logger.info(f"Trabajo distribuido {trabajo.pk} consolidado ({estado}): {cambios['agregadas']} nuevas, {cambios['eliminadas']} eliminadas.")
@@ -1,3 +1,309 @@
+import datetime
+from collections import Counter
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from apps.academic_setup.models import UnidadAcademica, Carrera, PeriodoAcademico, TiposEspacio, EspaciosFisicos, Materias
+from apps.users.models import Docentes
+from .models import (
+    Grupos, BloquesHorariosDefinicion, DisponibilidadDocentes, HorariosAsignados, ConfiguracionRestricciones,
+    TrabajoGeneracion, ReservaFranja
+)
+from . import tasks
+from .service.datos_referencia import clave_resultado_generador
+from .service.reservas import ReservaFranjasService
+from .service.schedule_generator import ScheduleGeneratorService
+
+
+class GeneracionDistribuidaTests(TestCase):
+    """
+    Dos particiones (una por carrera) que arrancan a la vez: ninguna ve la carga que reserva la otra. G2 tiene
+    confirmadas las 07:00 y las 09:00, así que cada partición pone al docente 1 en franjas distintas (sin choque de
+    reservas) y entre las dos le darían 4 sesiones el lunes, con un tope diario de 2.
+    """
+
+    def setUp(self):
+        cache.clear() # Los pk se repiten entre tests: que no se sirvan datos de referencia de otro test
+        self.periodo = PeriodoAcademico.objects.create(
+            nombre_periodo='2026-T', fecha_inicio=datetime.date(2026, 3, 1), fecha_fin=datetime.date(2026, 7, 31)
+        )
+        unidad = UnidadAcademica.objects.create(nombre_unidad='Unidad de prueba')
+        tipo_aula = TiposEspacio.objects.create(nombre_tipo_espacio='Aula')
+        espacios = [EspaciosFisicos.objects.create(nombre_espacio=f'Aula {i}', tipo_espacio=tipo_aula, capacidad=40) for i in (1, 2, 3)]
+
+        self.bloques = [
+            BloquesHorariosDefinicion.objects.create(
+                nombre_bloque=f'Lunes {h:02d}:00', hora_inicio=datetime.time(h), hora_fin=datetime.time(h + 2), turno='M', dia_semana=1
+            )
+            for h in (7, 9, 11, 13)
+        ]
+        # 08:00-10:00 se superpone con los bloques de las 07:00 y de las 09:00
+        self.bloques.append(BloquesHorariosDefinicion.objects.create(
+            nombre_bloque='Lunes 08:00', hora_inicio=datetime.time(8), hora_fin=datetime.time(10), turno='M', dia_semana=1
+        ))
+
+        docentes = []
+        for i in (1, 2, 3):
+            usuario = User.objects.create_user(username=f'docente{i}', password='x')
+            docentes.append(Docentes.objects.create(usuario=usuario, codigo_docente=f'D{i}', nombres=f'Docente {i}', apellidos='Prueba'))
+        for docente in docentes[:2]: # El docente 3 solo dicta las sesiones confirmadas
+            for bloque in self.bloques:
+                DisponibilidadDocentes.objects.create(docente=docente, periodo=self.periodo, dia_semana=1, bloque_horario=bloque)
+
+        ConfiguracionRestricciones.objects.create(
+            codigo_restriccion='MAX_HORAS_DIA_DOCENTE', descripcion='Máximo 4 horas (2 sesiones) por día',
+            tipo_aplicacion='GLOBAL', valor_parametro='4', periodo_aplicable=self.periodo
+        )
+        grupos = []
+        for i in (1, 2):
+            carrera = Carrera.objects.create(nombre_carrera=f'Carrera {i}', codigo_carrera=f'C{i}', unidad=unidad)
+            materia = Materias.objects.create(codigo_materia=f'M{i}', nombre_materia=f'Materia {i}', horas_academicas_teoricas=4)
+            grupo = Grupos.objects.create(
+                codigo_grupo=f'G{i}', carrera=carrera, periodo=self.periodo, numero_estudiantes_estimado=20, ciclo_semestral=1
+            )
+            grupo.materias.add(materia)
+            grupos.append(grupo)
+
+        confirmada = Materias.objects.create(codigo_materia='M3', nombre_materia='Materia 3', horas_academicas_teoricas=4)
+        grupos[1].materias.add(confirmada)
+        for bloque in self.bloques[:2]:
+            HorariosAsignados.objects.create(
+                grupo=grupos[1], materia=confirmada, docente=docentes[2], espacio=espacios[2], periodo=self.periodo,
+                dia_semana=1, bloque_horario=bloque, estado='Confirmado'
+            )
+
+    def _generar_en_paralelo(self):
+        trabajo = TrabajoGeneracion.objects.create(periodo=self.periodo, modo_particion='CARRERA')
+        # Las particiones corren en este proceso, una tras otra, pero sin ver las reservas de la otra: lo mismo
+        # que dos workers que arrancan a la vez
+        with mock.patch.object(tasks.generar_particion_task, 'delay', side_effect=lambda pk: tasks.generar_particion_task.apply(args=(pk,))), \
+                mock.patch.object(ReservaFranjasService, 'reservas_de_otros', return_value=[]):
+            tasks.generar_horarios_distribuido_task.apply(args=(trabajo.pk,))
+        trabajo.refresh_from_db()
+        return trabajo
+
+    def test_particiones_concurrentes_respetan_tope_diario_y_franjas(self):
+        trabajo = self._generar_en_paralelo()
+        self.assertEqual(trabajo.estado, 'COMPLETADO')
+        self.assertFalse(ReservaFranja.objects.filter(trabajo=trabajo).exists())
+
+        filas = list(HorariosAsignados.objects.filter(periodo=self.periodo).values_list('docente_id', 'espacio_id', 'grupo_id', 'bloque_horario'))
+        self.assertEqual(len(filas), 6) # Las 2 confirmadas y las 2 de cada grupo, repartidas entre los docentes 1 y 2
+        self.assertEqual(trabajo.resultado["stats"]["sesiones_descartadas_al_consolidar"], 2)
+        self.assertEqual(trabajo.resultado["unresolved_conflicts"], [])
+        por_docente = Counter(docente_id for docente_id, _, _, _ in filas)
+        self.assertTrue(all(sesiones <= 2 for sesiones in por_docente.values()), por_docente)
+
+        bloques = {b.pk: b for b in self.bloques}
+        for i, (docente_a, espacio_a, grupo_a, bloque_a) in enumerate(filas):
+            for docente_b, espacio_b, grupo_b, bloque_b in filas[i + 1:]:
+                a, b = bloques[bloque_a], bloques[bloque_b]
+                if a.hora_inicio < b.hora_fin and b.hora_inicio < a.hora_fin:
+                    self.assertNotEqual(docente_a, docente_b)
+                    self.assertNotEqual(espacio_a, espacio_b)
+                    self.assertNotEqual(grupo_a, grupo_b)
+
+
+class PeriodoDePruebaMixin:
+    """Un período con los bloques del lunes de las 07:00 a las 15:00, dos docentes disponibles en todos y dos aulas."""
+
+    def crear_periodo(self):
+        cache.clear() # Los pk se repiten entre tests: que no se sirvan datos o resultados memorizados de otro test
+        self.periodo = PeriodoAcademico.objects.create(
+            nombre_periodo='2026-T', fecha_inicio=datetime.date(2026, 3, 1), fecha_fin=datetime.date(2026, 7, 31)
+        )
+        self.unidad = UnidadAcademica.objects.create(nombre_unidad='Unidad de prueba')
+        tipo_aula = TiposEspacio.objects.create(nombre_tipo_espacio='Aula')
+        self.espacios = [EspaciosFisicos.objects.create(nombre_espacio=f'Aula {i}', tipo_espacio=tipo_aula, capacidad=40) for i in (1, 2)]
+        self.bloques = [
+            BloquesHorariosDefinicion.objects.create(
+                nombre_bloque=f'Lunes {h:02d}:00', hora_inicio=datetime.time(h), hora_fin=datetime.time(h + 2), turno='M', dia_semana=1
+            )
+            for h in (7, 9, 11, 13)
+        ]
+        self.docentes = []
+        for i in (1, 2):
+            usuario = User.objects.create_user(username=f'docente{i}', password='x')
+            docente = Docentes.objects.create(usuario=usuario, codigo_docente=f'D{i}', nombres=f'Docente {i}', apellidos='Prueba')
+            for bloque in self.bloques:
+                DisponibilidadDocentes.objects.create(docente=docente, periodo=self.periodo, dia_semana=1, bloque_horario=bloque)
+            self.docentes.append(docente)
+        self.carrera = Carrera.objects.create(nombre_carrera='Carrera 1', codigo_carrera='C1', unidad=self.unidad)
+
+    def crear_grupo(self, i, horas=4):
+        """Grupo G{i} con una materia M{i} de `horas` horas teóricas (una sesión cada 2 horas)."""
+        materia = Materias.objects.create(codigo_materia=f'M{i}', nombre_materia=f'Materia {i}', horas_academicas_teoricas=horas)
+        grupo = Grupos.objects.create(
+            codigo_grupo=f'G{i}', carrera=self.carrera, periodo=self.periodo, numero_estudiantes_estimado=20, ciclo_semestral=1
+        )
+        grupo.materias.add(materia)
+        return grupo, materia
+
+    def filas(self):
+        return set(HorariosAsignados.objects.filter(periodo=self.periodo).values_list(
+            'horario_id', 'grupo_id', 'materia_id', 'docente_id', 'espacio_id', 'bloque_horario_id', 'estado', 'fijado'
+        ))
+
+
+class PreservacionAsignacionesFijasTests(PeriodoDePruebaMixin, TestCase):
+    """Las sesiones confirmadas y las fijadas se conservan tal cual al regenerar y cuentan para la demanda del grupo."""
+
+    def setUp(self):
+        self.crear_periodo()
+        grupo_1, materia_1 = self.crear_grupo(1)
+        grupo_2, materia_2 = self.crear_grupo(2)
+        self.confirmada = HorariosAsignados.objects.create(
+            grupo=grupo_1, materia=materia_1, docente=self.docentes[1], espacio=self.espacios[1], periodo=self.periodo,
+            dia_semana=1, bloque_horario=self.bloques[3], estado='Confirmado'
+        )
+        self.fijada = HorariosAsignados.objects.create(
+            grupo=grupo_2, materia=materia_2, docente=self.docentes[0], espacio=self.espacios[0], periodo=self.periodo,
+            dia_semana=1, bloque_horario=self.bloques[3], estado='Programado', fijado=True
+        )
+
+    def test_regenerar_conserva_confirmadas_y_fijadas(self):
+        fijas = {f for f in self.filas() if f[0] in (self.confirmada.pk, self.fijada.pk)}
+        for _ in range(2): # La segunda regeneración parte del horario que dejó la primera
+            resultado = ScheduleGeneratorService(self.periodo).generar_horarios_automaticos()
+            self.assertEqual(resultado["unresolved_conflicts"], [])
+            filas = self.filas()
+            self.assertTrue(fijas <= filas, fijas - filas)
+            self.assertEqual(len(filas), 4) # Una sesión más por grupo, además de la que ya tenía
+
+
+class GeneracionDryRunTests(PeriodoDePruebaMixin, TestCase):
+    """dry_run devuelve las mismas diferencias que aplicaría una generación real, sin escribir en la BD."""
+
+    def setUp(self):
+        self.crear_periodo()
+        grupo_1, materia_1 = self.crear_grupo(1)
+        self.crear_grupo(2)
+        # Una sesión de más para G1 (su materia pide 2) en un aula y con un docente cualesquiera
+        for bloque in self.bloques[:3]:
+            HorariosAsignados.objects.create(
+                grupo=grupo_1, materia=materia_1, docente=self.docentes[0], espacio=self.espacios[0], periodo=self.periodo,
+                dia_semana=1, bloque_horario=bloque, estado='Programado'
+            )
+
+    @staticmethod
+    def _diferencias(cambios):
+        return (
+            cambios["agregadas"], cambios["eliminadas"], cambios["conservadas"],
+            {tuple(sorted(a.items())) for a in cambios["detalle_agregadas"]},
+            {tuple(sorted(a.items())) for a in cambios["detalle_eliminadas"]},
+        )
+
+    def test_dry_run_igual_a_generacion_real_y_sin_escrituras(self):
+        antes = self.filas()
+        simulado = ScheduleGeneratorService(self.periodo, dry_run=True).generar_horarios_automaticos()
+        self.assertTrue(simulado["dry_run"])
+        self.assertEqual(self.filas(), antes)
+
+        cache.clear() # Que la generación real busque de nuevo en vez de reutilizar el resultado del dry_run
+        real = ScheduleGeneratorService(self.periodo).generar_horarios_automaticos()
+        self.assertEqual(self._diferencias(simulado["cambios"]), self._diferencias(real["cambios"]))
+        self.assertGreater(real["cambios"]["eliminadas"], 0)
+        self.assertGreater(real["cambios"]["agregadas"], 0)
+        self.assertNotEqual(self.filas(), antes)
+
+
+class MemorizacionResultadoTests(PeriodoDePruebaMixin, TestCase):
+    """
+    La huella del resultado memorizado cambia con altas y bajas hechas sin señales (bulk_create, DELETE por SQL),
+    que no suben la versión de la tabla.
+    """
+
+    def setUp(self):
+        self.crear_periodo()
+        self.crear_grupo(1)
+        self.crear_grupo(2)
+
+    def _generar(self):
+        generador = ScheduleGeneratorService(self.periodo)
+        generador.generar_horarios_automaticos()
+        return generador.resultado_memorizado
+
+    def test_sin_cambios_se_reutiliza_el_resultado(self):
+        self.assertFalse(self._generar())
+        self.assertTrue(self._generar())
+
+    def test_alta_sin_senales_cambia_la_clave(self):
+        usuario = User.objects.create_user(username='docente3', password='x')
+        docente = Docentes.objects.create(usuario=usuario, codigo_docente='D3', nombres='Docente 3', apellidos='Prueba')
+        self._generar()
+        clave = clave_resultado_generador(self.periodo.pk, [])
+        DisponibilidadDocentes.objects.bulk_create([
+            DisponibilidadDocentes(docente=docente, periodo=self.periodo, dia_semana=1, bloque_horario=bloque) for bloque in self.bloques
+        ])
+        self.assertNotEqual(clave_resultado_generador(self.periodo.pk, []), clave)
+        self.assertFalse(self._generar())
+
+    def test_baja_sin_senales_cambia_la_clave(self):
+        self._generar()
+        clave = clave_resultado_generador(self.periodo.pk, [])
+        meta = DisponibilidadDocentes._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(meta.db_table)} WHERE {connection.ops.quote_name(meta.pk.column)} = %s",
+                [DisponibilidadDocentes.objects.filter(docente=self.docentes[0]).order_by('pk').values_list('pk', flat=True).first()]
+            )
+        self.assertNotEqual(clave_resultado_generador(self.periodo.pk, []), clave)
+        self.assertFalse(self._generar())
+
+
+class EdicionManualConflictosTests(PeriodoDePruebaMixin, TestCase):
+    """mover e intercambiar responden 409 si el cambio choca con el horario o con la disponibilidad, sin tocar las filas."""
+
+    def setUp(self):
+        self.crear_periodo()
+        # 08:00-10:00 se superpone con los bloques de las 07:00 y de las 09:00
+        self.bloque_8 = BloquesHorariosDefinicion.objects.create(
+            nombre_bloque='Lunes 08:00', hora_inicio=datetime.time(8), hora_fin=datetime.time(10), turno='M', dia_semana=1
+        )
+        # El docente 2 solo está disponible a las 09:00
+        DisponibilidadDocentes.objects.filter(docente=self.docentes[1]).exclude(bloque_horario=self.bloques[1]).delete()
+        grupo, materia_1 = self.crear_grupo(1, horas=2)
+        materia_2 = Materias.objects.create(codigo_materia='M2', nombre_materia='Materia 2', horas_academicas_teoricas=2)
+        grupo.materias.add(materia_2)
+        self.a = HorariosAsignados.objects.create(
+            grupo=grupo, materia=materia_1, docente=self.docentes[0], espacio=self.espacios[0], periodo=self.periodo,
+            dia_semana=1, bloque_horario=self.bloques[0], estado='Programado'
+        )
+        self.b = HorariosAsignados.objects.create(
+            grupo=grupo, materia=materia_2, docente=self.docentes[1], espacio=self.espacios[1], periodo=self.periodo,
+            dia_semana=1, bloque_horario=self.bloques[1], estado='Programado'
+        )
+
+    def _post(self, horario, accion, datos):
+        return self.client.post(f'/api/scheduling/horarios-asignados/{horario.pk}/{accion}/', datos, content_type='application/json')
+
+    def _codigos(self, respuesta):
+        return {c["codigo"] for c in respuesta.json()["conflictos"]}
+
+    def test_mover_con_conflicto_responde_409_sin_cambios(self):
+        antes = self.filas()
+        respuesta = self._post(self.a, 'mover', {'bloque_horario_id': self.bloques[1].pk})
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertIn('GRUPO_OCUPADO', self._codigos(respuesta))
+        respuesta = self._post(self.a, 'mover', {'bloque_horario_id': self.bloque_8.pk}) # Se superpone con la de las 09:00
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertIn('GRUPO_OCUPADO', self._codigos(respuesta))
+        self.assertEqual(self.filas(), antes)
+
+    def test_intercambiar_con_conflicto_responde_409_sin_cambios(self):
+        antes = self.filas()
+        respuesta = self._post(self.a, 'intercambiar', {'con': self.b.pk})
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(self._codigos(respuesta), {'DOCENTE_NO_DISPONIBLE'})
+        self.assertEqual(self.filas(), antes)
+
+    def test_mover_sin_conflicto_guarda_el_cambio(self):
+        respuesta = self._post(self.a, 'mover', {'bloque_horario_id': self.bloques[2].pk})
+        self.assertEqual(respuesta.status_code, 200)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.bloque_horario_id, self.b.bloque_horario_id), (self.bloques[2].pk, self.bloques[1].pk))
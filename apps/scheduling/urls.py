@@ -9,6 +9,11 @@ router.register(r'bloques-horarios', views.BloquesHorariosDefinicionViewSet)
 router.register(r'disponibilidad-docentes', views.DisponibilidadDocentesViewSet)
 router.register(r'horarios-asignados', views.HorariosAsignadosViewSet)
 router.register(r'configuracion-restricciones', views.ConfiguracionRestriccionesViewSet)
+router.register(r'escenarios-horario', views.EscenarioHorarioViewSet)
+router.register(r'cambios-escenario', views.CambioEscenarioViewSet)
+router.register(r'trabajos-generacion', views.TrabajoGeneracionViewSet)
+router.register(r'lotes-generacion', views.LoteGeneracionViewSet)
+router.register(r'perfiles-pesos', views.PerfilPesosViewSet)
 # Para la generación de horarios (no es un ModelViewSet estándar)
 router.register(r'acciones-horario', views.GeneracionHorarioView, basename='acciones-horario')
 
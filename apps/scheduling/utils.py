@@ -0,0 +1,13 @@
+# apps/scheduling/utils.py
+"""Utilidades de las vistas compartidas entre apps (sin depender de ningún módulo de vistas)."""
+
+
+def leer_bandera(request, nombre, por_defecto=False):
+    """
+    Parámetro booleano de la solicitud, de la query string o del cuerpo: '1' o 'true' (sin distinguir mayúsculas)
+    lo activan. Si no viene, `por_defecto`.
+    """
+    valor = request.query_params.get(nombre, request.data.get(nombre))
+    if valor is None:
+        return por_defecto
+    return str(valor).lower() in ('1', 'true')
@@ -1,27 +1,67 @@
 # apps/scheduling/view.py
 from django.db import models # <--- AÑADE O ASEGÚRATE QUE ESTA LÍNEA EXISTA
+from django.db import transaction
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend # Para filtrado avanzado
-from .models import Grupos, BloquesHorariosDefinicion, DisponibilidadDocentes, HorariosAsignados, ConfiguracionRestricciones
-from .tasks import generar_horarios_task # Importar la tarea Celery
+from .models import (
+    Grupos, BloquesHorariosDefinicion, DisponibilidadDocentes, HorariosAsignados, ConfiguracionRestricciones,
+    EscenarioHorario, CambioEscenario, TrabajoGeneracion, LoteGeneracion, PerfilPesos
+)
+from celery import chain
+from .tasks import generar_horarios_task, generar_horarios_distribuido_task, reparar_horario_task # Importar las tareas Celery
 
 # Importar el servicio
-from .service.schedule_generator import ScheduleGeneratorService # Asegúrate que la ruta sea correcta (service o services)
+from .service.schedule_generator import ScheduleGeneratorService, OpcionesEjecucion # Asegúrate que la ruta sea correcta (service o services)
 import logging
 logger = logging.getLogger(__name__)
 
 from .serializers import (
     GruposSerializer, BloquesHorariosDefinicionSerializer, DisponibilidadDocentesSerializer,
-    HorariosAsignadosSerializer, ConfiguracionRestriccionesSerializer
+    HorariosAsignadosSerializer, ConfiguracionRestriccionesSerializer,
+    EscenarioHorarioSerializer, CambioEscenarioSerializer, TrabajoGeneracionSerializer, LoteGeneracionSerializer,
+    PerfilPesosSerializer
 )
 # Importar servicios
 from .service.schedule_generator import ScheduleGeneratorService
 from .service.conflict_validator import ConflictValidatorService
+from .service.escenarios import EscenarioService
+from .service.lotes import crear_lote
+from .service.reparacion import ReparacionService
+from .service.servidor_generador import (
+    analizar_factibilidad, sugerir_suplentes, sugerir_franjas, mover_asignacion, intercambiar_asignaciones, ServidorGeneradorError
+)
+from .service.suplencias import SUPLENTES_POR_SESION
+from .service.sugerencias import OPCIONES_POR_DEFECTO
+from .service.edicion_manual import ConflictoEdicion
+from .service.calidad import CalidadHorarioService
+from .utils import leer_bandera
 from apps.academic_setup.models import PeriodoAcademico # Para la acción de generar
+from django.utils import timezone
+from datetime import date
+
+
+def _solicitar_cancelacion(trabajo):
+    trabajo.cancelacion_solicitada = True
+    campos = ['cancelacion_solicitada']
+    if trabajo.estado == 'PENDIENTE': # Aún no empezó: se cancela sin esperar al worker
+        trabajo.estado = 'CANCELADO'
+        trabajo.fecha_fin = timezone.now()
+        campos += ['estado', 'fecha_fin']
+    trabajo.save(update_fields=campos)
+
+
+def _leer_tiempo_limite(valor):
+    """Presupuesto de tiempo en segundos (None si no se indicó). Lanza ValueError si no es un número positivo."""
+    if valor in (None, ''):
+        return None
+    segundos = float(valor)
+    if segundos <= 0:
+        raise ValueError(segundos)
+    return segundos
 
 class GruposViewSet(viewsets.ModelViewSet):
     queryset = Grupos.objects.select_related(
@@ -80,10 +120,22 @@ class GruposViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Opcional: reutilizar el horario del grupo equivalente en otro período (arranque en caliente)
+        periodo_origen = None
+        periodo_origen_id = request.data.get('periodo_origen_id')
+        if periodo_origen_id:
+            try:
+                periodo_origen = PeriodoAcademico.objects.get(pk=periodo_origen_id)
+            except PeriodoAcademico.DoesNotExist:
+                return Response({"error": "Período académico de origen no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
         print(f"Iniciando generador de horarios para el grupo '{grupo.codigo_grupo}' en el período '{periodo_activo.nombre_periodo}'...")
         
+        # dry_run=true: genera en memoria y devuelve el diff y las métricas sin escribir en la BD
+        dry_run = leer_bandera(request, 'dry_run')
+
         # Instanciar el servicio
-        generator = ScheduleGeneratorService(periodo=periodo_activo)
+        generator = ScheduleGeneratorService(periodo=periodo_activo, periodo_origen=periodo_origen, dry_run=dry_run)
 
         # Llamar al nuevo método específico para un grupo
         resultado = generator.generar_horario_para_grupo(grupo_id=grupo.grupo_id)
@@ -95,6 +147,34 @@ class GruposViewSet(viewsets.ModelViewSet):
 
         return Response(resultado, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'], url_path='sugerir-franjas')
+    def sugerir_franjas(self, request, pk=None):
+        """
+        Programación manual: las mejores opciones (bloque, docente, aula) libres y factibles para una sesión de
+        la materia, ordenadas por la penalización blanda del generador. Opcional: 'docente_id', 'dia_semana', 'limite'.
+        """
+        grupo = self.get_object()
+        try:
+            materia_id = int(request.query_params.get('materia_id', ''))
+            limite = int(request.query_params.get('limite', OPCIONES_POR_DEFECTO))
+            docente_id = request.query_params.get('docente_id')
+            docente_id = int(docente_id) if docente_id else None
+            dia_semana = request.query_params.get('dia_semana')
+            dia_semana = int(dia_semana) if dia_semana else None
+            if limite < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Se requiere 'materia_id'; 'limite', 'docente_id' y 'dia_semana' deben ser enteros positivos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultado = sugerir_franjas(grupo, materia_id, limite, docente_id=docente_id, dia_semana=dia_semana)
+        except ServidorGeneradorError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if resultado is None:
+            return Response({"error": "La materia no pertenece al grupo o no requiere sesiones."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_200_OK)
+
 
 class BloquesHorariosDefinicionViewSet(viewsets.ModelViewSet):
     queryset = BloquesHorariosDefinicion.objects.all()
@@ -111,6 +191,34 @@ class DisponibilidadDocentesViewSet(viewsets.ModelViewSet):
     filterset_fields = ['docente', 'periodo']
     pagination_class = None # Deshabilitar paginación para este ViewSet
 
+    # Al guardar o borrar una disponibilidad, una señal marca las asignaciones que quedan inválidas
+    # (docente_no_disponible). Con reparar=true además se encola la reparación incremental del período.
+    def _encolar_reparacion(self, disponibilidad):
+        if not leer_bandera(self.request, 'reparar'):
+            return
+        if not HorariosAsignados.objects.filter(periodo_id=disponibilidad.periodo_id, docente_id=disponibilidad.docente_id,
+                                                docente_no_disponible=True).exists():
+            return
+
+        def encolar():
+            try:
+                reparar_horario_task.delay(disponibilidad.periodo_id)
+            except Exception as e:
+                logger.error(f"No se pudo encolar la reparación del período {disponibilidad.periodo_id}: {str(e)}", exc_info=True)
+        transaction.on_commit(encolar)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self._encolar_reparacion(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self._encolar_reparacion(serializer.instance)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self._encolar_reparacion(instance)
+
 
 class HorariosAsignadosViewSet(viewsets.ModelViewSet):
     queryset = HorariosAsignados.objects.select_related(
@@ -125,6 +233,9 @@ class HorariosAsignadosViewSet(viewsets.ModelViewSet):
         'docente': ['exact', 'in'],
         'espacio': ['exact', 'in'],
         'dia_semana': ['exact'],
+        'estado': ['exact'],
+        'fijado': ['exact'],
+        'docente_no_disponible': ['exact'],
         'grupo__carrera': ['exact'],
     }
 
@@ -143,12 +254,195 @@ class HorariosAsignadosViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'El docente seleccionado no tiene ninguna de las especialidades requeridas por la materia.'}, status=status.HTTP_400_BAD_REQUEST)
         return super().create(request, *args, **kwargs)
 
+    # Una asignación creada o movida a mano se marca si el docente no está disponible en su bloque
+    def _guardar_con_disponibilidad(self, serializer):
+        datos = {**{c: getattr(serializer.instance, c) for c in ('docente', 'periodo', 'dia_semana', 'bloque_horario')
+                    if serializer.instance is not None}, **serializer.validated_data}
+        disponible = DisponibilidadDocentes.objects.filter(
+            docente=datos['docente'], periodo=datos['periodo'], dia_semana=datos['dia_semana'],
+            bloque_horario=datos['bloque_horario'], esta_disponible=True
+        ).exists()
+        serializer.save(docente_no_disponible=not disponible)
+
+    def perform_create(self, serializer):
+        self._guardar_con_disponibilidad(serializer)
+
+    def perform_update(self, serializer):
+        self._guardar_con_disponibilidad(serializer)
+
+    def _respuesta_edicion(self, editar, dry_run):
+        try:
+            editados = editar()
+        except ConflictoEdicion as e:
+            return Response({"conflictos": e.conflictos}, status=status.HTTP_409_CONFLICT)
+        except ServidorGeneradorError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({"dry_run": dry_run, "horarios": self.get_serializer(editados, many=True).data}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='mover')
+    def mover(self, request, pk=None):
+        """
+        Edición manual: mueve la asignación a 'bloque_horario_id' (opcional: 'docente_id', 'espacio_id'). Se valida
+        contra el horario del período y se guarda en una transacción; con conflictos responde 409 y no cambia nada.
+        """
+        horario = self.get_object()
+        try:
+            bloque = BloquesHorariosDefinicion.objects.get(pk=int(request.data.get('bloque_horario_id', '')))
+            docente_id = request.data.get('docente_id')
+            docente_id = int(docente_id) if docente_id else None
+            espacio_id = request.data.get('espacio_id')
+            espacio_id = int(espacio_id) if espacio_id else None
+        except (ValueError, TypeError, BloquesHorariosDefinicion.DoesNotExist):
+            return Response({"error": "Se requiere un 'bloque_horario_id' existente; 'docente_id' y 'espacio_id' deben ser enteros."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        dry_run = leer_bandera(request, 'dry_run')
+
+        # En el servidor residente del generador si está levantado; si no, en este proceso
+        return self._respuesta_edicion(lambda: mover_asignacion(
+            horario, bloque, docente_id=docente_id, espacio_id=espacio_id, dry_run=dry_run, stdout_ref=logger
+        ), dry_run)
+
+    @action(detail=True, methods=['post'], url_path='intercambiar')
+    def intercambiar(self, request, pk=None):
+        """Edición manual: intercambia los bloques de esta asignación y la indicada en 'con' (del mismo período)."""
+        horario = self.get_object()
+        try:
+            otro = HorariosAsignados.objects.get(pk=int(request.data.get('con', '')), periodo_id=horario.periodo_id)
+        except (ValueError, TypeError, HorariosAsignados.DoesNotExist):
+            return Response({"error": "Se requiere 'con': una asignación distinta del mismo período."}, status=status.HTTP_400_BAD_REQUEST)
+        if otro.pk == horario.pk:
+            return Response({"error": "Se requiere 'con': una asignación distinta del mismo período."}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = leer_bandera(request, 'dry_run')
+
+        return self._respuesta_edicion(lambda: intercambiar_asignaciones(horario, otro, dry_run=dry_run, stdout_ref=logger), dry_run)
+
 
 class ConfiguracionRestriccionesViewSet(viewsets.ModelViewSet):
     queryset = ConfiguracionRestricciones.objects.select_related('periodo_aplicable').all()
     serializer_class = ConfiguracionRestriccionesSerializer
     permission_classes = [permissions.AllowAny]
 
+class EscenarioHorarioViewSet(viewsets.ModelViewSet):
+    queryset = EscenarioHorario.objects.select_related('periodo').prefetch_related('cambios').all()
+    serializer_class = EscenarioHorarioSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['periodo']
+
+    @action(detail=True, methods=['get'], url_path='horario')
+    def horario(self, request, pk=None):
+        """Horario completo del escenario: el publicado con los cambios del escenario aplicados."""
+        escenario = self.get_object()
+        filas = EscenarioService(periodo=escenario.periodo, stdout_ref=logger).materializar(escenario)
+        return Response(filas, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='evaluar')
+    def evaluar(self, request, pk=None):
+        """Puntaje del escenario y su diferencia con el horario publicado."""
+        escenario = self.get_object()
+        resultado = EscenarioService(periodo=escenario.periodo, stdout_ref=logger).comparar([escenario])
+        return Response(resultado, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='comparar')
+    def comparar(self, request):
+        """Compara varios escenarios de un período: /escenarios-horario/comparar/?periodo_id=1&ids=1,2,3 (sin ids, todos)."""
+        periodo_id = request.query_params.get('periodo_id')
+        if not periodo_id:
+            return Response({"error": "Se requiere el parámetro 'periodo_id'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        escenarios = EscenarioHorario.objects.filter(periodo=periodo).order_by('escenario_id')
+        ids = request.query_params.get('ids')
+        if ids:
+            escenarios = escenarios.filter(escenario_id__in=[i for i in ids.split(',') if i.strip().isdigit()])
+        resultado = EscenarioService(periodo=periodo, stdout_ref=logger).comparar(escenarios)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+
+class CambioEscenarioViewSet(viewsets.ModelViewSet):
+    queryset = CambioEscenario.objects.all()
+    serializer_class = CambioEscenarioSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['escenario', 'tipo']
+
+
+class TrabajoGeneracionViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = TrabajoGeneracion.objects.select_related('periodo').all()
+    serializer_class = TrabajoGeneracionSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['periodo', 'estado']
+
+    @action(detail=True, methods=['post'], url_path='cancelar')
+    def cancelar(self, request, pk=None):
+        """
+        Solicita la cancelación del trabajo. El generador la detecta entre sesiones y termina devolviendo
+        (y, si el trabajo lo indica, guardando) lo mejor obtenido hasta ese momento.
+        """
+        trabajo = self.get_object()
+        if trabajo.estado in TrabajoGeneracion.ESTADOS_FINALES:
+            return Response({"error": f"El trabajo ya finalizó ({trabajo.estado})."}, status=status.HTTP_400_BAD_REQUEST)
+
+        _solicitar_cancelacion(trabajo)
+        return Response(self.get_serializer(trabajo).data, status=status.HTTP_200_OK)
+
+
+class LoteGeneracionViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = LoteGeneracion.objects.prefetch_related('trabajos__periodo').all()
+    serializer_class = LoteGeneracionSerializer
+    permission_classes = [permissions.AllowAny]
+
+    @action(detail=True, methods=['post'], url_path='cancelar')
+    def cancelar(self, request, pk=None):
+        """Solicita la cancelación de todos los trabajos del lote que aún no finalizaron."""
+        lote = self.get_object()
+        pendientes = [t for t in lote.trabajos.all() if t.estado not in TrabajoGeneracion.ESTADOS_FINALES]
+        if not pendientes:
+            return Response({"error": "Todos los trabajos del lote ya finalizaron."}, status=status.HTTP_400_BAD_REQUEST)
+        for trabajo in pendientes:
+            _solicitar_cancelacion(trabajo)
+        return Response(self.get_serializer(self.get_object()).data, status=status.HTTP_200_OK)
+
+
+class PerfilPesosViewSet(viewsets.ModelViewSet):
+    queryset = PerfilPesos.objects.select_related('periodo').order_by('perfil_id')
+    serializer_class = PerfilPesosSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['periodo', 'activo']
+
+    def _guardar(self, guardar, serializer):
+        """Guarda el perfil; si queda activo, desactiva antes el que estaba activo en su período (a lo sumo uno)."""
+        with transaction.atomic():
+            periodo = serializer.validated_data.get('periodo') or serializer.instance.periodo
+            if serializer.validated_data.get('activo'):
+                otros = PerfilPesos.objects.filter(periodo=periodo, activo=True)
+                if serializer.instance is not None:
+                    otros = otros.exclude(pk=serializer.instance.pk)
+                otros.update(activo=False)
+            guardar(serializer)
+
+    def perform_create(self, serializer):
+        self._guardar(super().perform_create, serializer)
+
+    def perform_update(self, serializer):
+        self._guardar(super().perform_update, serializer)
+
+    @action(detail=True, methods=['post'], url_path='activar')
+    def activar(self, request, pk=None):
+        """Activa el perfil para la generación de su período (desactiva el que estaba activo)."""
+        perfil = self.get_object()
+        with transaction.atomic():
+            PerfilPesos.objects.filter(periodo=perfil.periodo, activo=True).exclude(pk=perfil.pk).update(activo=False)
+            perfil.activo = True
+            perfil.save(update_fields=['activo'])
+        return Response(self.get_serializer(perfil).data, status=status.HTTP_200_OK)
+
+
 class GeneracionHorarioView(viewsets.ViewSet):
     permission_classes = [AllowAny] # Reemplaza AllowAny con un permiso adecuado
 
@@ -165,37 +459,258 @@ class GeneracionHorarioView(viewsets.ViewSet):
             logger.warning(f"Intento de generar horario para periodo_id no existente: {periodo_id} por usuario: {request.user.username if request.user.is_authenticated else 'Anónimo'}")
             return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
-        logger.info(f"Iniciando generación SÍNCRONA para periodo_id: {periodo_id} (Solicitado por: {request.user.username if request.user.is_authenticated else 'Anónimo'})")
+        # Opcional: período del que se reutilizan las asignaciones aún factibles (arranque en caliente)
+        periodo_origen = None
+        periodo_origen_id = request.data.get('periodo_origen_id')
+        if periodo_origen_id:
+            try:
+                periodo_origen = PeriodoAcademico.objects.get(pk=periodo_origen_id)
+            except PeriodoAcademico.DoesNotExist:
+                return Response({"error": "Período académico de origen no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        # dry_run=true: genera en memoria y devuelve el diff y las métricas sin escribir en la BD
+        dry_run = leer_bandera(request, 'dry_run')
+
+        # tiempo_limite (segundos): al agotarse se devuelve lo programado hasta ese momento
+        try:
+            tiempo_limite = _leer_tiempo_limite(request.data.get('tiempo_limite'))
+        except (TypeError, ValueError):
+            return Response({"error": "'tiempo_limite' debe ser un número de segundos mayor que 0."}, status=status.HTTP_400_BAD_REQUEST)
+        persistir_parcial = leer_bandera(request, 'persistir_parcial', por_defecto=True)
+
+        logger.info(f"Iniciando generación SÍNCRONA{' (dry run)' if dry_run else ''} para periodo_id: {periodo_id} (Solicitado por: {request.user.username if request.user.is_authenticated else 'Anónimo'})")
 
         # Pasamos la instancia del logger de la vista al servicio
-        generator_service = ScheduleGeneratorService(periodo=periodo, stdout_ref=logger)
+        generator_service = ScheduleGeneratorService(
+            periodo=periodo, stdout_ref=logger, periodo_origen=periodo_origen, dry_run=dry_run,
+            opciones=OpcionesEjecucion(tiempo_limite=tiempo_limite, persistir_parcial=persistir_parcial)
+        )
 
         try:
             resultado = generator_service.generar_horarios_automaticos()
             logger.info(f"Generación SÍNCRONA para periodo_id: {periodo_id} completada. Stats: {resultado.get('stats')}")
             
             # Convertir conflictos no resueltos a formato serializable
-            unresolved_conflicts_serializable = []
-            for conflict in resultado.get('unresolved_conflicts', []):
-                unresolved_conflicts_serializable.append({
-                    'grupo_id': conflict.grupo.grupo_id,
-                    'grupo_codigo': conflict.grupo.codigo_grupo,
-                    'materia_id': conflict.materia.materia_id,
-                    'materia_nombre': conflict.materia.nombre_materia,
-                    'sesiones_necesarias': conflict.sesiones_necesarias,
-                    'sesiones_programadas': conflict.sesiones_programadas,
-                    'razon': f"No se pudo programar {conflict.sesiones_necesarias - conflict.sesiones_programadas} sesiones de {conflict.materia.nombre_materia}"
-                })
-            
+            unresolved_conflicts_serializable = generator_service.serializar_conflictos()
+
             return Response({
-                "message": f"Proceso de generación de horarios para {periodo.nombre_periodo} completado (síncrono).",
+                "message": f"Proceso de generación de horarios para {periodo.nombre_periodo} completado (síncrono{', sin guardar cambios' if dry_run else ''}).",
                 "stats": resultado.get('stats', {}),
-                "unresolved_conflicts": unresolved_conflicts_serializable
+                "unresolved_conflicts": unresolved_conflicts_serializable,
+                "dry_run": dry_run,
+                "cambios": resultado.get('cambios'),
+                "metricas": resultado.get('metricas'),
+                "detenido": resultado.get('detenido')
             }, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error catastrófico en generación síncrona de horario para periodo_id {periodo_id}: {str(e)}", exc_info=True)
             return Response({"error": f"Ocurrió un error crítico durante la generación síncrona: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='generar-horario-asincrono')
+    def generar_horario_asincrono(self, request):
+        """
+        Encola la generación del período en Celery como un TrabajoGeneracion, que se puede consultar
+        y cancelar en /scheduling/trabajos-generacion/.
+        """
+        periodo_id = request.data.get('periodo_id')
+        if not periodo_id:
+            return Response({"error": "Se requiere el ID del período académico."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        periodo_origen = None
+        periodo_origen_id = request.data.get('periodo_origen_id')
+        if periodo_origen_id:
+            try:
+                periodo_origen = PeriodoAcademico.objects.get(pk=periodo_origen_id)
+            except PeriodoAcademico.DoesNotExist:
+                return Response({"error": "Período académico de origen no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            tiempo_limite = _leer_tiempo_limite(request.data.get('tiempo_limite'))
+        except (TypeError, ValueError):
+            return Response({"error": "'tiempo_limite' debe ser un número de segundos mayor que 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # modo_particion ('CARRERA' o 'CICLO'): reparte el período entre varios workers
+        modo_particion = request.data.get('modo_particion') or None
+        if modo_particion and modo_particion not in dict(TrabajoGeneracion.MODO_PARTICION_CHOICES):
+            return Response({"error": "'modo_particion' debe ser 'CARRERA' o 'CICLO'."}, status=status.HTTP_400_BAD_REQUEST)
+        if modo_particion and periodo_origen is not None:
+            return Response({"error": "La generación distribuida no admite 'periodo_origen_id'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        trabajo = TrabajoGeneracion.objects.create(
+            periodo=periodo,
+            periodo_origen=periodo_origen,
+            modo_particion=modo_particion,
+            tiempo_limite_segundos=int(tiempo_limite + 0.999) if tiempo_limite else None, # Redondeo hacia arriba
+            persistir_parcial=leer_bandera(request, 'persistir_parcial', por_defecto=True),
+        )
+        try:
+            if modo_particion:
+                async_result = generar_horarios_distribuido_task.delay(trabajo.pk)
+            else:
+                async_result = generar_horarios_task.delay(periodo.pk, trabajo_id=trabajo.pk)
+        except Exception as e:
+            logger.error(f"No se pudo encolar la generación del período {periodo_id}: {str(e)}", exc_info=True)
+            trabajo.estado = 'FALLIDO'
+            trabajo.resultado = {"error": f"No se pudo encolar la tarea: {str(e)}"}
+            trabajo.fecha_fin = timezone.now()
+            trabajo.save(update_fields=['estado', 'resultado', 'fecha_fin'])
+            return Response(TrabajoGeneracionSerializer(trabajo).data, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        TrabajoGeneracion.objects.filter(pk=trabajo.pk, task_id__isnull=True).update(task_id=async_result.id)
+        trabajo.refresh_from_db()
+        return Response(TrabajoGeneracionSerializer(trabajo).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['post'], url_path='generar-horarios-lote')
+    def generar_horarios_lote(self, request):
+        """
+        Encola la generación de varios períodos (`periodo_ids`) como un LoteGeneracion con un TrabajoGeneracion
+        por período. Los períodos que se superponen en fechas y comparten docentes se generan en orden en una
+        misma cadena; las cadenas, en paralelo.
+        """
+        periodo_ids = request.data.get('periodo_ids')
+        if not isinstance(periodo_ids, list) or not periodo_ids:
+            return Response({"error": "Se requiere 'periodo_ids' (lista de IDs de períodos académicos)."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo_ids = list(dict.fromkeys(int(periodo_id) for periodo_id in periodo_ids))
+        except (TypeError, ValueError):
+            return Response({"error": "'periodo_ids' debe contener solo IDs numéricos."}, status=status.HTTP_400_BAD_REQUEST)
+        periodos = list(PeriodoAcademico.objects.filter(pk__in=periodo_ids))
+        faltantes = sorted(set(periodo_ids) - {p.pk for p in periodos})
+        if faltantes:
+            return Response({"error": f"Períodos académicos no encontrados: {faltantes}."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            tiempo_limite = _leer_tiempo_limite(request.data.get('tiempo_limite'))
+        except (TypeError, ValueError):
+            return Response({"error": "'tiempo_limite' debe ser un número de segundos mayor que 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        lote, trabajos_por_cadena = crear_lote(
+            periodos,
+            tiempo_limite_segundos=int(tiempo_limite + 0.999) if tiempo_limite else None, # Redondeo hacia arriba (por período)
+            persistir_parcial=leer_bandera(request, 'persistir_parcial', por_defecto=True),
+        )
+        sin_encolar = []
+        for trabajos in trabajos_por_cadena:
+            try:
+                # Cada cadena es un chain de Celery: un período empieza cuando termina el anterior
+                chain(*[generar_horarios_task.si(t.periodo_id, trabajo_id=t.pk) for t in trabajos]).apply_async()
+            except Exception as e:
+                logger.error(f"No se pudo encolar la cadena {[t.periodo_id for t in trabajos]} del lote {lote.pk}: {str(e)}", exc_info=True)
+                for trabajo in trabajos:
+                    trabajo.estado = 'FALLIDO'
+                    trabajo.resultado = {"error": f"No se pudo encolar la tarea: {str(e)}"}
+                    trabajo.fecha_fin = timezone.now()
+                    trabajo.save(update_fields=['estado', 'resultado', 'fecha_fin'])
+                sin_encolar.extend(trabajos)
+
+        lote = LoteGeneracion.objects.prefetch_related('trabajos__periodo').get(pk=lote.pk)
+        codigo = status.HTTP_503_SERVICE_UNAVAILABLE if sin_encolar else status.HTTP_202_ACCEPTED
+        return Response(LoteGeneracionSerializer(lote).data, status=codigo)
+
+    @action(detail=False, methods=['post'], url_path='reparar-horario')
+    def reparar_horario(self, request):
+        """
+        Reparación incremental: aplica al horario del período solo los cambios de datos registrados desde la
+        última generación (grupos, disponibilidad y especialidades de docentes, aulas y restricciones).
+        """
+        periodo_id = request.data.get('periodo_id')
+        if not periodo_id:
+            return Response({"error": "Se requiere el ID del período académico."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        dry_run = leer_bandera(request, 'dry_run')
+        try:
+            resultado = ReparacionService(periodo=periodo, dry_run=dry_run, stdout_ref=logger).reparar()
+        except Exception as e:
+            logger.error(f"Error en la reparación del horario del período {periodo_id}: {str(e)}", exc_info=True)
+            return Response({"error": f"Ocurrió un error durante la reparación: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='analisis-factibilidad')
+    def analisis_factibilidad(self, request):
+        """
+        Pre-chequeo rápido de factibilidad (sin generar): compara por turno las sesiones requeridas
+        contra la oferta de bloques de grupos, docentes y aulas.
+        """
+        periodo_id = request.query_params.get('periodo_id')
+        if not periodo_id:
+            return Response({"error": "Se requiere el parámetro 'periodo_id'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            resultado = analizar_factibilidad(periodo, stdout_ref=logger)
+        except ServidorGeneradorError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='calidad-horario')
+    def calidad_horario(self, request):
+        """
+        Calidad del horario guardado del período (generado o editado a mano): penalización blanda total, por
+        componente (preferencias, capacidad, turno, aula preferida, huecos, dispersión) y por grupo y docente.
+        """
+        periodo_id = request.query_params.get('periodo_id')
+        if not periodo_id:
+            return Response({"error": "Se requiere el parámetro 'periodo_id'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        resultado = CalidadHorarioService(periodo=periodo, stdout_ref=logger).evaluar()
+        return Response(resultado, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='sugerir-suplentes')
+    def sugerir_suplentes(self, request):
+        """
+        Suplentes para las sesiones de un docente ausente en un día ('fecha' YYYY-MM-DD o 'dia_semana' 1-7):
+        por sesión, docentes elegibles, libres en el bloque y por debajo de sus topes diario y semanal.
+        """
+        periodo_id = request.query_params.get('periodo_id')
+        docente_id = request.query_params.get('docente_id')
+        if not periodo_id or not docente_id:
+            return Response({"error": "Se requieren los parámetros 'periodo_id' y 'docente_id'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            periodo = PeriodoAcademico.objects.get(pk=periodo_id)
+        except PeriodoAcademico.DoesNotExist:
+            return Response({"error": "Período académico no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        fecha = request.query_params.get('fecha')
+        try:
+            if fecha:
+                fecha = date.fromisoformat(fecha)
+                if not periodo.fecha_inicio <= fecha <= periodo.fecha_fin:
+                    return Response({"error": "La fecha está fuera del período académico."}, status=status.HTTP_400_BAD_REQUEST)
+                dia_semana = fecha.isoweekday() # 1 = Lunes, igual que DIA_SEMANA_CHOICES
+            else:
+                dia_semana = int(request.query_params.get('dia_semana', ''))
+                if dia_semana not in dict(HorariosAsignados.DIA_SEMANA_CHOICES):
+                    raise ValueError
+            limite = int(request.query_params.get('limite', SUPLENTES_POR_SESION))
+            if limite < 1:
+                raise ValueError
+            docente_id = int(docente_id)
+        except (TypeError, ValueError):
+            return Response({"error": "Se requiere 'fecha' (YYYY-MM-DD) o 'dia_semana' (1-7); 'docente_id' y 'limite' deben ser enteros positivos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultado = sugerir_suplentes(periodo, docente_id, dia_semana, limite)
+        except ServidorGeneradorError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({**resultado, "fecha": fecha}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='exportar-horarios-excel')
     def exportar_horarios(self, request):
         periodo_id = request.query_params.get('periodo_id')
@@ -10,6 +10,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 # Importaciones de tus modelos locales:
 from .models import Docentes, Roles # Aquí sí importas Roles
+from apps.scheduling.utils import leer_bandera
 
 # Importaciones de tus serializers locales:
 from .serializers import (
@@ -85,12 +86,24 @@ class DocentesViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='por-materia')
     def por_materia(self, request):
-        materia_id = request.query_params.get('materia_id')
-        if not materia_id:
-            return Response({'error': 'Se requiere el parámetro materia_id'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            materia_id = int(request.query_params.get('materia_id', ''))
+        except ValueError:
+            return Response({'error': 'Se requiere el parámetro materia_id (entero)'}, status=status.HTTP_400_BAD_REQUEST)
         from apps.academic_setup.models import MateriaEspecialidadesRequeridas
+        from apps.scheduling.service.indices import EspecialidadesIndex
         especialidades = MateriaEspecialidadesRequeridas.objects.filter(materia_id=materia_id).values_list('especialidad_id', flat=True)
-        qs = self.get_queryset().filter(especialidades__especialidad_id__in=especialidades).distinct()
+        # ?todas=true aplica la regla del generador: el docente debe tener TODAS las especialidades requeridas
+        if not leer_bandera(request, 'todas'):
+            qs = self.get_queryset().filter(especialidades__especialidad_id__in=especialidades).distinct()
+        else:
+            # Mismas máscaras que usa el generador, solo con las especialidades de la materia
+            index = EspecialidadesIndex.desde_bd(materia_ids=[materia_id], especialidad_ids=especialidades)
+            if not index.mascara_materia(materia_id):
+                qs = self.get_queryset() # La materia no exige especialidades: todos califican
+            else:
+                docente_ids = [d for d in index.docente_mascaras if index.docente_califica(d, materia_id)]
+                qs = self.get_queryset().filter(docente_id__in=docente_ids)
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 